@@ -7,26 +7,57 @@ on the context.
 
 """
 
+import atexit
 import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
 from functools import wraps
 from json import JSONDecodeError
 from pprint import pformat
 from urllib.parse import urljoin
+from urllib.parse import urlsplit
 from urllib.parse import urlunparse
 
 import requests
+from attrs import evolve
+from attrs import field
+from attrs import frozen
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
+from requests.exceptions import RequestException
 
+from camayoc import cassette
 from camayoc import exceptions
+from camayoc import json_codec
 from camayoc.config import settings
 from camayoc.constants import QPC_API_INVALID_TOKEN_MESSAGE
 from camayoc.constants import QPC_API_ROOT
 from camayoc.constants import QPC_CURRENT_USER_PATH
 from camayoc.constants import QPC_LOGOUT_PATH
 from camayoc.constants import QPC_TOKEN_PATH
+from camayoc.http_cache import UNSAFE_METHODS
+from camayoc.http_cache import ResponseCache
+from camayoc.identity_map import IdentityMap
+from camayoc.rate_limit import Permit
+from camayoc.rate_limit import RateLimiter
+from camayoc.types.api import RequestEvent
 
 logger = logging.getLogger(__name__)
 
+HOOK_EVENTS = ("before_request", "after_response", "on_error")
+"""Events that client hooks may be registered for."""
+
+global_hooks = {event: [] for event in HOOK_EVENTS}
+"""Hooks called by every client, in addition to client's own hooks."""
+
+_ID_SEGMENT_RE = re.compile(
+    r"^(\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$", re.IGNORECASE
+)
+
 
 def raise_error_for_status(response):
     """Generate an error message and raise HTTPError for bad return codes.
@@ -93,10 +124,165 @@ def json_handler(response):
     return response.json()
 
 
+def relative_path(url, base_url=""):
+    """Return path of ``url`` relative to ``base_url``, without query string."""
+    path = urlsplit(url).path
+    base_path = urlsplit(base_url).path
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path) :]
+    return path
+
+
+def template_path(url, base_url=""):
+    """Return path of ``url`` relative to ``base_url``, with ids collapsed.
+
+    Numeric and UUID path segments are replaced with ``{id}``, so requests
+    for different objects of the same type share a template, e.g.
+    ``http://example.com/api/v1/jobs/12/`` becomes ``v1/jobs/{id}/``.
+    """
+    path = relative_path(url, base_url)
+    segments = ["{id}" if _ID_SEGMENT_RE.match(segment) else segment for segment in path.split("/")]
+    return "/".join(segments)
+
+
+class Response(requests.Response):
+    """Response whose JSON body is decoded with :mod:`camayoc.json_codec`.
+
+    All responses returned by :class:`Client` are of this type.
+    """
+
+    def json(self, **kwargs):
+        """Decode response body as JSON.
+
+        Keyword arguments are passed to :func:`json.loads`; decoding falls
+        back to ``requests.Response.json`` when they are provided.
+        """
+        if kwargs:
+            return super().json(**kwargs)
+        try:
+            return json_codec.loads(self.content)
+        except JSONDecodeError as e:
+            raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos) from e
+
+
+def new_session(config=settings.quipucords_server):
+    """Build a ``requests.Session`` with connection pool tuned by ``config``.
+
+    ``pool_connections`` is the number of per-host pools that are cached,
+    ``pool_maxsize`` is the maximum number of connections kept open to a
+    single host and ``pool_block`` decides if callers should wait for a free
+    connection instead of opening a throwaway one when the pool is exhausted.
+    Connections are kept alive between requests unless ``keep_alive`` is
+    disabled.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        pool_block=config.pool_block,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not config.keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"))
+"""HTTP methods that are safe to retry."""
+
+
+@frozen
+class RetryPolicy:
+    """Rules deciding if and when failed request should be sent again.
+
+    Request is retried when the server responds with one of ``status_codes``
+    or when sending fails with one of ``exceptions``, as long as the method
+    is idempotent (unless ``retry_non_idempotent`` is set), there were less
+    than ``max_attempts`` attempts and the next one would start before
+    ``deadline`` seconds since the first one.
+
+    Delay between attempts grows exponentially: ``backoff_factor * 2 **
+    (attempt - 1)``, capped at ``backoff_max``. ``jitter`` part of that delay
+    is randomized. If server sent ``Retry-After`` header, it is used instead
+    (still capped at ``backoff_max``).
+    """
+
+    max_attempts: int = 3
+    status_codes: frozenset[int] = field(default=frozenset((502, 503, 504)), converter=frozenset)
+    exceptions: tuple = (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+    )
+    retry_non_idempotent: bool = False
+    backoff_factor: float = 0.5
+    backoff_max: float = 30
+    jitter: float = 0.5
+    deadline: float | None = 120
+    respect_retry_after: bool = True
+
+    @classmethod
+    def from_options(cls, options):
+        """Create policy from ``RetryOptions`` config section."""
+        return cls(**options.model_dump(exclude_none=True))
+
+    def backoff(self, attempt):
+        """Return delay before attempt that follows ``attempt``."""
+        delay = min(self.backoff_max, self.backoff_factor * 2 ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+    def retry_after(self, response):
+        """Return delay requested by server in Retry-After header, if any."""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+    def delay(self, method, attempt, elapsed, response=None, error=None):
+        """Return how long to wait before next attempt, or None to give up."""
+        if attempt >= self.max_attempts:
+            return None
+        if not self.retry_non_idempotent and method.upper() not in IDEMPOTENT_METHODS:
+            return None
+        if error is not None and not isinstance(error, self.exceptions):
+            return None
+        if response is not None and response.status_code not in self.status_codes:
+            return None
+
+        delay = None
+        if response is not None and self.respect_retry_after:
+            delay = self.retry_after(response)
+        if delay is None:
+            delay = self.backoff(attempt)
+        delay = min(delay, self.backoff_max)
+
+        if self.deadline is not None and elapsed + delay > self.deadline:
+            return None
+        return delay
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+"""Policy that never retries requests."""
+
+
 def try_reauthenticate(func):
     @wraps(func)
     def wrapper(self, *args, **kwargs):
+        try:
+            client = self.client
+        except AttributeError:
+            client = self
         for i in range(1, 11):
+            stale_token = client.token
             try:
                 return func(self, *args, **kwargs)
             except HTTPError as e:
@@ -112,12 +298,7 @@ def try_reauthenticate(func):
                     func.__name__,
                     i,
                 )
-                try:
-                    client = self.client
-                except AttributeError:
-                    client = self
-                client.token = None
-                client.login()
+                client.relogin(stale_token)
 
     return wrapper
 
@@ -138,6 +319,42 @@ class Client(object):
     You can override this base url by assigning a new value to the url
     field.
 
+    Callbacks can be registered to observe requests, see :meth:`add_hook`.
+
+    Requests that fail because server is temporarily unavailable are retried
+    according to :class:`RetryPolicy`. Default policy is built from ``retry``
+    section of ``quipucords_server`` config. It can be changed for a client by
+    assigning to ``retry_policy`` field, and for a single request by passing
+    ``retry_policy`` argument to any of HTTP verb methods. Number of requests
+    and retries is counted in ``metrics`` field.
+
+    Responses of GET requests may be cached, see :mod:`camayoc.http_cache`.
+    Caching is disabled by default; enable it with ``cache`` section of
+    ``quipucords_server`` config, or by assigning a
+    :class:`camayoc.http_cache.ResponseCache` to ``response_cache`` field.
+    Pass ``cache=False`` to any HTTP verb method to skip the cache.
+
+    Number and rate of requests may be limited, see :mod:`camayoc.rate_limit`
+    and ``rate_limit`` section of ``quipucords_server`` config. Time spent
+    waiting for the limiter is counted in ``metrics`` field.
+
+    Models may share instances and read state through ``identity_map``
+    field, see :mod:`camayoc.identity_map`. It is disabled by default.
+
+    When :mod:`camayoc.cassette` is active, responses are recorded in it, or
+    replayed from it instead of sending requests to the server.
+
+    Client is thread-safe - single client can be shared by many threads.
+    When token is rejected by the server, or is about to expire (see
+    ``token_ttl`` and ``token_renew_before`` config options), exactly one
+    thread logs in again; other threads wait for it and use the new token.
+
+    Requests are sent through a ``requests.Session`` with pooled keep-alive
+    connections, shared by all the HTTP verb methods. Pool size is controlled
+    by ``pool_*`` and ``keep_alive`` options of ``quipucords_server`` config
+    section. Call :meth:`close` (or use client as a context manager) when
+    client is no longer needed, to release the connections.
+
     Example::
         >>> from camayoc import api
         >>> client = api.Client()
@@ -155,7 +372,12 @@ class Client(object):
     """
 
     def __init__(
-        self, response_handler=None, url=None, authenticate=True, config=settings.quipucords_server
+        self,
+        response_handler=None,
+        url=None,
+        authenticate=True,
+        config=settings.quipucords_server,
+        session=None,
     ):
         """Initialize this object, collecting base URL from config file.
 
@@ -165,11 +387,28 @@ class Client(object):
 
         If no URL is specified, it will be calculated automatically based on config
         values.
+
+        If no session is specified, a new one with connection pool configured
+        according to config values is created.
         """
         self.url = url
         self.token = None
+        self.token_expires_at = None
+        self._auth_lock = threading.RLock()
+        self._metrics_lock = threading.Lock()
         self.config = config
         self.verify = self.config.ssl_verify
+        self.session = session if session is not None else new_session(self.config)
+        self.hooks = {event: [] for event in HOOK_EVENTS}
+        self.retry_policy = RetryPolicy.from_options(self.config.retry)
+        self.metrics = Counter()
+        self.response_cache = None
+        if self.config.cache.enabled:
+            self.response_cache = ResponseCache.from_options(self.config.cache)
+        self.rate_limiter = RateLimiter.from_options(self.config.rate_limit)
+        self.identity_map = None
+        if self.config.identity_map.enabled:
+            self.identity_map = IdentityMap.from_options(self.config.identity_map)
 
         if not self.url:
             hostname = self.config.hostname
@@ -192,17 +431,90 @@ class Client(object):
         if authenticate:
             self.login()
 
+    def __enter__(self):
+        """Use client as context manager that closes it on exit."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the client."""
+        self.close()
+
+    def close(self):
+        """Close all pooled connections held by this client."""
+        self.session.close()
+
+    def add_hook(self, event, callback):
+        """Register ``callback`` to be called on ``event``.
+
+        ``event`` is one of ``before_request``, ``after_response`` and
+        ``on_error``. ``callback`` receives single argument, an instance of
+        :class:`camayoc.types.api.RequestEvent`. ``on_error`` is called when
+        request could not be completed (e.g. connection was refused); responses
+        with error status codes are reported by ``after_response``.
+
+        Hooks registered in :data:`global_hooks` are called for all clients.
+        """
+        if event not in HOOK_EVENTS:
+            raise ValueError(f"Unknown hook event '{event}', valid events are {HOOK_EVENTS}")
+        self.hooks[event].append(callback)
+
+    def remove_hook(self, event, callback):
+        """Unregister ``callback`` previously registered by :meth:`add_hook`."""
+        self.hooks[event].remove(callback)
+
+    def _run_hooks(self, event, request_event):
+        for callback in global_hooks[event] + self.hooks[event]:
+            try:
+                callback(request_event)
+            except Exception:  # noqa: BLE001
+                logger.warning("Client hook %s failed", callback, exc_info=True)
+
     def login(self):
         """Login to the server to receive an authorization token."""
-        server_username = self.config.username
-        server_password = self.config.password
-        login_request = self.request(
-            "POST",
-            urljoin(self.url, QPC_TOKEN_PATH),
-            json={"username": server_username, "password": server_password},
-        )
-        self.token = login_request.json()["token"]
-        return login_request
+        with self._auth_lock:
+            # Sent without current token, which server may reject. Not logged,
+            # because it carries password.
+            login_request = self.response_handler(
+                self._dispatch(
+                    "POST",
+                    urljoin(self.url, QPC_TOKEN_PATH),
+                    json={"username": self.config.username, "password": self.config.password},
+                    verify=self.verify,
+                )
+            )
+            self.token = login_request.json()["token"]
+            self.token_expires_at = self._clock() + self.config.token_ttl
+            return login_request
+
+    def relogin(self, stale_token=None):
+        """Obtain new token, unless other thread did so in the meantime.
+
+        :param ``stale_token``: Token that was found invalid or about to
+            expire. Defaults to current token.
+        """
+        if stale_token is None:
+            stale_token = self.token
+        with self._auth_lock:
+            if self.token and self.token != stale_token:
+                return
+            self.login()
+
+    def token_expired(self, margin=0):
+        """Check if client needs to log in again before sending requests.
+
+        :param ``margin``: Consider token expired if it expires in that many
+            seconds.
+        """
+        if not self.token or self.token_expires_at is None:
+            return True
+        return self._clock() >= self.token_expires_at - margin
+
+    def _clock(self):
+        return time.monotonic()
+
+    def _count(self, metric, value=1):
+        with self._metrics_lock:
+            self.metrics[metric] += value
 
     def logout(self, **kwargs):
         """Start sending unauthorized requests.
@@ -213,6 +525,7 @@ class Client(object):
         url = urljoin(self.url, QPC_LOGOUT_PATH)
         self.request("PUT", url, **kwargs)
         self.token = None
+        self.token_expires_at = None
 
     @try_reauthenticate
     def get_user(self, **kwargs):
@@ -264,16 +577,261 @@ class Client(object):
 
         Arguments passed directly in to this method override (but do not
         overwrite!) arguments specified in ``self.request_kwargs``.
+
+        Pass ``retry_policy`` to override client retry policy for this request,
+        and ``cache=False`` to bypass response cache.
+
+        Token that is about to expire is renewed before request is sent.
         """
         # The `self.request_kwargs` dict should *always* have a "url" argument.
         # This is enforced by `self.__init__`. This allows us to call the
-        # `requests.request` function and satisfy its signature:
+        # `requests.Session.request` method and satisfy its signature:
         #
         #     request(method, url, **kwargs)
         #
+        if self.token_expires_at is not None and self.token_expired(
+            self.config.token_renew_before or 0
+        ):
+            self.relogin(self.token)
         headers = self.default_headers()
         headers.update(kwargs.get("headers", {}))
         kwargs["headers"] = headers
         kwargs.setdefault("verify", self.verify)
         logger.debug("Outgoing request [method='%s' url='%s' kwargs=%s]", method, url, kwargs)
-        return self.response_handler(requests.request(method, url, **kwargs))
+        return self.response_handler(self._dispatch(method, url, **kwargs))
+
+    def _dispatch(self, method, url, **kwargs):
+        """Obtain response from cache or server, applying retry policy."""
+        retry_policy = kwargs.pop("retry_policy", None) or self.retry_policy
+        use_cache = kwargs.pop("cache", True) and self.response_cache is not None
+        if use_cache and method == "GET" and not kwargs.get("stream"):
+            return self._cached_get(url, retry_policy, **kwargs)
+
+        response = self._send_with_retries(method, url, retry_policy, **kwargs)
+        if self.response_cache is not None and method in UNSAFE_METHODS:
+            self.response_cache.invalidate(relative_path(url, self.url))
+        return response
+
+    def _cached_get(self, url, retry_policy, **kwargs):
+        cache = self.response_cache
+        full_url = requests.Request("GET", url, params=kwargs.get("params")).prepare().url
+        key = (full_url, kwargs["headers"].get("Accept"))
+        entry = cache.get(key)
+        if entry is not None and entry.is_fresh(cache.ttl):
+            self._count("cache_hits")
+            return cache.response(entry)
+
+        if entry is not None:
+            kwargs["headers"] = {**kwargs["headers"], **entry.validators()}
+        response = self._send_with_retries("GET", url, retry_policy, **kwargs)
+        if entry is not None and response.status_code == 304:
+            self._count("cache_revalidated")
+            cache.refresh(entry)
+            return cache.response(entry)
+
+        self._count("cache_misses")
+        cache.store(key, relative_path(url, self.url), response)
+        return response
+
+    def _send_with_retries(self, method, url, retry_policy, **kwargs):
+        """Send request, repeating it as long as ``retry_policy`` allows."""
+        start = time.monotonic()
+        attempt = 1
+        while True:
+            self._count("requests")
+            response = error = None
+            try:
+                response = self._send(method, url, **kwargs)
+            except RequestException as e:
+                error = e
+            delay = retry_policy.delay(
+                method, attempt, time.monotonic() - start, response=response, error=error
+            )
+            if delay is None:
+                if error is not None:
+                    self._count("errors")
+                    raise error
+                return response
+            logger.info(
+                "Retrying request in %.2fs [method='%s' url='%s' attempt=%s status=%s error=%r]",
+                delay,
+                method,
+                url,
+                attempt,
+                getattr(response, "status_code", None),
+                error,
+            )
+            if response is not None:
+                response.close()
+            self._count("retries")
+            self._count("retry_wait", delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, method, url, **kwargs):
+        """Send request through the session, notifying hooks."""
+        request_event = RequestEvent(method=method, url=url, path=template_path(url, self.url))
+        self._run_hooks("before_request", request_event)
+        permit = self._acquire_permit(request_event.path)
+        start = time.perf_counter()
+        try:
+            response = self._send_or_replay(method, url, **kwargs)
+            response.__class__ = Response
+        except BaseException as e:
+            permit.release()
+            if not isinstance(e, RequestException):
+                raise
+            request_event = evolve(
+                request_event,
+                elapsed=time.perf_counter() - start,
+                error=e,
+                rate_limit_wait=permit.wait,
+            )
+            self._run_hooks("on_error", request_event)
+            raise
+        if kwargs.get("stream", False):
+            _release_on_close(response, permit.release)
+        else:
+            permit.release()
+        request_event = evolve(
+            request_event,
+            rate_limit_wait=permit.wait,
+            status_code=response.status_code,
+            request_bytes=_request_size(response),
+            response_bytes=_response_size(response, kwargs.get("stream", False)),
+            elapsed=time.perf_counter() - start,
+        )
+        self._run_hooks("after_response", request_event)
+        return response
+
+    def _acquire_permit(self, path):
+        active_cassette = cassette.current()
+        if self.rate_limiter is None or (active_cassette and active_cassette.mode == "replay"):
+            return Permit()
+        permit = self.rate_limiter.acquire(path)
+        if permit.wait:
+            self._count("rate_limit_waits")
+            self._count("rate_limit_wait", permit.wait)
+        return permit
+
+    def _send_or_replay(self, method, url, **kwargs):
+        active_cassette = cassette.current()
+        if active_cassette is None:
+            return self.session.request(method, url, **kwargs)
+
+        full_url = requests.Request(method, url, params=kwargs.get("params")).prepare().url
+        path = relative_path(full_url, self.url)
+        if query := urlsplit(full_url).query:
+            path = f"{path}?{query}"
+        if active_cassette.mode == "replay":
+            return active_cassette.replay(method, path, full_url)
+        response = self.session.request(method, url, **kwargs)
+        active_cassette.record(method, path, response)
+        return response
+
+
+def _release_on_close(response, release):
+    """Keep rate limiter slot until streamed response body is closed."""
+    close = response.close
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            release()
+
+    response.close = close_and_release
+
+
+def _request_size(response):
+    body = getattr(response.request, "body", None)
+    if body is None:
+        return 0
+    try:
+        return len(body)
+    except TypeError:
+        return None
+
+
+def _response_size(response, stream):
+    if not stream:
+        return len(response.content)
+    try:
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _config_key(config):
+    return (config.hostname, config.port, config.https, config.username)
+
+
+class ClientRegistry:
+    """Process-wide store of authenticated clients, keyed by server config.
+
+    Creating a new :class:`Client` means logging in to the server. Models
+    that are created without explicit client, like ``Credential()`` or
+    ``ScanJob()``, obtain one from the registry instead, so the whole process
+    shares a single client (and connection pool) per server and response
+    handler. Authentication token is cached until it expires, and reused
+    by all clients for the same server.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._sessions = {}
+
+    def get(self, response_handler=None, config=settings.quipucords_server):
+        """Return authenticated client for ``config`` and ``response_handler``."""
+        if response_handler is None:
+            response_handler = code_handler
+        config_key = _config_key(config)
+        with self._lock:
+            client = self._clients.get((config_key, response_handler))
+            if client is None:
+                session = self._sessions.get(config_key)
+                client = Client(
+                    response_handler=response_handler,
+                    config=config,
+                    authenticate=False,
+                    session=session,
+                )
+                self._sessions.setdefault(config_key, client.session)
+                self._clients[(config_key, response_handler)] = client
+            if client.token_expired():
+                self._authenticate(client, config_key)
+            return client
+
+    def _authenticate(self, client, config_key):
+        for (other_key, _), other_client in self._clients.items():
+            if other_key != config_key or other_client is client:
+                continue
+            if not other_client.token_expired():
+                client.token = other_client.token
+                client.token_expires_at = other_client.token_expires_at
+                return
+        client.login()
+
+    def clear(self):
+        """Close and forget all the clients."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._clients.clear()
+            self._sessions.clear()
+
+
+client_registry = ClientRegistry()
+"""Registry used by :func:`get_client`."""
+
+atexit.register(client_registry.clear)
+
+
+def get_client(response_handler=None, config=settings.quipucords_server):
+    """Get shared, authenticated client from the process-wide registry.
+
+    Use this instead of creating new :class:`Client` when you don't need a
+    client that is private to the caller.
+    """
+    return client_registry.get(response_handler=response_handler, config=config)
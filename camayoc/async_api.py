@@ -0,0 +1,198 @@
+# coding=utf-8
+"""Asyncio client for working with QPC's API.
+
+This module provides :class:`AsyncClient`, a counterpart of
+:class:`camayoc.api.Client` that can be used from coroutines. It accepts the
+same response handlers and re-authenticates in the same way as the blocking
+client, but allows many requests to be in flight at once.
+
+Requests are sent through the same pooled ``requests.Session`` as the
+blocking client, on a dedicated thread pool. Because of that, ``await``-ing
+a request never blocks the event loop, and number of requests in flight is
+bounded by ``max_in_flight`` argument.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from functools import wraps
+from urllib.parse import urljoin
+
+from requests.exceptions import HTTPError
+
+from camayoc import api
+from camayoc.config import settings
+from camayoc.constants import QPC_CURRENT_USER_PATH
+from camayoc.constants import QPC_LOGOUT_PATH
+from camayoc.constants import QPC_TOKEN_PATH
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = 100
+"""Default number of requests that AsyncClient sends concurrently."""
+
+
+def try_reauthenticate(func):
+    """Asyncio counterpart of :func:`camayoc.api.try_reauthenticate`."""
+
+    @wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            client = self.client
+        except AttributeError:
+            client = self
+        for i in range(1, 11):
+            stale_token = client.token
+            try:
+                return await func(self, *args, **kwargs)
+            except HTTPError as e:
+                is_invalid_token = getattr(e, "is_invalid_token", False)
+                if not is_invalid_token:
+                    raise
+                logger.debug(
+                    (
+                        "Server returned Invalid token error, logging in again"
+                        " [client id=%s func=%s iteration=%s]"
+                    ),
+                    id(self),
+                    func.__name__,
+                    i,
+                )
+                await client.relogin(stale_token)
+
+    return wrapper
+
+
+class AsyncClient(api.Client):
+    """A client for interacting with the quipucords API from coroutines.
+
+    All HTTP verb methods of :class:`camayoc.api.Client` are available, but
+    return awaitables. Client logs in lazily, before the first request is
+    sent, unless ``authenticate`` is ``False``.
+
+    Example::
+        >>> from camayoc.async_api import AsyncClient
+        >>> from camayoc.qpc_models import ScanJob
+        >>> async with AsyncClient() as client:
+        ...     jobs = [ScanJob(client=client, _id=job_id) for job_id in job_ids]
+        ...     statuses = await asyncio.gather(*(job.astatus() for job in jobs))
+    """
+
+    def __init__(
+        self,
+        response_handler=None,
+        url=None,
+        authenticate=True,
+        config=settings.quipucords_server,
+        max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+    ):
+        """Initialize this object, collecting base URL from config file.
+
+        Connection pool is made large enough to keep ``max_in_flight``
+        connections open.
+        """
+        pool_maxsize = max(config.pool_maxsize, max_in_flight)
+        session = api.new_session(config.model_copy(update={"pool_maxsize": pool_maxsize}))
+        super().__init__(
+            response_handler=response_handler,
+            url=url,
+            authenticate=False,
+            config=config,
+            session=session,
+        )
+        self._needs_login = authenticate
+        self._login_lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="camayoc-async-client"
+        )
+
+    async def __aenter__(self):
+        """Use client as async context manager that closes it on exit."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Close the client."""
+        self.close()
+
+    def close(self):
+        """Close all pooled connections and stop worker threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        super().close()
+
+    async def login(self):
+        """Login to the server to receive an authorization token."""
+        async with self._login_lock:
+            return await self._login()
+
+    async def relogin(self, stale_token=None):
+        """Obtain new token, unless other coroutine did so in the meantime.
+
+        :param ``stale_token``: Token that was found invalid or about to
+            expire. Defaults to current token.
+        """
+        if stale_token is None:
+            stale_token = self.token
+        async with self._login_lock:
+            if self.token and self.token != stale_token:
+                return
+            await self._login()
+
+    async def _login(self):
+        login_request = await self._asend(
+            "POST",
+            urljoin(self.url, QPC_TOKEN_PATH),
+            json={"username": self.config.username, "password": self.config.password},
+        )
+        self.token = login_request.json()["token"]
+        self.token_expires_at = self._clock() + self.config.token_ttl
+        return login_request
+
+    async def logout(self, **kwargs):
+        """Start sending unauthorized requests."""
+        url = urljoin(self.url, QPC_LOGOUT_PATH)
+        await self.request("PUT", url, **kwargs)
+        self.token = None
+        self.token_expires_at = None
+        self._needs_login = False
+
+    @try_reauthenticate
+    async def get_user(self, **kwargs):
+        """Get the username of the user logged in."""
+        url = urljoin(self.url, QPC_CURRENT_USER_PATH)
+        return await self.request("GET", url, **kwargs)
+
+    async def request(self, method, url, **kwargs):
+        """Send an HTTP request, logging in first if necessary.
+
+        Failed requests are retried (and responses cached) on worker thread,
+        the same way as in :meth:`camayoc.api.Client.request`.
+        """
+        if self._needs_token_renewal():
+            async with self._login_lock:
+                if self._needs_token_renewal():
+                    await self._login()
+        return await self._asend(method, url, **kwargs)
+
+    def _needs_token_renewal(self):
+        """Check if token should be obtained before sending request.
+
+        Client created with ``authenticate`` logs in before the first request.
+        Token obtained by any login is renewed when it is about to expire.
+        """
+        if self.token_expires_at is not None:
+            return self.token_expired(self.config.token_renew_before or 0)
+        return self._needs_login and not self.token
+
+    async def _asend(self, method, url, **kwargs):
+        headers = self.default_headers()
+        headers.update(kwargs.get("headers", {}))
+        kwargs["headers"] = headers
+        kwargs.setdefault("verify", self.verify)
+        logger.debug("Outgoing request [method='%s' url='%s' kwargs=%s]", method, url, kwargs)
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            self._executor,
+            partial(self._dispatch, method, url, **kwargs),
+        )
+        return self.response_handler(response)
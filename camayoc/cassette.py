@@ -0,0 +1,279 @@
+"""Recording and replaying of API traffic.
+
+While :class:`Cassette` is active in ``record`` mode, every response received
+by :class:`camayoc.api.Client` is stored in it, and saved on disk when
+cassette is deactivated. In ``replay`` mode, client does not open network
+connections at all - responses are served from cassette saved earlier.
+
+Requests are matched by HTTP method and path relative to API root, including
+query string. Request body, and values of query parameters listed in
+:data:`VOLATILE_QUERY_PARAMS`, are not taken into account, because tests send
+randomly generated names. When the same request was sent more than once,
+responses are replayed in the order they were recorded; the last one is
+repeated when cassette runs out of them.
+
+Cassette activated by :func:`use_cassette` is used only by the thread that
+activated it, and by short-lived workers that thread starts - functions
+wrapped with :func:`bind` run with cassette of the thread that wrapped them.
+Requests sent by other threads - e.g. scan job watcher and ``ScanContainer``
+workers, which outlive single test - go to the session cassette
+(``use_cassette(path, mode, session=True)``), or are sent to the server
+normally if there is none.
+
+Recorded responses are scrubbed of secrets (tokens, passwords, keys) and of
+headers that are not needed for replay. Consecutive identical responses to
+the same request - e.g. when polling scan job that is still running - are
+stored once, so cassettes stay small and replay does not wait for scans.
+
+Cassettes are usually managed by pytest plugin, see ``--camayoc-cassette-mode``
+option and ``cassette_mode`` camayoc setting.
+"""
+
+import base64
+import functools
+import gzip
+import logging
+import threading
+from collections import defaultdict
+from collections import deque
+from contextlib import contextmanager
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from camayoc import json_codec
+from camayoc.exceptions import CassetteMissError
+
+logger = logging.getLogger(__name__)
+
+MODES = ("record", "replay")
+
+SCRUBBED_FIELDS = frozenset(
+    (
+        "auth_token",
+        "become_password",
+        "password",
+        "ssh_key",
+        "ssh_passphrase",
+        "sudo_password",
+        "token",
+    )
+)
+"""Fields of JSON responses whose values are never saved in cassettes."""
+
+SCRUBBED_VALUE = "********"
+
+RECORDED_HEADERS = (
+    "Content-Disposition",
+    "Content-Type",
+    "ETag",
+    "Last-Modified",
+    "Location",
+    "Retry-After",
+)
+"""Response headers that are saved in cassettes."""
+
+VOLATILE_QUERY_PARAMS = frozenset(
+    (
+        "name",
+        "search_by_name",
+        "search_credentials_by_name",
+        "search_sources_by_name",
+    )
+)
+"""Query parameters whose values are ignored when matching requests."""
+
+_local = threading.local()
+_session_cassettes = []
+
+
+def current():
+    """Return cassette active in this thread, or session cassette, or None."""
+    thread_cassettes = getattr(_local, "cassettes", None)
+    if thread_cassettes:
+        return thread_cassettes[-1]
+    return _session_cassettes[-1] if _session_cassettes else None
+
+
+@contextmanager
+def use_cassette(path, mode, session=False):
+    """Activate cassette stored in ``path`` for the duration of the block.
+
+    Cassette is used by the current thread only. With ``session``, it is
+    used by all threads that don't have their own cassette.
+
+    In ``record`` mode, cassette is saved when block finishes, even if it
+    raised an exception.
+    """
+    cassette = Cassette(path, mode)
+    if session:
+        active = _session_cassettes
+    else:
+        if not hasattr(_local, "cassettes"):
+            _local.cassettes = []
+        active = _local.cassettes
+    active.append(cassette)
+    try:
+        yield cassette
+    finally:
+        active.remove(cassette)
+        if mode == "record":
+            cassette.save()
+
+
+@contextmanager
+def activated(cassette):
+    """Use ``cassette`` in the current thread for the duration of the block.
+
+    Does nothing if ``cassette`` is None.
+    """
+    if cassette is None:
+        yield
+        return
+    if not hasattr(_local, "cassettes"):
+        _local.cassettes = []
+    _local.cassettes.append(cassette)
+    try:
+        yield
+    finally:
+        _local.cassettes.remove(cassette)
+
+
+def bind(func):
+    """Return ``func`` wrapped to run with cassette active in the calling thread.
+
+    Used for functions submitted to worker threads, so their requests are
+    recorded in, or replayed from, the same cassette as the caller's.
+    """
+    cassette = current()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with activated(cassette):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def match_key(method, path):
+    """Return key identifying request ``method`` ``path`` in cassette."""
+    path, _, query = path.partition("?")
+    if query:
+        params = [
+            (name, "*" if name in VOLATILE_QUERY_PARAMS else value)
+            for name, value in parse_qsl(query, keep_blank_values=True)
+        ]
+        path = f"{path}?{urlencode(params, safe='*')}"
+    return (method, path)
+
+
+def _scrub(data):
+    if isinstance(data, dict):
+        return {
+            key: SCRUBBED_VALUE if key in SCRUBBED_FIELDS and value else _scrub(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [_scrub(item) for item in data]
+    return data
+
+
+class Cassette:
+    """Collection of recorded responses, stored as gzipped JSON file."""
+
+    def __init__(self, path, mode):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {MODES}")
+        self.path = Path(path)
+        self.mode = mode
+        self._interactions = []
+        self._replays = defaultdict(deque)
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self._load()
+
+    def __len__(self):
+        """Return number of interactions in cassette."""
+        return len(self._interactions)
+
+    def record(self, method, path, response):
+        """Store ``response`` received for request ``method`` ``path``."""
+        interaction = {
+            "method": method,
+            "path": path,
+            "status": response.status_code,
+            "headers": {
+                name: response.headers[name]
+                for name in RECORDED_HEADERS
+                if name in response.headers
+            },
+        }
+        content = response.content or b""
+        try:
+            interaction["json"] = _scrub(json_codec.loads(content))
+        except ValueError:
+            interaction["body"] = base64.b64encode(content).decode("ascii")
+
+        key = match_key(method, path)
+        with self._lock:
+            previous = next(
+                (
+                    i
+                    for i in reversed(self._interactions)
+                    if match_key(i["method"], i["path"]) == key
+                ),
+                None,
+            )
+            # Paths of both may differ in volatile parameters only
+            if previous is None or {**previous, "path": path} != interaction:
+                self._interactions.append(interaction)
+
+    def replay(self, method, path, url):
+        """Return response recorded for request ``method`` ``path``.
+
+        :raises CassetteMissError: If there is no such response in cassette.
+        """
+        with self._lock:
+            responses = self._replays.get(match_key(method, path))
+            if not responses:
+                msg = "Request not found in cassette [method='{}' path='{}' cassette='{}']"
+                raise CassetteMissError(msg.format(method, path, self.path))
+            interaction = responses.popleft() if len(responses) > 1 else responses[0]
+
+        if "json" in interaction:
+            content = json_codec.dumpb(interaction["json"])
+        else:
+            content = base64.b64decode(interaction["body"])
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.reason = HTTPStatus(interaction["status"]).phrase
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        response.headers["Content-Length"] = str(len(content))
+        response._content = content
+        # Lets iter_content() serve streamed requests from content
+        response._content_consumed = True
+        response.url = url
+        response.request = requests.Request(method, url).prepare()
+        return response
+
+    def save(self):
+        """Write recorded interactions to disk."""
+        if not self._interactions:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self.path, "wt", encoding="utf-8") as fh:
+            json_codec.dump({"version": 1, "interactions": self._interactions}, fh)
+        logger.debug("Saved cassette [path=%s interactions=%s]", self.path.as_posix(), len(self))
+
+    def _load(self):
+        if not self.path.exists():
+            logger.warning("Cassette does not exist [path=%s]", self.path.as_posix())
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as fh:
+            self._interactions = json_codec.load(fh)["interactions"]
+        for interaction in self._interactions:
+            self._replays[match_key(interaction["method"], interaction["path"])].append(interaction)
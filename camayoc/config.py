@@ -20,9 +20,17 @@ default_dynaconf_validators = [
     Validator("camayoc.run_scans", default=False),
     Validator("camayoc.scan_timeout", default=600),
     Validator("camayoc.db_cleanup", default=True),
+    Validator("camayoc.cleanup_batch_size", default=500),
+    Validator("camayoc.scan_durations_path", default=None),
+    Validator("camayoc.scan_reuse", default={}),
+    Validator("camayoc.scan_retry", default={}),
+    Validator("camayoc.adaptive_scan_timeout", default={}),
+    Validator("camayoc.scan_polling", default={}),
     Validator("camayoc.snapshot_test_reference_path", default=None),
     Validator("camayoc.snapshot_test_actual_path", default=None),
     Validator("camayoc.snapshot_test_reference_synthetic", default=False),
+    Validator("camayoc.cassette_mode", default=None),
+    Validator("camayoc.cassette_path", default=None),
     Validator("quipucords_server.hostname", default=""),
     Validator("quipucords_server.https", default=False),
     Validator("quipucords_server.port", default=8000),
@@ -30,6 +38,17 @@ default_dynaconf_validators = [
     Validator("quipucords_server.username", default=""),
     Validator("quipucords_server.password", default=""),
     Validator("quipucords_server.ssh_keyfile_path", default=""),
+    Validator("quipucords_server.pool_connections", default=10),
+    Validator("quipucords_server.pool_maxsize", default=10),
+    Validator("quipucords_server.pool_block", default=False),
+    Validator("quipucords_server.keep_alive", default=True),
+    Validator("quipucords_server.token_ttl", default=3600),
+    Validator("quipucords_server.token_renew_before", default=300),
+    Validator("quipucords_server.retry", default={}),
+    Validator("quipucords_server.cache", default={}),
+    Validator("quipucords_server.pagination", default={}),
+    Validator("quipucords_server.rate_limit", default={}),
+    Validator("quipucords_server.identity_map", default={}),
     Validator("quipucords_cli.executable", default="qpc"),
     Validator("quipucords_cli.display_name", default="qpc"),
     Validator("hashicorp_vault", default=None),
@@ -77,6 +77,9 @@ QPC_REPORTS_PATH = "v1/reports/"
 QPC_V2_REPORTS_PATH = "v2/reports/"
 """The path to the v2 reports endpoint, which returns report metadata as JSON."""
 
+QPC_REPORT_DOWNLOAD_CHUNK_SIZE = 2**16
+"""Number of bytes read at once when downloading report tarball."""
+
 QPC_SCAN_TERMINAL_STATES = ("completed", "failed", "canceled")
 """Scans to not change from these states without intervention."""
 
@@ -131,3 +134,20 @@ SOURCE_TYPES_WITH_LIGHTSPEED_SUPPORT = (
     "satellite",
 )
 """Types of sources that can generate lightspeed reports."""
+
+SCAN_DURATION_ESTIMATES = {
+    "openshift": 900,
+    "vcenter": 600,
+    "satellite": 480,
+    "ansible": 300,
+    "rhacs": 300,
+    "network": 120,
+}
+"""Seconds that scan of a source of given type is expected to take.
+
+Used to order scans when there is no history of earlier runs. Network
+scans take additional ``SCAN_DURATION_PER_NETWORK_HOST`` for each host.
+"""
+
+SCAN_DURATION_PER_NETWORK_HOST = 20
+"""Seconds added to expected duration of network scan for each host."""
@@ -1,11 +1,20 @@
 import logging
 import random
+import tarfile
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC
+from datetime import datetime
 from itertools import chain
 from itertools import cycle
+from typing import Optional
 from typing import Sequence
 
 from attrs import evolve
 from littletable import Table
+from requests import RequestException
 
 from camayoc.api import HTTPError
 from camayoc.config import settings
@@ -18,11 +27,19 @@ from camayoc.qpc_models import Report
 from camayoc.qpc_models import Scan
 from camayoc.qpc_models import ScanJob
 from camayoc.qpc_models import Source
+from camayoc.scan_durations import ScanDurations
+from camayoc.scan_durations import job_age
+from camayoc.scan_durations import job_duration
+from camayoc.scan_durations import scan_sources
+from camayoc.scan_watcher import default_watcher
 from camayoc.tests.qpc.utils import get_object_id
 from camayoc.tests.qpc.utils import sort_and_delete
-from camayoc.tests.qpc.utils import wait_until_state
 from camayoc.types.scans import FinishedScan
+from camayoc.types.scans import ScanAttempt
 from camayoc.types.scans import ScanSimplifiedStatusEnum
+from camayoc.types.settings import ScanOptions
+from camayoc.types.settings import ScanRetryOptions
+from camayoc.types.settings import ScanReuseOptions
 from camayoc.utils import expected_data_has_attribute
 from camayoc.utils import uuid4
 
@@ -209,10 +226,53 @@ class DataProvider:
 
 
 class ScanContainer:
-    def __init__(self, data_provider: DataProvider, scans=settings.scans):
+    """Scans defined in settings, run at most once per session.
+
+    Each scan is run by a worker in a thread pool: worker waits for scan
+    job to finish and downloads its reports. Every scan has its own
+    :class:`concurrent.futures.Future`, so callers get results of scans
+    they asked for as soon as these are ready, while other scans keep
+    running in the background. Worker of a failed scan creates its job
+    again, within limits set by ``camayoc.scan_retry`` setting.
+
+    Call :meth:`close` when scans are no longer needed; workers stop
+    waiting for jobs that are still running.
+    """
+
+    def __init__(
+        self,
+        data_provider: DataProvider,
+        scans=settings.scans,
+        durations: Optional[ScanDurations] = None,
+        reuse: Optional[ScanReuseOptions] = None,
+        retry: Optional[ScanRetryOptions] = None,
+    ):
         self._dp = data_provider
         self._scan_definitions = scans
-        self._finished_scans: dict[str, FinishedScan] = {}
+        self._durations = durations
+        self._reuse = reuse or settings.camayoc.scan_reuse
+        self._retry = retry or settings.camayoc.scan_retry
+        self._scans: dict[str, Future[FinishedScan]] = {}
+        # Jobs run one after another, so job may wait in the queue for all
+        # jobs created before it
+        self._queue_timeout = 0.0
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+        # Futures of scan jobs that workers wait for, see ScanJobWatcher.watch()
+        self._watches: set[Future[dict]] = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(scans)), thread_name_prefix="camayoc-scan"
+        )
+
+    @property
+    def data_provider(self) -> DataProvider:
+        return self._dp
+
+    @property
+    def durations(self) -> ScanDurations:
+        if self._durations is None:
+            self._durations = ScanDurations.from_settings()
+        return self._durations
 
     def all(self) -> dict[str, FinishedScan]:
         all_scans = [scan.name for scan in self._scan_definitions]
@@ -235,14 +295,38 @@ class ScanContainer:
 
         return self._get_or_run_scans(scans=wanted_scans, ok_only=True)
 
+    def start(self, scans: Optional[Sequence[str]] = None) -> dict[str, Future[FinishedScan]]:
+        """Start scans that were not started yet, without waiting for them.
+
+        :param scans: Names of scans to start. Defaults to all scans.
+        :returns: Futures of requested scans, keyed by scan name.
+        """
+        if scans is None:
+            scans = [scan.name for scan in self._scan_definitions]
+        with self._lock:
+            self._sync_finished_scans_with_dp()
+            self._ensure_wanted_scans_started(scans)
+            return {name: future for name, future in self._scans.items() if name in scans}
+
+    def close(self):
+        """Stop workers and wait until they finish.
+
+        Scans that were not started are cancelled. Running scans stop
+        waiting for their jobs and fail without being retried; jobs keep
+        running on the server.
+        """
+        with self._lock:
+            self._closed.set()
+            watches = list(self._watches)
+        for future in watches:
+            default_watcher().cancel(future, "Scan container was closed")
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
     def _get_or_run_scans(self, scans: Sequence[str], ok_only=False) -> dict[str, FinishedScan]:
         logger.debug("Called ScanContainer._get_or_run_scans [scans=%s ok_only=%s]", scans, ok_only)
-        self._sync_finished_scans_with_dp()
-        self._ensure_wanted_scans_finished(scans)
+        futures = self.start(scans)
 
-        scans_to_return = [
-            scan for scan_name, scan in self._finished_scans.items() if scan_name in scans
-        ]
+        scans_to_return = [future.result() for future in futures.values()]
 
         if ok_only:
             scans_to_return = [
@@ -257,7 +341,7 @@ class ScanContainer:
 
     def _sync_finished_scans_with_dp(self) -> None:
         dp_scans = set(self._dp.scans._created_models.keys())
-        finished_scans = set(self._finished_scans.keys())
+        finished_scans = set(self._scans.keys())
         missing_in_dp = finished_scans - dp_scans
         if missing_in_dp:
             logger.warning(
@@ -269,30 +353,43 @@ class ScanContainer:
                 missing_in_dp,
             )
         for extra_scan in missing_in_dp:
-            self._finished_scans.pop(extra_scan)
+            self._scans.pop(extra_scan)
 
-    def _ensure_wanted_scans_finished(self, scans: Sequence[str]):
-        finished_scans = set(self._finished_scans.keys())
+    def _ensure_wanted_scans_started(self, scans: Sequence[str]):
+        started_scans = set(self._scans.keys())
         wanted_scans = set(scans)
-        wanted_diff = wanted_scans - finished_scans
+        wanted_diff = wanted_scans - started_scans
 
         if not wanted_diff:
             return
 
-        all_scans = self._run_scans(wanted_diff)
-        for scan in all_scans:
-            scan_name = scan.definition.name
-            self._finished_scans[scan_name] = scan
-
-    def _run_scans(self, wanted_scans: set[str]) -> list[FinishedScan]:
-        started_scans = []
-        for scan_definition in self._scan_definitions:
-            if scan_definition.name not in wanted_scans:
-                continue
+        self._scans.update(self._run_scans(wanted_diff))
 
+    def _run_scans(self, wanted_scans: set[str]) -> dict[str, Future[FinishedScan]]:
+        futures = {}
+        # Quipucords runs jobs in order of creation; starting the longest
+        # scans first shortens time until all of them are finished
+        scan_definitions = sorted(
+            (scan for scan in self._scan_definitions if scan.name in wanted_scans),
+            key=self.durations.expected,
+            reverse=True,
+        )
+        for scan_definition in scan_definitions:
             scan = self._dp.scans.defined_one({"name": scan_definition.name})
+            if self._reuse.enabled and (job := self._reusable_job(scan, scan_definition)):
+                logger.info("Reusing scanjob %s for scan %s", job["id"], scan_definition.name)
+                scan = FinishedScan(
+                    scan_id=scan._id,
+                    scan_job_id=job["id"],
+                    status=ScanSimplifiedStatusEnum.CREATED,
+                    definition=scan_definition,
+                    reused=True,
+                )
+                futures[scan_definition.name] = self._executor.submit(self._finish_scan, scan)
+                continue
             scanjob = ScanJob(scan_id=scan._id)
             scanjob.create()
+            self._queue_timeout += self.durations.timeout(scan_definition)
             logger.info("Started scanjob %s for scan %s", scanjob._id, scan_definition.name)
             scan = FinishedScan(
                 scan_id=scan._id,
@@ -300,51 +397,199 @@ class ScanContainer:
                 status=ScanSimplifiedStatusEnum.CREATED,
                 definition=scan_definition,
             )
-            started_scans.append(scan)
+            futures[scan_definition.name] = self._executor.submit(self._finish_scan, scan)
 
-        all_scans = []
-        for scan in started_scans:
+        return futures
+
+    def _reusable_job(self, scan: Scan, definition: ScanOptions) -> Optional[dict]:
+        """Return JSON of completed job of ``scan`` that is fresh enough to reuse."""
+        job = (
+            ScanJob.objects(scan.client, scan_id=scan._id)
+            .filter(status="completed")
+            .order_by("-end_time")
+            .first()
+        )
+        # Status is checked again in case server ignores the filter
+        if not job or job.get("status") != "completed":
+            return None
+        age = job_age(job)
+        if age is None or age > self._reuse.max_age:
+            logger.debug("Not reusing scanjob %s: finished too long ago", job["id"])
+            return None
+        try:
+            if self._reuse.same_sources and not self._has_defined_sources(scan, definition):
+                logger.debug("Not reusing scanjob %s: sources differ from definitions", job["id"])
+                return None
+            if self._reuse.report_available and not self._has_report(scan, job):
+                logger.debug("Not reusing scanjob %s: report is not available", job["id"])
+                return None
+        except HTTPError:
+            logger.debug("Not reusing scanjob %s", job["id"], exc_info=True)
+            return None
+        return job
+
+    def _has_report(self, scan: Scan, job: dict) -> bool:
+        """Check that report of ``job`` can be downloaded."""
+        if not job.get("report_id"):
+            return False
+        response = Report(client=scan.client, _id=job["report_id"]).read()
+        response.raise_for_status()
+        return bool(response.json().get("can_download"))
+
+    def _has_defined_sources(self, scan: Scan, definition: ScanOptions) -> bool:
+        """Check that sources of ``scan`` on the server match their definitions."""
+        response = scan.read()
+        response.raise_for_status()
+        server_sources = response.json().get("sources", [])
+        defined_sources = {source.name: source for source in scan_sources(definition)}
+        if len(server_sources) != len(defined_sources):
+            return False
+        for server_source in server_sources:
+            source_definition = defined_sources.get(server_source.get("name"))
+            if source_definition is None:
+                return False
+            response = Source(client=scan.client, _id=server_source["id"]).read()
+            response.raise_for_status()
+            source = response.json()
+            if source.get("source_type") != source_definition.type or sorted(
+                source.get("hosts", [])
+            ) != sorted(source_definition.hosts):
+                return False
+        return True
+
+    def _finish_scan(self, scan: FinishedScan) -> FinishedScan:
+        started_at = time.monotonic()
+        while True:
+            attempt_started_at = time.monotonic()
+            attempt_started_on = datetime.now(UTC)
+            finished_scan, failure = self._run_attempt(scan)
+            attempt = ScanAttempt(
+                scan_job_id=scan.scan_job_id,
+                outcome=failure or "completed",
+                started_at=attempt_started_on,
+                duration=time.monotonic() - attempt_started_at,
+                error=finished_scan.error,
+            )
+            finished_scan = evolve(finished_scan, attempts=(*scan.attempts, attempt))
+            if not self._should_retry(finished_scan, failure, started_at):
+                return finished_scan
+            scanjob = ScanJob(scan_id=scan.scan_id)
             try:
-                scanjob = ScanJob(_id=scan.scan_job_id)
-                wait_until_state(scanjob)
-                report = Report()
-                report.retrieve_from_scan_job(scan_job_id=scanjob._id)
-                report_metadata = report.read().json()
-                report_origin = report_metadata.get("origin")
-                report_can_download = report_metadata.get("can_download")
-                details_report = report.details().json()
-                deployments_report = report.deployments().json()
-                aggregate_report = report.aggregate().json()
-                finished_scan = evolve(
-                    scan,
-                    status=ScanSimplifiedStatusEnum.COMPLETED,
-                    report_id=report._id,
-                    report_origin=report_origin,
-                    report_can_download=report_can_download,
-                    details_report=details_report,
-                    deployments_report=deployments_report,
-                    aggregate_report=aggregate_report,
-                )
-                logger.info(
-                    "Finished scanjob %s for scan %s", scan.scan_job_id, scan.definition.name
-                )
-            except (
-                WaitTimeError,
-                StoppedScanException,
-                HTTPError,
-                ScanJobWithoutReportException,
-            ) as e:
-                finished_scan = evolve(
-                    scan,
-                    status=ScanSimplifiedStatusEnum.FAILED,
-                    error=e,
-                )
-                logger.warning(
-                    "Encountered error when running scanjob %s for scan %s",
-                    scan.scan_job_id,
-                    scan.definition.name,
-                    exc_info=True,
-                )
-            all_scans.append(finished_scan)
+                if failure == "timeout":
+                    # Hung job would keep the server busy while new one runs
+                    ScanJob(_id=scan.scan_job_id, scan_id=scan.scan_id).cancel()
+                scanjob.create()
+            except RequestException:
+                # Failure of the last attempt is reported, not this one
+                logger.warning("Unable to re-run scan %s", scan.definition.name, exc_info=True)
+                return finished_scan
+            with self._lock:
+                self._queue_timeout += self.durations.timeout(scan.definition)
+            logger.info(
+                "Started scanjob %s for scan %s (attempt %d)",
+                scanjob._id,
+                scan.definition.name,
+                len(finished_scan.attempts) + 1,
+            )
+            scan = FinishedScan(
+                scan_id=scan.scan_id,
+                scan_job_id=scanjob._id,
+                status=ScanSimplifiedStatusEnum.CREATED,
+                definition=scan.definition,
+                attempts=finished_scan.attempts,
+            )
 
-        return all_scans
+    def _should_retry(self, scan: FinishedScan, failure: Optional[str], started_at: float) -> bool:
+        """Decide if failed ``scan`` should be run again."""
+        if failure is None or failure not in self._retry.retry_on:
+            return False
+        if self._closed.is_set():
+            logger.info("Not re-running scan %s: scan container is closed", scan.definition.name)
+            return False
+        if len(scan.attempts) >= self._retry.max_attempts:
+            return False
+        if time.monotonic() - started_at >= self._retry.time_budget:
+            logger.info("Not re-running scan %s: out of time budget", scan.definition.name)
+            return False
+        return True
+
+    def _wait_for_job(self, scanjob: ScanJob, definition: ScanOptions) -> dict:
+        """Wait until ``scanjob`` ends and return its JSON.
+
+        Waiting is interrupted by :meth:`close` with ``StoppedScanException``.
+        """
+        watcher = default_watcher()
+        future = watcher.watch(
+            scanjob,
+            timeout=self.durations.timeout(definition),
+            expected_duration=self.durations.expected(definition),
+            max_queue_wait=self._queue_timeout,
+        )
+        with self._lock:
+            self._watches.add(future)
+            if self._closed.is_set():
+                watcher.cancel(future, "Scan container was closed")
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._watches.discard(future)
+
+    def _run_attempt(self, scan: FinishedScan) -> tuple[FinishedScan, Optional[str]]:
+        """Wait for scan job of ``scan`` and read its report.
+
+        :returns: Finished scan, and category of failure or None if scan
+            completed (see ``ScanAttempt.outcome``).
+        """
+        failure = "error"
+        try:
+            scanjob = ScanJob(_id=scan.scan_job_id, scan_id=scan.scan_id)
+            if not scan.reused:
+                started_at = time.monotonic()
+                job = self._wait_for_job(scanjob, scan.definition)
+                if job["status"] != "completed":
+                    failure = job["status"]
+                    raise StoppedScanException(
+                        f"Scanjob with ID={scanjob._id} ended in state {job['status']}: "
+                        f"{job.get('status_message')}"
+                    )
+                # Failed jobs usually end early, so only completed ones are recorded
+                duration = job_duration(job) or time.monotonic() - started_at
+                self.durations.record(scan.definition, duration)
+            report = Report()
+            report.retrieve_from_scan_job(scan_job_id=scanjob._id)
+            report_metadata = report.read().json()
+            report_origin = report_metadata.get("origin")
+            report_can_download = report_metadata.get("can_download")
+            report_bundle = report.bundle()
+            finished_scan = evolve(
+                scan,
+                status=ScanSimplifiedStatusEnum.COMPLETED,
+                report_id=report._id,
+                report_origin=report_origin,
+                report_can_download=report_can_download,
+                report_bundle=report_bundle,
+            )
+            logger.info("Finished scanjob %s for scan %s", scan.scan_job_id, scan.definition.name)
+            return finished_scan, None
+        except (
+            WaitTimeError,
+            StoppedScanException,
+            HTTPError,
+            ScanJobWithoutReportException,
+            tarfile.TarError,
+        ) as e:
+            if isinstance(e, WaitTimeError):
+                failure = "timeout"
+            finished_scan = evolve(
+                scan,
+                status=ScanSimplifiedStatusEnum.FAILED,
+                error=e,
+            )
+            logger.warning(
+                "Encountered error when running scanjob %s for scan %s",
+                scan.scan_job_id,
+                scan.definition.name,
+                exc_info=True,
+            )
+        return finished_scan, failure
@@ -1,11 +1,12 @@
-import io
-import json
 import logging
 import re
+import shutil
 import tarfile
+import tempfile
 from pathlib import Path
 
 from camayoc import api
+from camayoc import json_codec
 from camayoc.constants import DBSERIALIZER_CONNECTIONJOBS_DIR_PATH
 from camayoc.constants import DBSERIALIZER_CREDENTIALS_FILE_PATH
 from camayoc.constants import DBSERIALIZER_REPORTS_DIR_PATH
@@ -29,14 +30,14 @@ class DBSerializer:
 
     def serialize(self):
         self._destination.mkdir(parents=True, exist_ok=True)
-        self._client = api.Client()
-
-        self._serialize_credentials()
-        self._serialize_sources()
-        self._serialize_scans()
-        self._serialize_jobconnectionresults()
-        self._serialize_scanjobs()
-        self._serialize_reports()
+        with api.Client() as client:
+            self._client = client
+            self._serialize_credentials()
+            self._serialize_sources()
+            self._serialize_scans()
+            self._serialize_jobconnectionresults()
+            self._serialize_scanjobs()
+            self._serialize_reports()
 
     def _serialize_credentials(self):
         destination = self._destination / DBSERIALIZER_CREDENTIALS_FILE_PATH
@@ -44,8 +45,7 @@ class DBSerializer:
             return
 
         cred = Credential(client=self._client)
-        all_credentials = self.__list_paged(cred.list)
-        self.__save_json(all_credentials, destination)
+        self.__save_json_items(cred.iter_items(), destination)
 
     def _serialize_sources(self):
         destination = self._destination / DBSERIALIZER_SOURCES_FILE_PATH
@@ -53,8 +53,7 @@ class DBSerializer:
             return
 
         source = Source(client=self._client)
-        all_sources = self.__list_paged(source.list)
-        self.__save_json(all_sources, destination)
+        self.__save_json_items(source.iter_items(), destination)
 
     def _serialize_scans(self):
         destination = self._destination / DBSERIALIZER_SCANS_FILE_PATH
@@ -62,8 +61,7 @@ class DBSerializer:
             return
 
         scan = Scan(client=self._client)
-        all_scans = self.__list_paged(scan.list)
-        self.__save_json(all_scans, destination)
+        self.__save_json_items(scan.iter_items(), destination)
 
     def _serialize_jobconnectionresults(self):
         def gen_job_ids(all_sources):
@@ -72,8 +70,8 @@ class DBSerializer:
                     yield job_id
 
         sources_file = self._destination / DBSERIALIZER_SOURCES_FILE_PATH
-        with sources_file.open() as fh:
-            all_sources = json.load(fh)
+        with sources_file.open("rb") as fh:
+            all_sources = json_codec.load(fh)
 
         for job_id in gen_job_ids(all_sources):
             sources_destination = self._destination / DBSERIALIZER_CONNECTIONJOBS_DIR_PATH
@@ -84,13 +82,13 @@ class DBSerializer:
                 continue
 
             scanjob = ScanJob(client=self._client, _id=job_id)
-            all_connectionjobs = self.__list_paged(scanjob.connection_results)
-            self.__save_json(all_connectionjobs, destination)
+            all_connectionjobs = scanjob.iter_items(scanjob.connection_results)
+            self.__save_json_items(all_connectionjobs, destination)
 
     def _serialize_scanjobs(self):
         scans_file = self._destination / DBSERIALIZER_SCANS_FILE_PATH
-        with scans_file.open() as fh:
-            all_scans = json.load(fh)
+        with scans_file.open("rb") as fh:
+            all_scans = json_codec.load(fh)
 
         scan_ids = [scan_json.get("id") for scan_json in all_scans]
 
@@ -103,8 +101,7 @@ class DBSerializer:
                 continue
 
             scanjob = ScanJob(client=self._client, scan_id=scan_id)
-            all_scanjobs = self.__list_paged(scanjob.list)
-            self.__save_json(all_scanjobs, destination)
+            self.__save_json_items(scanjob.iter_items(), destination)
 
     def _serialize_reports(self):  # noqa: C901
         def gen_report_ids(all_scans):
@@ -122,42 +119,25 @@ class DBSerializer:
                 if not self.__check_destination(file_destination):
                     continue
                 if tar_fh := tar.extractfile(member):
-                    file_destination.write_bytes(tar_fh.read())
+                    with file_destination.open("wb") as fh:
+                        shutil.copyfileobj(tar_fh, fh)
 
         scans_file = self._destination / DBSERIALIZER_SCANS_FILE_PATH
-        with scans_file.open() as fh:
-            all_scans = json.load(fh)
+        with scans_file.open("rb") as fh:
+            all_scans = json_codec.load(fh)
 
         for report_id in gen_report_ids(all_scans):
             report_destination = self._destination / DBSERIALIZER_REPORTS_DIR_PATH / str(report_id)
             report_destination.mkdir(parents=True, exist_ok=True)
 
             report = Report(client=self._client, _id=report_id)
-            gzip_response = report.reports_gzip()
-            gzip_response.raise_for_status()
-
-            tar_bytes = io.BytesIO(gzip_response.content)
-            with tarfile.open(fileobj=tar_bytes, mode="r:gz") as tar:
-                extractfiles(tar, report_destination, (r"details.*\.json", r"aggregate.*\.json"))
-
-    def __list_paged(self, obj_fn):
-        all_objs = []
-        page = 1
-        while True:
-            payload = {"page": page}
-            http_response = obj_fn(params=payload)
-            http_response.raise_for_status()
-            response_json = http_response.json()
-
-            if results := response_json.get("results"):
-                all_objs.extend(results)
-
-            if not response_json.get("next"):
-                break
-
-            page += 1
-
-        return all_objs
+            with tempfile.TemporaryFile() as tar_file:
+                report.download(tar_file)
+                tar_file.seek(0)
+                with tarfile.open(fileobj=tar_file, mode="r:gz") as tar:
+                    extractfiles(
+                        tar, report_destination, (r"details.*\.json", r"aggregate.*\.json")
+                    )
 
     def __check_destination(self, destination: Path) -> bool:
         may_write = not destination.exists() or self._overwrite
@@ -168,6 +148,13 @@ class DBSerializer:
             )
         return may_write
 
-    def __save_json(self, json_data, destination: Path) -> None:
-        with destination.open("w") as fh:
-            json.dump(json_data, fh)
+    def __save_json_items(self, items, destination: Path) -> None:
+        # Written item by item, so listing is never held in memory as a whole.
+        # Output is the same as json_codec.dump() of a list.
+        with destination.open("wb") as fh:
+            fh.write(b"[")
+            for index, item in enumerate(items):
+                if index:
+                    fh.write(b",")
+                fh.write(json_codec.dumpb(item))
+            fh.write(b"]")
@@ -1,10 +1,10 @@
 import dataclasses
-import json
 import logging
 from operator import itemgetter
 from pathlib import Path
 from typing import Any
 
+from camayoc import json_codec
 from camayoc.constants import DBSERIALIZER_CONNECTIONJOBS_DIR_PATH
 from camayoc.constants import DBSERIALIZER_CREDENTIALS_FILE_PATH
 from camayoc.constants import DBSERIALIZER_REPORTS_DIR_PATH
@@ -46,20 +46,20 @@ class DBSnapshot:
 
 
 def read_credentials(source: Path) -> list[dict[str, Any]]:
-    with source.open() as fh:
-        all_credentials = json.load(fh)
+    with source.open("rb") as fh:
+        all_credentials = json_codec.load(fh)
     return sorted(all_credentials, key=itemgetter("name"))
 
 
 def read_sources(source: Path) -> list[dict[str, Any]]:
-    with source.open() as fh:
-        all_sources = json.load(fh)
+    with source.open("rb") as fh:
+        all_sources = json_codec.load(fh)
     return sorted(all_sources, key=itemgetter("name"))
 
 
 def read_scans(source: Path) -> list[dict[str, Any]]:
-    with source.open() as fh:
-        all_scans = json.load(fh)
+    with source.open("rb") as fh:
+        all_scans = json_codec.load(fh)
     return sorted(all_scans, key=itemgetter("name"))
 
 
@@ -70,8 +70,8 @@ def read_connection_jobs(source: Path) -> dict[str, Any]:
         if file.is_dir():
             continue
         key = file.stem
-        with file.open() as fh:
-            jobs = json.load(fh)
+        with file.open("rb") as fh:
+            jobs = json_codec.load(fh)
         connection_jobs[key] = sorted(jobs, key=_connection_job_itemgetter)
 
     return connection_jobs
@@ -84,8 +84,8 @@ def read_scan_jobs(source: Path) -> dict[str, Any]:
         if file.is_dir():
             continue
         key = file.stem
-        with file.open() as fh:
-            jobs = json.load(fh)
+        with file.open("rb") as fh:
+            jobs = json_codec.load(fh)
         scan_jobs[key] = sorted(jobs, key=itemgetter("id"))
 
     return scan_jobs
@@ -111,8 +111,8 @@ def _read_report_directory(directory: Path):
 
 
 def _read_report_details(file: Path):
-    with file.open() as fh:
-        data = json.load(fh)
+    with file.open("rb") as fh:
+        data = json_codec.load(fh)
 
     sources = data.get("sources", [])
     sources.sort(key=itemgetter("source_name"))
@@ -124,8 +124,8 @@ def _read_report_details(file: Path):
 
 
 def _read_report_aggregate(file: Path):
-    with file.open() as fh:
-        data = json.load(fh)
+    with file.open("rb") as fh:
+        data = json_codec.load(fh)
     return data
 
 
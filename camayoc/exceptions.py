@@ -52,6 +52,22 @@ class ScanJobWithoutReportException(Exception):
     """
 
 
+class ReportDownloadError(Exception):
+    """Raised when downloaded report does not have expected size or checksum.
+
+    Raised by Report.download(). Partially written file is removed before
+    exception is raised, but data already written to file-like objects is not.
+    """
+
+
+class CassetteMissError(Exception):
+    """Raised when replayed cassette does not have response for a request.
+
+    Usually that means cassette was recorded for different set of tests, or
+    that test started to send new requests. Record cassette again.
+    """
+
+
 class MisconfiguredWidgetException(Exception):
     """Raised by UI Widget when expected property is not there."""
 
@@ -0,0 +1,784 @@
+"""Local stand-in for quipucords API server.
+
+:class:`FakeServer` implements the part of quipucords API that camayoc uses:
+authentication, credentials, sources, scans, scan jobs (with connection and
+inspection results) and reports, including gzip tarball download. All data
+is kept in memory. Scan jobs do not connect anywhere - they finish after
+``scan_duration`` seconds, with one fake system per host of each source.
+
+Server can add ``latency`` to every response and fail ``failure_rate`` of
+requests with ``failure_status``, so retries and throughput of camayoc
+client code can be measured without real quipucords and scan targets.
+JSON responses carry ``ETag`` header and conditional GET requests with
+matching ``If-None-Match`` are answered with 304 Not Modified.
+It can be seeded with data saved by :class:`camayoc.db_serializer.DBSerializer`.
+
+Example::
+    >>> with FakeServer(FakeServerOptions(latency=0.05)) as server:
+    ...     client = api.Client(config=server.client_config())
+    ...     Credential(client=client, cred_type="network", password="foo").create()
+
+Server can be also started from command line with ``scripts/fake-server.py``.
+"""
+
+import hashlib
+import io
+import logging
+import random
+import re
+import tarfile
+import threading
+import time
+import uuid
+from datetime import UTC
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+
+from attrs import frozen
+
+from camayoc import json_codec
+from camayoc.constants import DBSERIALIZER_CONNECTIONJOBS_DIR_PATH
+from camayoc.constants import DBSERIALIZER_CREDENTIALS_FILE_PATH
+from camayoc.constants import DBSERIALIZER_REPORTS_DIR_PATH
+from camayoc.constants import DBSERIALIZER_SCANJOBS_DIR_PATH
+from camayoc.constants import DBSERIALIZER_SCANS_FILE_PATH
+from camayoc.constants import DBSERIALIZER_SOURCES_FILE_PATH
+from camayoc.constants import QPC_API_ROOT
+from camayoc.types.settings import QuipucordsServerOptions
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 1000
+REPORT_VERSION = "1.0.0.fake"
+MASKED_VALUE = "********"
+SECRET_FIELDS = ("password", "become_password", "ssh_key", "ssh_passphrase", "auth_token")
+
+COLLECTIONS = {
+    "v2/credentials/": "credentials",
+    "v2/sources/": "sources",
+    "v1/scans/": "scans",
+}
+"""Endpoints with standard CRUD and bulk_delete support, and their collections."""
+
+TYPE_FIELDS = {"credentials": "cred_type", "sources": "source_type", "scans": "scan_type"}
+
+
+@frozen
+class FakeServerOptions:
+    """Behavior of :class:`FakeServer`."""
+
+    username: str = "admin"
+    password: str = "pass"
+    # Default number of objects on a page of listing
+    page_size: int = 10
+    # Seconds that scan job is running before it completes
+    scan_duration: float = 0.0
+    # Seconds added to every response
+    latency: float = 0.0
+    # Fraction of requests that fail with failure_status
+    failure_rate: float = 0.0
+    failure_status: int = 503
+    seed_path: Path | None = None
+
+
+class FakeHTTPError(Exception):
+    """Raised by request handlers to send error response."""
+
+    def __init__(self, status, body):
+        super().__init__(status, body)
+        self.status = status
+        self.body = body if isinstance(body, dict) else {"detail": body}
+
+
+@frozen
+class FakeRequest:
+    method: str
+    # Path relative to API root, e.g. v2/sources/1/
+    path: str
+    params: dict
+    body: object
+    base_url: str
+    token: str | None = None
+
+
+def _now():
+    return datetime.now(UTC).isoformat()
+
+
+def _masked(record):
+    return {
+        key: MASKED_VALUE if key in SECRET_FIELDS and value else value
+        for key, value in record.items()
+    }
+
+
+def _related_ids(items):
+    """Convert list of related objects (as returned by API) to list of ids."""
+    return [item["id"] if isinstance(item, dict) else item for item in items or []]
+
+
+def _ordered(records, ordering):
+    """Sort records by comma-separated fields, as in DRF ``ordering`` parameter."""
+    records = sorted(records, key=lambda record: record["id"])
+    for field in reversed((ordering or "").split(",")):
+        if not field:
+            continue
+        name = field.removeprefix("-")
+        records.sort(
+            key=lambda record: (record.get(name) is None, record.get(name)),
+            reverse=field.startswith("-"),
+        )
+    return records
+
+
+def _tarball(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, data in files.items():
+            content = json_codec.dumpb(data)
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+class FakeQuipucords:
+    """In-memory state of fake server, and handlers of API requests."""
+
+    def __init__(self, options=None):
+        self.options = options or FakeServerOptions()
+        self.lock = threading.RLock()
+        self.tokens = set()
+        self.data = {name: {} for name in (*COLLECTIONS.values(), "jobs", "reports")}
+        self.connection_results = {}
+        self.inspection_results = {}
+        self._last_ids = {name: 0 for name in self.data}
+        self._routes = self._build_routes()
+        if self.options.seed_path:
+            self.seed(self.options.seed_path)
+
+    def _build_routes(self):
+        routes = [
+            ("POST", r"v1/token/", self.login),
+            ("PUT", r"v1/users/logout/", self.logout),
+            ("GET", r"v1/users/current/", self.current_user),
+            ("POST", r"v1/scans/(?P<scan_id>\d+)/jobs/", self.create_job),
+            ("GET", r"v1/scans/(?P<scan_id>\d+)/jobs/", self.list_scan_jobs),
+            ("GET", r"v1/jobs/(?P<job_id>\d+)/", self.read_job),
+            ("PUT", r"v1/jobs/(?P<job_id>\d+)/cancel/", self.cancel_job),
+            ("GET", r"v1/jobs/(?P<job_id>\d+)/connection/", self.job_connection_results),
+            ("GET", r"v1/jobs/(?P<job_id>\d+)/inspection/", self.job_inspection_results),
+            ("GET", r"v1/reports/(?P<report_id>\d+)/", self.report_tarball),
+            ("GET", r"v1/reports/(?P<report_id>\d+)/insights/", self.report_tarball),
+            (
+                "GET",
+                r"v1/reports/(?P<report_id>\d+)/(?P<part>details|deployments|aggregate)/",
+                self.report_part,
+            ),
+            ("GET", r"v2/reports/(?P<report_id>\d+)/", self.report_metadata),
+        ]
+        for prefix, collection in COLLECTIONS.items():
+            routes.extend(
+                [
+                    ("GET", prefix, self.list_objects, collection),
+                    ("POST", prefix, self.create_object, collection),
+                    ("POST", prefix + "bulk_delete/", self.bulk_delete, collection),
+                    ("GET", prefix + r"(?P<object_id>\d+)/", self.read_object, collection),
+                    ("PUT", prefix + r"(?P<object_id>\d+)/", self.update_object, collection),
+                    ("PATCH", prefix + r"(?P<object_id>\d+)/", self.update_object, collection),
+                    ("DELETE", prefix + r"(?P<object_id>\d+)/", self.delete_object, collection),
+                ]
+            )
+        return [(method, re.compile(pattern), *handler) for method, pattern, *handler in routes]
+
+    def handle(self, request):
+        """Return status code, body and headers of response to ``request``."""
+        # Django redirects to URL with trailing slash, we serve it right away
+        path = request.path if request.path.endswith("/") else request.path + "/"
+        allowed_methods = []
+        for method, pattern, handler, *args in self._routes:
+            if not (match := pattern.fullmatch(path)):
+                continue
+            allowed_methods.append(method)
+            if method != request.method:
+                continue
+            if handler != self.login and not self._authorized(request):
+                raise FakeHTTPError(HTTPStatus.UNAUTHORIZED, "Invalid token")
+            ids = {key: int(value) for key, value in match.groupdict().items() if value.isdigit()}
+            other = {key: value for key, value in match.groupdict().items() if not value.isdigit()}
+            with self.lock:
+                return handler(request, *args, **ids, **other)
+        if allowed_methods:
+            raise FakeHTTPError(
+                HTTPStatus.METHOD_NOT_ALLOWED, f'Method "{request.method}" not allowed.'
+            )
+        raise FakeHTTPError(HTTPStatus.NOT_FOUND, "Not found.")
+
+    def _authorized(self, request):
+        return request.token in self.tokens
+
+    def _next_id(self, collection):
+        self._last_ids[collection] += 1
+        return self._last_ids[collection]
+
+    def _get(self, collection, object_id):
+        try:
+            return self.data[collection][object_id]
+        except KeyError:
+            raise FakeHTTPError(HTTPStatus.NOT_FOUND, "Not found.") from None
+
+    def _paginate(self, request, items):
+        try:
+            page = int(request.params.get("page", 1))
+            page_size = min(
+                int(request.params.get("page_size", self.options.page_size)), MAX_PAGE_SIZE
+            )
+        except ValueError:
+            raise FakeHTTPError(HTTPStatus.NOT_FOUND, "Invalid page.") from None
+        start = (page - 1) * page_size
+        if page < 1 or (start and start >= len(items)):
+            raise FakeHTTPError(HTTPStatus.NOT_FOUND, "Invalid page.")
+
+        def link(number):
+            params = {**request.params, "page": number}
+            return f"{request.base_url}{request.path}?{urlencode(params)}"
+
+        return {
+            "count": len(items),
+            "next": link(page + 1) if start + page_size < len(items) else None,
+            "previous": link(page - 1) if page > 1 else None,
+            "results": items[start : start + page_size],
+        }
+
+    # Authentication
+
+    def login(self, request):
+        body = request.body or {}
+        if (body.get("username"), body.get("password")) != (
+            self.options.username,
+            self.options.password,
+        ):
+            msg = {"non_field_errors": ["Unable to log in with provided credentials."]}
+            raise FakeHTTPError(HTTPStatus.BAD_REQUEST, msg)
+        token = uuid.uuid4().hex
+        self.tokens.add(token)
+        return HTTPStatus.OK, {"token": token}
+
+    def logout(self, request):
+        self.tokens.discard(request.token)
+        return HTTPStatus.OK, {}
+
+    def current_user(self, request):
+        return HTTPStatus.OK, {"username": self.options.username}
+
+    # Credentials, sources and scans
+
+    def render(self, collection, record):
+        """Return representation of ``record`` sent by the server."""
+        match collection:
+            case "credentials":
+                return _masked(record)
+            case "sources":
+                credentials = [self.data["credentials"].get(i) for i in record["credentials"]]
+                job = self.data["jobs"].get(record.get("connection_job_id"))
+                rendered = {k: v for k, v in record.items() if k != "connection_job_id"}
+                rendered["credentials"] = [
+                    {"id": c["id"], "name": c["name"], "cred_type": c.get("cred_type")}
+                    for c in credentials
+                    if c
+                ]
+                rendered["connection"] = self._job_summary(job) if job else None
+                return rendered
+            case "scans":
+                sources = [self.data["sources"].get(i) for i in record["sources"]]
+                jobs = [job for job in self.data["jobs"].values() if job["scan_id"] == record["id"]]
+                rendered = dict(record)
+                rendered["sources"] = [
+                    {"id": s["id"], "name": s["name"], "source_type": s["source_type"]}
+                    for s in sources
+                    if s
+                ]
+                rendered["jobs"] = [
+                    {"id": job["id"], "report_id": job.get("report_id")} for job in jobs
+                ]
+                rendered["most_recent"] = self._job_summary(jobs[-1]) if jobs else None
+                return rendered
+        return record
+
+    def _validate(self, collection, body, object_id=None):
+        required = {
+            "credentials": ("name", "cred_type"),
+            "sources": ("name", "source_type", "hosts", "credentials"),
+            "scans": ("name", "sources"),
+        }[collection]
+        errors = {field: ["This field is required."] for field in required if not body.get(field)}
+        name = body.get("name")
+        for record in self.data[collection].values():
+            if name and record["name"] == name and record["id"] != object_id:
+                errors["name"] = [f"{collection[:-1]} with this name already exists."]
+        if errors:
+            raise FakeHTTPError(HTTPStatus.BAD_REQUEST, errors)
+
+    def _normalize(self, collection, body):
+        record = dict(body)
+        if collection == "sources":
+            record["credentials"] = _related_ids(record.get("credentials"))
+            record.setdefault("port", 22 if record.get("source_type") == "network" else 443)
+        if collection == "scans":
+            record["sources"] = _related_ids(record.get("sources"))
+            record.setdefault("scan_type", "inspect")
+            record.setdefault("options", {"max_concurrency": 25})
+        return record
+
+    def list_objects(self, request, collection):
+        records = list(self.data[collection].values())
+        if search := request.params.get("search_by_name"):
+            records = [r for r in records if search.lower() in r["name"].lower()]
+        if search := request.params.get("name"):
+            records = [r for r in records if r["name"] == search]
+        type_field = TYPE_FIELDS[collection]
+        if value := request.params.get(type_field):
+            records = [r for r in records if r.get(type_field) == value]
+        page = self._paginate(request, _ordered(records, request.params.get("ordering")))
+        page["results"] = [self.render(collection, record) for record in page["results"]]
+        return HTTPStatus.OK, page
+
+    def create_object(self, request, collection):
+        body = request.body or {}
+        self._validate(collection, body)
+        record = self._normalize(collection, body)
+        record["id"] = self._next_id(collection)
+        self.data[collection][record["id"]] = record
+        return HTTPStatus.CREATED, self.render(collection, record)
+
+    def read_object(self, request, collection, object_id):
+        return HTTPStatus.OK, self.render(collection, self._get(collection, object_id))
+
+    def update_object(self, request, collection, object_id):
+        record = self._get(collection, object_id)
+        updated = {**record, **(request.body or {}), "id": object_id}
+        if request.method == "PUT":
+            self._validate(collection, updated, object_id)
+        record.update(self._normalize(collection, updated))
+        return HTTPStatus.OK, self.render(collection, record)
+
+    def delete_object(self, request, collection, object_id):
+        self._get(collection, object_id)
+        del self.data[collection][object_id]
+        return HTTPStatus.NO_CONTENT, None
+
+    def bulk_delete(self, request, collection):
+        ids = (request.body or {}).get("ids")
+        if ids == "all":
+            ids = list(self.data[collection])
+        if not isinstance(ids, list):
+            raise FakeHTTPError(HTTPStatus.BAD_REQUEST, {"ids": ["This field is required."]})
+        deleted = [i for i in ids if self.data[collection].pop(i, None) is not None]
+        missing = [i for i in ids if i not in deleted]
+        message = f"Deleted {len(deleted)} {collection}."
+        return HTTPStatus.OK, {
+            "message": message,
+            "deleted": deleted,
+            "missing": missing,
+            "skipped": [],
+        }
+
+    # Scan jobs
+
+    def _job_summary(self, job):
+        self._advance(job)
+        return {
+            "id": job["id"],
+            "scan_id": job["scan_id"],
+            "status": job["status"],
+            "status_message": job.get("status_message", ""),
+            "report_id": job.get("report_id"),
+            "start_time": job.get("start_time"),
+            "end_time": job.get("end_time"),
+        }
+
+    def _render_job(self, job):
+        scan = self.data["scans"].get(job["scan_id"], {})
+        rendered = self._job_summary(job)
+        rendered["scan"] = {"id": job["scan_id"], "name": scan.get("name")}
+        rendered["scan_type"] = scan.get("scan_type", "inspect")
+        rendered["systems_count"] = len(self.inspection_results.get(job["id"], []))
+        rendered["systems_scanned"] = rendered["systems_count"]
+        rendered["systems_failed"] = 0
+        rendered["systems_unreachable"] = 0
+        return rendered
+
+    def _advance(self, job):
+        """Move job forward in its life cycle, based on time that passed."""
+        if job["status"] not in ("created", "running") or "started_at" not in job:
+            return
+        if time.monotonic() - job["started_at"] < self.options.scan_duration:
+            job["status"] = "running"
+            return
+        self._complete(job)
+
+    def _complete(self, job):
+        scan = self.data["scans"].get(job["scan_id"], {})
+        sources = [
+            self.data["sources"][i] for i in scan.get("sources", []) if i in self.data["sources"]
+        ]
+        report_id = self._next_id("reports")
+        connection, inspection, facts, fingerprints = [], [], {}, []
+        for source in sources:
+            source_ref = {
+                "id": source["id"],
+                "name": source["name"],
+                "source_type": source["source_type"],
+            }
+            credential = self.data["credentials"].get(next(iter(source["credentials"]), None), {})
+            credential_ref = {"id": credential.get("id"), "name": credential.get("name")}
+            source["connection_job_id"] = job["id"]
+            for host in source["hosts"]:
+                connection.append(
+                    {
+                        "name": host,
+                        "status": "success",
+                        "source": source_ref,
+                        "credential": credential_ref,
+                    }
+                )
+                inspection.append({"name": host, "status": "success", "source": source_ref})
+                facts.setdefault(source["name"], []).append(
+                    {"hostname": host, "ip_addresses": [host]}
+                )
+                fingerprints.append(
+                    {
+                        "name": host,
+                        "ip_addresses": [host],
+                        "sources": [
+                            {"source_name": source["name"], "source_type": source["source_type"]}
+                        ],
+                    }
+                )
+        self.connection_results[job["id"]] = connection
+        self.inspection_results[job["id"]] = inspection
+
+        common = {
+            "report_id": report_id,
+            "report_version": REPORT_VERSION,
+            "report_platform_id": str(uuid.uuid4()),
+        }
+        self.data["reports"][report_id] = {
+            "id": report_id,
+            "details": {
+                **common,
+                "report_type": "details",
+                "sources": [
+                    {
+                        "report_version": REPORT_VERSION,
+                        "source_name": source["name"],
+                        "source_type": source["source_type"],
+                        "facts": facts.get(source["name"], []),
+                    }
+                    for source in sources
+                ],
+            },
+            "deployments": {
+                **common,
+                "report_type": "deployments",
+                "status": "complete",
+                "system_fingerprints": fingerprints,
+            },
+            "aggregate": {"results": {"instances_total": len(fingerprints)}, "diagnostics": {}},
+        }
+        job.update(
+            status="completed",
+            status_message="Job is complete.",
+            report_id=report_id,
+            end_time=_now(),
+        )
+
+    def create_job(self, request, scan_id):
+        self._get("scans", scan_id)
+        job_id = self._next_id("jobs")
+        job = {
+            "id": job_id,
+            "scan_id": scan_id,
+            "status": "created",
+            "start_time": _now(),
+            "started_at": time.monotonic(),
+        }
+        self.data["jobs"][job_id] = job
+        return HTTPStatus.CREATED, self._render_job(job)
+
+    def list_scan_jobs(self, request, scan_id):
+        self._get("scans", scan_id)
+        jobs = [
+            self._render_job(job) for job in self.data["jobs"].values() if job["scan_id"] == scan_id
+        ]
+        for field in ("status", "scan_type"):
+            if value := request.params.get(field):
+                jobs = [job for job in jobs if job[field] == value]
+        page = self._paginate(request, _ordered(jobs, request.params.get("ordering")))
+        return HTTPStatus.OK, page
+
+    def read_job(self, request, job_id):
+        return HTTPStatus.OK, self._render_job(self._get("jobs", job_id))
+
+    def cancel_job(self, request, job_id):
+        job = self._get("jobs", job_id)
+        self._advance(job)
+        if job["status"] in ("created", "running"):
+            job.update(status="canceled", status_message="Job was canceled.", end_time=_now())
+        return HTTPStatus.OK, self._render_job(job)
+
+    def job_connection_results(self, request, job_id):
+        self._advance(self._get("jobs", job_id))
+        return HTTPStatus.OK, self._paginate(request, self.connection_results.get(job_id, []))
+
+    def job_inspection_results(self, request, job_id):
+        self._advance(self._get("jobs", job_id))
+        return HTTPStatus.OK, self._paginate(request, self.inspection_results.get(job_id, []))
+
+    # Reports
+
+    def report_part(self, request, report_id, part):
+        return HTTPStatus.OK, self._get("reports", report_id)[part]
+
+    def report_metadata(self, request, report_id):
+        report = self._get("reports", report_id)
+        return HTTPStatus.OK, {
+            "id": report_id,
+            "origin": "local",
+            "can_download": True,
+            "report_version": report["details"].get("report_version", REPORT_VERSION),
+            "report_platform_id": report["details"].get("report_platform_id"),
+        }
+
+    def report_tarball(self, request, report_id):
+        report = self._get("reports", report_id)
+        prefix = f"report_id_{report_id}"
+        files = {
+            f"{prefix}/details.json": report["details"],
+            f"{prefix}/deployments.json": report["deployments"],
+            f"{prefix}/aggregate.json": report["aggregate"],
+        }
+        headers = {
+            "Content-Type": "application/gzip",
+            "Content-Disposition": f'attachment; filename="{prefix}.tar.gz"',
+        }
+        return HTTPStatus.OK, _tarball(files), headers
+
+    # Seeding
+
+    def seed(self, source):
+        """Load data saved by DBSerializer in ``source`` directory."""
+        source = Path(source)
+        self._seed_objects(source)
+        self._seed_jobs(source)
+        self._seed_reports(source / DBSERIALIZER_REPORTS_DIR_PATH)
+        for collection, records in self.data.items():
+            self._last_ids[collection] = max(records, default=0)
+        logger.info(
+            "Seeded fake server [source=%s %s]",
+            source.as_posix(),
+            " ".join(f"{name}={len(records)}" for name, records in self.data.items()),
+        )
+
+    def _seed_objects(self, source):
+        for file_name, collection in (
+            (DBSERIALIZER_CREDENTIALS_FILE_PATH, "credentials"),
+            (DBSERIALIZER_SOURCES_FILE_PATH, "sources"),
+            (DBSERIALIZER_SCANS_FILE_PATH, "scans"),
+        ):
+            if not (path := source / file_name).exists():
+                continue
+            for item in json_codec.loads(path.read_bytes()):
+                record = self._normalize(collection, item)
+                for related in ("connection", "jobs", "most_recent"):
+                    record.pop(related, None)
+                if collection == "sources" and item.get("connection"):
+                    record["connection_job_id"] = item["connection"].get("id")
+                self.data[collection][record["id"]] = record
+
+    def _seed_jobs(self, source):
+        job_fields = ("id", "status", "status_message", "report_id", "start_time", "end_time")
+        for path in sorted((source / DBSERIALIZER_SCANJOBS_DIR_PATH).glob("jobs_*.json")):
+            for item in json_codec.loads(path.read_bytes()):
+                job = {key: item.get(key) for key in job_fields}
+                job["scan_id"] = (item.get("scan") or {}).get("id") or item.get("scan_id")
+                self.data["jobs"][job["id"]] = job
+
+        connection_dir = source / DBSERIALIZER_CONNECTIONJOBS_DIR_PATH
+        for path in sorted(connection_dir.glob("connection_*.json")):
+            job_id = int(path.stem.removeprefix("connection_"))
+            self.connection_results[job_id] = json_codec.loads(path.read_bytes())
+
+    def _seed_reports(self, source):
+        for directory in sorted(source.glob("*")):
+            if not directory.is_dir() or not directory.name.isdigit():
+                continue
+            report_id = int(directory.name)
+            details = next(directory.glob("details*.json"), None)
+            aggregate = next(directory.glob("aggregate*.json"), None)
+            self.data["reports"][report_id] = {
+                "id": report_id,
+                "details": (
+                    json_codec.loads(details.read_bytes())
+                    if details
+                    else {"report_id": report_id, "sources": []}
+                ),
+                # DBSerializer does not save deployments report
+                "deployments": {
+                    "report_id": report_id,
+                    "report_type": "deployments",
+                    "status": "complete",
+                    "system_fingerprints": [],
+                },
+                "aggregate": json_codec.loads(aggregate.read_bytes()) if aggregate else {},
+            }
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "FakeQuipucords/1.0"
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; don't wait for ACK in between
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # noqa: N802
+        self._handle()
+
+    do_POST = do_PUT = do_PATCH = do_DELETE = do_GET  # noqa: N815
+
+    def log_message(self, format, *args):  # noqa: A002
+        logger.debug("Fake server: " + format, *args)
+
+    def _handle(self):
+        fake_server = self.server.fake_server
+        options = fake_server.app.options
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        if options.latency:
+            time.sleep(options.latency)
+
+        split = urlsplit(self.path)
+        root = "/" + QPC_API_ROOT
+        if options.failure_rate and fake_server.random.random() < options.failure_rate:
+            status, body, headers = options.failure_status, {"detail": "Injected failure"}, {}
+        elif not split.path.startswith(root):
+            status, body, headers = HTTPStatus.NOT_FOUND, {"detail": "Not found."}, {}
+        else:
+            auth_type, _, token = (self.headers.get("Authorization") or "").partition(" ")
+            try:
+                request = FakeRequest(
+                    method=self.command,
+                    path=split.path[len(root) :],
+                    params=dict(parse_qsl(split.query)),
+                    body=json_codec.loads(raw_body) if raw_body else None,
+                    base_url=f"http://{self.headers.get('Host')}{root}",
+                    token=token if auth_type == "Token" else None,
+                )
+                status, body, *extra = fake_server.app.handle(request)
+                headers = extra[0] if extra else {}
+            except FakeHTTPError as e:
+                status, body, headers = e.status, e.body, {}
+            except ValueError:
+                status, body, headers = HTTPStatus.BAD_REQUEST, {"detail": "JSON parse error."}, {}
+
+        if body is None:
+            content = b""
+        elif isinstance(body, bytes):
+            content = body
+        else:
+            content = json_codec.dumpb(body)
+            etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+            headers = {"Content-Type": "application/json", "ETag": etag, **headers}
+            if (
+                self.command == "GET"
+                and status == HTTPStatus.OK
+                and self.headers.get("If-None-Match") == etag
+            ):
+                status, content = HTTPStatus.NOT_MODIFIED, b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class FakeServer:
+    """HTTP server running :class:`FakeQuipucords` on a background thread.
+
+    Port is chosen by operating system unless provided.
+    """
+
+    def __init__(self, options=None, host="127.0.0.1", port=0):
+        self.app = FakeQuipucords(options)
+        self.random = random.Random()
+        self._httpd = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake_server = self
+        self._thread = None
+
+    @property
+    def host(self):
+        return self._httpd.server_address[0]
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/{QPC_API_ROOT}"
+
+    def client_config(self, **kwargs):
+        """Return quipucords_server config that points at this server."""
+        return QuipucordsServerOptions(
+            hostname=self.host,
+            port=self.port,
+            https=False,
+            username=self.app.options.username,
+            password=self.app.options.password,
+            ssh_keyfile_path="/tmp/",
+            **kwargs,
+        )
+
+    def start(self):
+        """Start serving requests on background thread."""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="camayoc-fake-server",
+            daemon=True,
+        )
+        self._thread.start()
+        logger.info("Fake quipucords server listening on %s", self.url)
+        return self
+
+    def stop(self):
+        """Stop serving requests and close listening socket."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        """Serve requests on current thread, until interrupted."""
+        logger.info("Fake quipucords server listening on %s", self.url)
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self):
+        """Start the server."""
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop the server."""
+        self.stop()
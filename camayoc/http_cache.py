@@ -0,0 +1,169 @@
+"""Cache of API responses for GET requests.
+
+:class:`ResponseCache` is used by :class:`camayoc.api.Client` when caching is
+enabled. It keeps up to ``max_entries`` responses, taking up to ``max_bytes``
+in total, and evicts least recently used ones first.
+
+Response is served from cache without contacting the server for ``ttl``
+seconds after it was stored. After that, if server provided ``ETag`` or
+``Last-Modified`` header, the client sends conditional request and keeps
+using cached response if server replies with ``304 Not Modified``.
+
+Every request that modifies data on the server (POST, PUT, PATCH, DELETE)
+invalidates all cached responses of the same collection - e.g. PUT to
+``v2/sources/5/`` invalidates ``v2/sources/``, ``v2/sources/5/``,
+``v2/sources/6/`` and so on - in every API version, together with
+collections that embed its data (see :data:`RELATED_COLLECTIONS`). For
+example, POST to ``v1/scans/5/jobs/`` invalidates ``v1/jobs/`` as well.
+
+Scan jobs change on the server on their own, as they run. Responses of
+collections in :data:`SELF_UPDATING_COLLECTIONS` are cached only if server
+provided ``ETag`` or ``Last-Modified``, and are never fresh: every read is
+sent to the server as conditional request, instead of being served stale
+for ``ttl`` seconds.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from attrs import define
+
+UNSAFE_METHODS = frozenset(("POST", "PUT", "PATCH", "DELETE"))
+"""HTTP methods that invalidate cached responses."""
+
+
+RELATED_COLLECTIONS = {
+    "credentials": ("sources",),
+    "sources": ("scans",),
+    "scans": ("jobs", "reports", "sources"),
+    "jobs": ("scans", "reports"),
+    "reports": ("jobs",),
+}
+"""Collections whose responses include data of the key collection.
+
+Scans embed their sources and most recent job, jobs embed their scan and
+report id, and so on.
+"""
+
+
+SELF_UPDATING_COLLECTIONS = frozenset(("jobs", "scans"))
+"""Collections whose data change without requests from client (scans embed their jobs)."""
+
+
+@define
+class CacheEntry:
+    response: object
+    path: str
+    size: int
+    stored_at: float
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def is_fresh(self, ttl):
+        # Self-updating resources are always revalidated with the server
+        if collection_type(self.path) in SELF_UPDATING_COLLECTIONS:
+            return False
+        return time.monotonic() - self.stored_at < ttl
+
+    def validators(self):
+        """Return headers that make a conditional request for this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def collection_type(path):
+    """Return type of resources on ``path`` (e.g. ``scans``), regardless of API version."""
+    segments = [segment for segment in path.split("/") if segment]
+    return segments[1] if len(segments) > 1 else ""
+
+
+class ResponseCache:
+    """Size-bounded LRU store of responses with time-to-live."""
+
+    def __init__(self, max_entries=256, max_bytes=256 * 2**20, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    @classmethod
+    def from_options(cls, options):
+        """Create cache from ``CacheOptions`` config section."""
+        return cls(max_entries=options.max_entries, max_bytes=options.max_bytes, ttl=options.ttl)
+
+    def __len__(self):
+        """Return number of cached responses."""
+        return len(self._entries)
+
+    def get(self, key):
+        """Return entry stored under ``key``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def response(self, entry):
+        """Return copy of response stored in ``entry``, safe to give to caller."""
+        return copy.copy(entry.response)
+
+    def store(self, key, path, response):
+        """Store ``response`` under ``key``, if it is cacheable."""
+        if response.status_code != 200:
+            return
+        size = len(response.content)
+        if size > self.max_bytes:
+            return
+        entry = CacheEntry(
+            response=response,
+            path=path,
+            size=size,
+            stored_at=time.monotonic(),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        if collection_type(path) in SELF_UPDATING_COLLECTIONS and not entry.validators():
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    def refresh(self, entry):
+        """Mark ``entry`` as fresh again, after server confirmed it did not change."""
+        entry.stored_at = time.monotonic()
+
+    def invalidate(self, path):
+        """Forget all responses of collection that ``path`` belongs to, and related ones."""
+        changed = collection_type(path)
+        stale_types = {changed, *RELATED_COLLECTIONS.get(changed, ())}
+        with self._lock:
+            stale_keys = [
+                key
+                for key, entry in self._entries.items()
+                if collection_type(entry.path) in stale_types
+            ]
+            for key in stale_keys:
+                self._remove(key)
+
+    def clear(self):
+        """Forget all responses."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
@@ -0,0 +1,105 @@
+"""Identity map of model instances and their last read state.
+
+When :class:`IdentityMap` is attached to :class:`camayoc.api.Client` (see
+``identity_map`` section of ``quipucords_server`` config), models obtained
+with :meth:`camayoc.qpc_models.QPCObject.from_id` are the same instance for
+the same server object, as long as someone keeps a reference to it.
+
+Map also keeps the last response to ``read()`` of every object. The
+response is returned by subsequent ``read()`` calls without contacting the
+server for ``ttl`` seconds. Cached state is dropped when object is updated
+or deleted through model methods, including ``bulk_delete()``. Changes made
+in other ways (e.g. by the server, when scan job finishes) become visible
+after ``ttl`` passes, or when ``read()`` is called with any keyword
+argument - e.g. ``read(cache=False)``.
+
+Objects are identified by endpoint (e.g. ``v2/sources/``) and id.
+"""
+
+import copy
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from attrs import define
+
+
+@define
+class _Entry:
+    response: object
+    stored_at: float
+
+
+class IdentityMap:
+    """Registry of model instances and their read responses.
+
+    :param ``ttl``: Seconds during which cached response is considered
+        fresh.
+    :param ``max_entries``: Number of cached responses; least recently used
+        are evicted first.
+    """
+
+    def __init__(self, ttl=30, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._instances = weakref.WeakValueDictionary()
+        self._responses = OrderedDict()
+
+    @classmethod
+    def from_options(cls, options):
+        """Create identity map from ``IdentityMapOptions`` config section."""
+        return cls(ttl=options.ttl, max_entries=options.max_entries)
+
+    def __len__(self):
+        """Return number of cached responses."""
+        return len(self._responses)
+
+    def register(self, model):
+        """Return instance registered for object of ``model``.
+
+        ``model`` itself is registered and returned if there is none.
+        """
+        key = (model.endpoint, model._id)
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is None:
+                instance = self._instances[key] = model
+            return instance
+
+    def cached_response(self, endpoint, object_id):
+        """Return copy of fresh cached read response, or None."""
+        key = (endpoint, object_id)
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.stored_at >= self.ttl:
+                del self._responses[key]
+                return None
+            self._responses.move_to_end(key)
+            return copy.copy(entry.response)
+
+    def store_response(self, endpoint, object_id, response):
+        """Cache successful read ``response`` of object."""
+        if response.status_code != 200:
+            return
+        key = (endpoint, object_id)
+        with self._lock:
+            self._responses[key] = _Entry(response=response, stored_at=time.monotonic())
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.max_entries:
+                self._responses.popitem(last=False)
+
+    def invalidate(self, endpoint, object_ids):
+        """Drop cached responses of objects with ``object_ids``."""
+        with self._lock:
+            for object_id in object_ids:
+                self._responses.pop((endpoint, object_id), None)
+
+    def clear(self):
+        """Drop all cached responses and forget registered instances."""
+        with self._lock:
+            self._responses.clear()
+            self._instances.clear()
@@ -0,0 +1,65 @@
+"""JSON encoding and decoding used throughout camayoc.
+
+Reports and DB snapshots can be large, and decoding them with :mod:`json`
+from standard library takes most of the time spent processing them. When
+`orjson`_ is installed (``fast-json`` extra of camayoc package), it is used
+instead; otherwise functions in this module fall back to :mod:`json`.
+Module attribute ``BACKEND`` tells which library is in use.
+
+Decoding errors are always instances of :class:`json.JSONDecodeError`. Data
+that orjson can't encode (e.g. integers larger than 64 bits, or dictionaries
+with non-string keys) is encoded by :mod:`json`. Encoded output is compact
+(no whitespace after separators) regardless of backend.
+
+.. _orjson: https://github.com/ijl/orjson
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data):
+    """Decode JSON document from ``str``, ``bytes`` or ``bytearray``."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load(fh):
+    """Decode JSON document from text or binary file object."""
+    return loads(fh.read())
+
+
+def dumpb(obj):
+    """Encode ``obj`` as JSON document in UTF-8 ``bytes``."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            pass
+    return _stdlib_dumps(obj).encode("utf-8")
+
+
+def dumps(obj):
+    """Encode ``obj`` as JSON document in ``str``."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except orjson.JSONEncodeError:
+            pass
+    return _stdlib_dumps(obj)
+
+
+def dump(obj, fh):
+    """Encode ``obj`` as JSON document and write it to text file object."""
+    fh.write(dumps(obj))
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,188 @@
+"""Incremental parsing of large JSON documents, such as reports.
+
+Details report of a scan with thousands of hosts is a single JSON document
+that can take hundreds of megabytes once decoded. Functions in this module
+read such document in chunks and yield items of selected arrays one at a
+time, so memory usage is bounded by size of a single item::
+
+    >>> for fact in json_stream.iter_facts("details.json"):
+    ...     check(fact)
+    >>> with client.get(path, stream=True) as response:
+    ...     fingerprints = list(json_stream.iter_fingerprints(response))
+
+Arrays are selected by path from the document root, where strings are
+object keys and ``"*"`` stands for all items of an array - e.g. facts are
+found at ``("sources", "*", "facts", "*")``. Only values on that path are
+walked incrementally; other values are decoded as a whole and discarded.
+"""
+
+import codecs
+import json
+import os
+
+FACTS_PATH = ("sources", "*", "facts", "*")
+"""Path of facts in details report."""
+
+FINGERPRINTS_PATH = ("system_fingerprints", "*")
+"""Path of system fingerprints in deployments report."""
+
+DEFAULT_CHUNK_SIZE = 2**16
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+_DECODER = json.JSONDecoder()
+
+
+def iter_items(source, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield decoded values found at ``path`` of JSON document in ``source``.
+
+    :param ``source``: Path of a file, binary or text file object, response
+        of request sent with ``stream=True``, or iterable of ``bytes``/``str``
+        chunks.
+    :param ``path``: Tuple of object keys and ``"*"`` (any array item).
+    :param ``chunk_size``: Size of chunks read from file or response.
+    :raises json.JSONDecodeError: If document is malformed or truncated.
+    """
+    yield from _Reader(_text_chunks(source, chunk_size)).walk(tuple(path))
+
+
+def iter_facts(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield facts of all sources in details report, one host at a time."""
+    return iter_items(source, FACTS_PATH, chunk_size)
+
+
+def iter_fingerprints(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield system fingerprints in deployments report, one host at a time."""
+    return iter_items(source, FINGERPRINTS_PATH, chunk_size)
+
+
+def _text_chunks(source, chunk_size):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in _raw_chunks(source, chunk_size):
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+    yield decoder.decode(b"", final=True)
+
+
+def _raw_chunks(source, chunk_size):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fh:
+            yield from iter(lambda: fh.read(chunk_size), b"")
+    elif hasattr(source, "iter_content"):
+        yield from source.iter_content(chunk_size)
+    elif hasattr(source, "read"):
+        while chunk := source.read(chunk_size):
+            yield chunk
+    else:
+        yield from source
+
+
+class _Reader:
+    """Cursor over JSON text arriving in chunks.
+
+    Consumed part of the buffer is dropped when new chunk is read, unless
+    it belongs to value that is being decoded (starts at ``_mark``).
+    """
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = ""
+        self._pos = 0
+        self._mark = None
+
+    def walk(self, path):
+        if not path:
+            yield self._decode_value()
+            return
+        head, rest = path[0], path[1:]
+        opening, closing = ("[", "]") if head == "*" else ("{", "}")
+        if self._peek() != opening:
+            self._skip_value()
+            return
+        self._pos += 1
+        if self._peek() == closing:
+            self._pos += 1
+            return
+        while True:
+            if head == "*":
+                yield from self.walk(rest)
+            else:
+                key = self._decode_value()
+                self._expect(":")
+                if key == head:
+                    yield from self.walk(rest)
+                else:
+                    self._skip_value()
+            separator = self._peek()
+            self._pos += 1
+            if separator == closing:
+                return
+            if separator != ",":
+                self._error(f"Expecting ',' or '{closing}'")
+
+    def _decode_value(self):
+        self._peek()
+        self._mark = self._pos
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._mark)
+            except json.JSONDecodeError:
+                # Value may continue in the next chunks
+                if not self._fill_more():
+                    raise
+                continue
+            # Number at the end of buffer may continue in the next chunk; when
+            # chunk ends after "1." or "1e", decoder stops before these
+            if not self._may_continue(value, end) or not self._fill():
+                break
+        self._pos = end
+        self._mark = None
+        return value
+
+    def _may_continue(self, value, end):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return end == len(self._buffer) or self._buffer[end] in _NUMBER_CHARS
+
+    def _skip_value(self):
+        self._decode_value()
+
+    def _expect(self, char):
+        if self._peek() != char:
+            self._error(f"Expecting '{char}'")
+        self._pos += 1
+
+    def _peek(self):
+        """Skip whitespace and return next character, or empty string at the end."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _fill(self):
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        drop = self._pos if self._mark is None else self._mark
+        self._buffer = self._buffer[drop:] + chunk
+        self._pos -= drop
+        if self._mark is not None:
+            self._mark -= drop
+        return True
+
+    def _fill_more(self):
+        """Read chunks until value being decoded has twice as much text available.
+
+        Value that spans many chunks is then decoded from the start only
+        a few times, instead of once per chunk.
+        """
+        wanted = 2 * (len(self._buffer) - self._mark)
+        filled = False
+        while len(self._buffer) - self._mark < wanted and self._fill():
+            filled = True
+        return filled
+
+    def _error(self, message):
+        raise json.JSONDecodeError(message, self._buffer, self._pos)
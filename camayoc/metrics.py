@@ -0,0 +1,139 @@
+"""Statistics about requests sent by API clients.
+
+:class:`LatencyCollector` is a hook for :class:`camayoc.api.Client` that
+keeps latency histograms per endpoint. Histograms are streaming - memory
+used does not depend on number of requests observed - so collector can be
+installed for the entire test session.
+"""
+
+import json
+import logging
+import math
+import threading
+from collections import Counter
+from collections import defaultdict
+from pathlib import Path
+
+from camayoc import api
+from camayoc.types.api import RequestEvent
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """Streaming histogram of request durations.
+
+    Values are put into logarithmic buckets, each ``precision`` wider than
+    the previous one. Percentiles are therefore approximate, but relative
+    error never exceeds ``precision``.
+    """
+
+    def __init__(self, precision=0.01):
+        self._log_base = math.log1p(precision)
+        self._buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """Record single duration (in seconds)."""
+        value = max(value, 1e-6)
+        self._buckets[math.ceil(math.log(value) / self._log_base)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent):
+        """Return approximate duration below which ``percent`` of values fall."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(math.exp(bucket * self._log_base), self.max)
+        return self.max
+
+    def summary(self):
+        """Return dictionary with main statistics of this histogram."""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "min": self.min,
+            "mean": self.total / self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class LatencyCollector:
+    """Client hook that keeps latency statistics per endpoint.
+
+    Endpoints are identified by HTTP method and templated path, e.g.
+    ``GET v1/jobs/{id}/``.
+
+    Example::
+        >>> collector = LatencyCollector()
+        >>> collector.install(client)
+        >>> # ... make some requests ...
+        >>> collector.dump(Path("api-latency.json"))
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(LatencyHistogram)
+        self._errors = Counter()
+        self._bytes_sent = Counter()
+        self._bytes_received = Counter()
+
+    def __call__(self, event: RequestEvent):
+        """Record a request that finished (successfully or not)."""
+        key = f"{event.method} {event.path}"
+        with self._lock:
+            if event.elapsed is not None:
+                self._histograms[key].add(event.elapsed)
+            if event.error is not None or (event.status_code or 0) >= 400:
+                self._errors[key] += 1
+            self._bytes_sent[key] += event.request_bytes or 0
+            self._bytes_received[key] += event.response_bytes or 0
+
+    def install(self, client=None):
+        """Start observing requests of ``client``, or all clients if ``None``."""
+        hooks = client.hooks if client is not None else api.global_hooks
+        hooks["after_response"].append(self)
+        hooks["on_error"].append(self)
+
+    def uninstall(self, client=None):
+        """Stop observing requests, reverting :meth:`install`."""
+        hooks = client.hooks if client is not None else api.global_hooks
+        for event in ("after_response", "on_error"):
+            if self in hooks[event]:
+                hooks[event].remove(self)
+
+    def summary(self):
+        """Return statistics of all observed endpoints, keyed by endpoint."""
+        with self._lock:
+            keys = set(self._histograms) | set(self._errors)
+            return {
+                key: {
+                    **self._histograms[key].summary(),
+                    "errors": self._errors[key],
+                    "bytes_sent": self._bytes_sent[key],
+                    "bytes_received": self._bytes_received[key],
+                }
+                for key in sorted(keys)
+            }
+
+    def dump(self, destination: Path):
+        """Save statistics as JSON file."""
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        with destination.open("w") as fh:
+            json.dump(self.summary(), fh, indent=2)
+        logger.info("Saved API latency statistics to %s", destination.as_posix())
@@ -0,0 +1,82 @@
+"""Lazy iteration over paginated API listings.
+
+Quipucords list endpoints return objects in pages, with ``count`` of all
+objects and ``next`` link to the following page. :func:`iter_pages` yields
+pages one by one, fetching following pages on worker threads while caller
+processes the current one. At most ``concurrency`` pages are requested
+ahead, so memory usage does not depend on the total number of objects.
+
+Pages are requested by number, not by following ``next`` link verbatim, so
+requests go through the model method (and client) that fetched the first
+page. ``next`` link is still used to decide when listing ends.
+"""
+
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from camayoc import cassette
+
+
+def _page_count(first_page):
+    """Return number of pages in listing, or None if it can't be known."""
+    count = first_page.get("count")
+    page_length = len(first_page.get("results") or [])
+    if count is None or not page_length:
+        return None
+    return math.ceil(count / page_length)
+
+
+def iter_pages(fetch, page_size=None, concurrency=1, **kwargs):
+    """Yield JSON of consecutive pages returned by ``fetch``.
+
+    :param ``fetch``: Function that sends GET request to a list endpoint,
+        e.g. bound :meth:`camayoc.qpc_models.QPCObject.list`. It is called
+        with ``params`` keyword argument holding page number.
+    :param ``page_size``: Number of objects on single page. Server default
+        is used if not provided.
+    :param ``concurrency``: Number of pages requested ahead of the one
+        being processed by caller.
+    :param ``**kwargs``: Additional arguments passed to ``fetch``.
+    """
+    params = dict(kwargs.pop("params", None) or {})
+    if page_size:
+        params["page_size"] = page_size
+
+    @cassette.bind
+    def get_page(number):
+        response = fetch(params={**params, "page": number}, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    current = get_page(1)
+    last_page = _page_count(current)
+    scheduled = 1
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="camayoc-pages")
+    try:
+        while True:
+            limit = last_page or scheduled
+            if current.get("next") and not pending:
+                # Length of listing is unknown or it grew, but next page is linked
+                limit = max(limit, scheduled + 1)
+            while len(pending) < concurrency and scheduled < limit:
+                scheduled += 1
+                pending.append(executor.submit(get_page, scheduled))
+
+            yield current
+
+            if not current.get("next") or not pending:
+                return
+            current = pending.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_items(fetch, page_size=None, concurrency=1, **kwargs):
+    """Yield objects from all pages returned by ``fetch``.
+
+    Accepts the same arguments as :func:`iter_pages`.
+    """
+    for page in iter_pages(fetch, page_size=page_size, concurrency=concurrency, **kwargs):
+        yield from page.get("results") or []
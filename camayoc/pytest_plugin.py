@@ -1,10 +1,21 @@
+import contextlib
 import logging
+import re
 from collections.abc import Callable
+from pathlib import Path
 
 import pytest
 
 logger = logging.getLogger(__name__)
 LOG_CONFIG_INI_KEY = "camayoc_log_config"
+latency_collector_key = pytest.StashKey()
+cassette_key = pytest.StashKey()
+session_cassette_key = pytest.StashKey()
+SESSION_CASSETTE = "session.json.gz"
+"""Cassette with requests sent by threads other than the one running tests."""
+scan_container_key = pytest.StashKey()
+"""ScanContainer started by --camayoc-prescan, used by ``scans`` fixture."""
+prescan_key = pytest.StashKey()
 
 
 def pytest_addoption(parser: pytest.Parser, pluginmanager: pytest.PytestPluginManager) -> None:
@@ -14,6 +25,31 @@ def pytest_addoption(parser: pytest.Parser, pluginmanager: pytest.PytestPluginMa
         choices=("pr", "nightly", "upgrade"),
         help="Only run tests relevant for this pipeline type",
     )
+    parser.addoption(
+        "--camayoc-api-stats",
+        dest="camayoc_api_stats",
+        type=Path,
+        help="Save per-endpoint API latency statistics as JSON to this file",
+    )
+    parser.addoption(
+        "--camayoc-cassette-mode",
+        dest="camayoc_cassette_mode",
+        choices=("record", "replay"),
+        help="Record API responses of each test, or replay them without server",
+    )
+    parser.addoption(
+        "--camayoc-cassette-dir",
+        dest="camayoc_cassette_dir",
+        type=Path,
+        help="Directory with recorded API responses (default: cassettes in root directory)",
+    )
+    parser.addoption(
+        "--camayoc-prescan",
+        dest="camayoc_prescan",
+        action="store_true",
+        default=False,
+        help="Start scans needed by collected tests in background, right after collection",
+    )
     parser.addini(
         LOG_CONFIG_INI_KEY,
         help="List of loggers and desired logging level, separated by a colon",
@@ -32,6 +68,73 @@ def pytest_configure(config) -> None:
         logger = logging.getLogger(logger_name)
         logger.setLevel(logger_level)
 
+    if config.getoption("camayoc_api_stats"):
+        # Imported here, so camayoc configuration is not loaded when it's not needed
+        from camayoc.metrics import LatencyCollector  # noqa: PLC0415
+
+        collector = LatencyCollector()
+        collector.install()
+        config.stash[latency_collector_key] = collector
+
+    configure_cassettes(config)
+
+
+def pytest_unconfigure(config) -> None:
+    if collector := config.stash.get(latency_collector_key, None):
+        collector.uninstall()
+        collector.dump(config.getoption("camayoc_api_stats"))
+    if scan_container := config.stash.get(scan_container_key, None):
+        # Prescan container may be unused when no test asked for scans
+        scan_container.close()
+    if session_cassette := config.stash.get(session_cassette_key, None):
+        session_cassette.close()
+
+
+def configure_cassettes(config: pytest.Config) -> None:
+    """Decide if and where API responses are recorded or replayed from.
+
+    Command line options take precedence over camayoc settings.
+    """
+    mode = config.getoption("camayoc_cassette_mode")
+    directory = config.getoption("camayoc_cassette_dir")
+    if not mode or not directory:
+        # Imported here, so camayoc configuration is not loaded when it's not needed
+        from camayoc.config import settings  # noqa: PLC0415
+
+        mode = mode or settings.camayoc.cassette_mode
+        directory = directory or settings.camayoc.cassette_path
+    if not mode:
+        return
+    directory = Path(directory or config.rootpath / "cassettes")
+    config.stash[cassette_key] = (mode, directory)
+
+    from camayoc.cassette import use_cassette  # noqa: PLC0415
+
+    # Requests of background threads (scan watcher, ScanContainer workers)
+    # are not tied to any single test, so they go to session cassette
+    session_cassette = contextlib.ExitStack()
+    session_cassette.enter_context(use_cassette(directory / SESSION_CASSETTE, mode, session=True))
+    config.stash[session_cassette_key] = session_cassette
+
+
+def cassette_path(directory: Path, nodeid: str) -> Path:
+    """Return path of cassette for test identified by ``nodeid``."""
+    name = re.sub(r"[^\w.\-/]", "_", nodeid.replace("::", "/"))
+    return directory / f"{name}.json.gz"
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item: pytest.Item, nextitem):
+    if not (cassette_config := item.config.stash.get(cassette_key, None)):
+        yield
+        return
+
+    from camayoc.cassette import use_cassette  # noqa: PLC0415
+
+    mode, directory = cassette_config
+    with use_cassette(cassette_path(directory, item.nodeid), mode):
+        yield
+
 
 def pytest_fixture_setup(fixturedef, request):
     logger.debug("Starting fixture %s", fixturedef)
@@ -49,6 +152,18 @@ def pytest_runtest_logfinish(nodeid, location):
     logger.debug("Finished test %s", nodeid)
 
 
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item: pytest.Item, nextitem):
+    prescan = item.config.stash.get(prescan_key, None)
+    if not prescan or item.nodeid != prescan[1]:
+        yield
+        return
+    # Session data provider was already created for cleaning tests, scans must share it
+    data_provider = item.funcargs.get("cleaning_data_provider")
+    yield
+    start_prescan(item.config, prescan[0], data_provider)
+
+
 def pytest_collection_modifyitems(
     session: pytest.Session, items: list[pytest.Item], config: pytest.Config
 ) -> None:
@@ -57,6 +172,67 @@ def pytest_collection_modifyitems(
     reorder_matching_first(items, _has_marker("upgrade_only"))
 
 
+def pytest_collection_finish(session: pytest.Session) -> None:
+    config = session.config
+    if not config.getoption("camayoc_prescan") or config.getoption("collectonly"):
+        return
+    # Imported here, so camayoc configuration is not loaded when it's not needed
+    from camayoc.config import settings  # noqa: PLC0415
+
+    all_scans = [scan.name for scan in settings.scans]
+    scan_names = scans_needed_by(session.items, all_scans)
+    if not scan_names:
+        return
+    # Tests using cleaning_data_provider remove everything from the server.
+    # They are moved to the front in pytest_collection_modifyitems (only
+    # upgrade_only tests run before them), and scans are started once the
+    # last of them finishes. Tests needing scans before that use container
+    # created by ``scans`` fixture, which start_prescan then reuses.
+    is_cleaning = _has_fixture("cleaning_data_provider")
+    cleaning_items = [item for item in session.items if is_cleaning(item)]
+    if cleaning_items:
+        config.stash[prescan_key] = (scan_names, cleaning_items[-1].nodeid)
+        return
+    start_prescan(config, scan_names)
+
+
+def scans_needed_by(items: list[pytest.Item], all_scans: list[str]) -> list[str]:
+    """Return names of scans that ``runs_scan`` tests in ``items`` will ask for.
+
+    Test parametrized with ``scan_name`` needs that scan only. Any other
+    test using ``scans`` fixture may ask for any scan.
+    """
+    needed = set()
+    for item in items:
+        if not _has_marker("runs_scan")(item) or not _has_fixture("scans")(item):
+            continue
+        callspec = getattr(item, "callspec", None)
+        scan_name = callspec.params.get("scan_name") if callspec else None
+        if scan_name in all_scans:
+            needed.add(scan_name)
+        else:
+            needed.update(all_scans)
+    return [name for name in all_scans if name in needed]
+
+
+def start_prescan(config: pytest.Config, scan_names: list[str], data_provider=None) -> None:
+    """Start scans in background and keep them for ``scans`` fixture.
+
+    If ``scans`` fixture already created its container, scans are started
+    in that one, so no scan is run twice.
+    """
+    from camayoc.data_provider import DataProvider  # noqa: PLC0415
+    from camayoc.data_provider import ScanContainer  # noqa: PLC0415
+
+    logger.info("Starting scans in background: %s", ", ".join(scan_names))
+    config.stash[prescan_key] = None
+    scan_container = config.stash.get(scan_container_key, None)
+    if scan_container is None:
+        scan_container = ScanContainer(data_provider or DataProvider())
+        config.stash[scan_container_key] = scan_container
+    scan_container.start(scan_names)
+
+
 def filter_pipeline_tests(items: list[pytest.Item], config: pytest.Config) -> None:
     """Select tests to run based on --camayoc-pipeline command line argument."""
     pipeline = config.getoption("camayoc_pipeline")
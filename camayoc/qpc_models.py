@@ -1,20 +1,31 @@
 """Models for use with the Quipucords API."""
 
+import hashlib
 import re
+from pathlib import Path
 from pprint import pformat
 from typing import Optional
 from urllib.parse import urljoin
 
 from camayoc import api
+from camayoc import async_api
+from camayoc import json_stream
+from camayoc import pagination
+from camayoc import query
 from camayoc.constants import MASKED_AUTH_TOKEN_OUTPUT
 from camayoc.constants import MASKED_PASSWORD_OUTPUT
 from camayoc.constants import QPC_CREDENTIALS_PATH
+from camayoc.constants import QPC_REPORT_DOWNLOAD_CHUNK_SIZE
 from camayoc.constants import QPC_REPORTS_PATH
 from camayoc.constants import QPC_SCAN_PATH
 from camayoc.constants import QPC_SCANJOB_PATH
 from camayoc.constants import QPC_SOURCE_PATH
 from camayoc.constants import QPC_V2_REPORTS_PATH
+from camayoc.exceptions import ReportDownloadError
 from camayoc.exceptions import ScanJobWithoutReportException
+from camayoc.identity_map import IdentityMap
+from camayoc.report_bundle import ReportBundle
+from camayoc.types.api import ReportDownload
 from camayoc.types.settings import CredentialOptions
 from camayoc.types.settings import ScanOptions
 from camayoc.types.settings import SourceOptions
@@ -45,17 +56,33 @@ class QPCObjectBulkDeleteMixin(object):
 
         """
         path = urljoin(self.endpoint, "bulk_delete/")
-        return self.client.post(path, payload={"ids": ids}, **kwargs)
+        response = self.client.post(path, payload={"ids": ids}, **kwargs)
+        self._forget(ids)
+        return response
+
+    @async_api.try_reauthenticate
+    async def abulk_delete(self, ids, **kwargs):
+        """Awaitable counterpart of :meth:`bulk_delete`. Requires AsyncClient."""
+        path = urljoin(self.endpoint, "bulk_delete/")
+        response = await self.client.post(path, payload={"ids": ids}, **kwargs)
+        self._forget(ids)
+        return response
 
 
 class QPCObject(object):
     """A base class for other QPC models."""
 
+    filter_fields = ()
+    """Query parameters that list endpoint of this model filters by."""
+
+    ordering_fields = ()
+    """Fields that list endpoint of this model can order by."""
+
     def __init__(self, client=None, _id=None):
         """Provide shared methods for QPC model objects."""
         # we want to allow for an empty string name
         self._id = _id
-        self.client = client if client else api.Client()
+        self.client = client if client else api.get_client()
         self.endpoint = ""
 
     def fields(self):
@@ -122,6 +149,8 @@ class QPCObject(object):
             self._id = response.json().get("id")
             if response.json().get("port"):
                 self.port = response.json().get("port")
+            if (identity_map := self._identity_map()) is not None:
+                identity_map.register(self)
         return response
 
     @api.try_reauthenticate
@@ -137,6 +166,87 @@ class QPCObject(object):
         """
         return self.client.get(self.endpoint, **kwargs)
 
+    @classmethod
+    def from_id(cls, _id, client=None):
+        """Return model of object with id ``_id`` stored on the server.
+
+        When client has identity map (see :mod:`camayoc.identity_map`), the
+        same instance is returned for the same object.
+        """
+        model = cls(client=client, _id=_id)
+        identity_map = model._identity_map()
+        return identity_map.register(model) if identity_map is not None else model
+
+    def _identity_map(self):
+        identity_map = getattr(self.client, "identity_map", None)
+        return identity_map if isinstance(identity_map, IdentityMap) else None
+
+    def _cached_read(self, kwargs):
+        """Return identity map, if read with ``kwargs`` may use it, and cached response."""
+        identity_map = self._identity_map()
+        if identity_map is None or set(kwargs) - {"cache"}:
+            return None, None
+        if kwargs.get("cache", True) is False:
+            return identity_map, None
+        return identity_map, identity_map.cached_response(self.endpoint, self._id)
+
+    def _forget(self, ids):
+        """Drop cached state of objects with ``ids`` from identity map."""
+        if (identity_map := self._identity_map()) is not None:
+            identity_map.invalidate(self.endpoint, ids)
+
+    @classmethod
+    def objects(cls, client=None, **kwargs):
+        """Return lazy collection of objects of this type stored on the server.
+
+        Example::
+            >>> Source.objects(client).filter(source_type="network").count()
+            >>> ScanJob.objects(client, scan_id=scan_id).order_by("-id").first()
+
+        :param ``client``: Client used to send requests.
+        :param ``**kwargs``: Additional arguments of model constructor,
+            e.g. ``scan_id`` of :class:`ScanJob`.
+        :returns: :class:`camayoc.query.QuerySet`.
+        """
+        return query.QuerySet(cls(client=client, **kwargs))
+
+    def iter_pages(self, fetch=None, page_size=None, concurrency=None, **kwargs):
+        """Lazily yield JSON of pages of objects of this type.
+
+        Following pages are requested while caller processes the current one,
+        see :mod:`camayoc.pagination`. Requires blocking client.
+
+        Example::
+            >>> for page in Source().iter_pages():
+            ...     print(page["count"], len(page["results"]))
+            >>> job = ScanJob(_id=job_id)
+            >>> pages = job.iter_pages(job.connection_results, page_size=1000)
+
+        :param ``fetch``: Method sending GET request to a list endpoint.
+            Defaults to :meth:`list`.
+        :param ``page_size``: Number of objects on single page. Defaults to
+            ``page_size`` from client ``pagination`` config.
+        :param ``concurrency``: Number of pages requested ahead. Defaults to
+            ``concurrency`` from client ``pagination`` config.
+        :param ``**kwargs``: Additional arguments accepted by Requests's
+            `request.request()` method.
+        """
+        options = self.client.config.pagination
+        return pagination.iter_pages(
+            fetch or self.list,
+            page_size=page_size or options.page_size,
+            concurrency=concurrency or options.concurrency,
+            **kwargs,
+        )
+
+    def iter_items(self, fetch=None, page_size=None, concurrency=None, **kwargs):
+        """Lazily yield objects from all pages of a listing.
+
+        Accepts the same arguments as :meth:`iter_pages`.
+        """
+        for page in self.iter_pages(fetch, page_size, concurrency, **kwargs):
+            yield from page.get("results") or []
+
     @api.try_reauthenticate
     def read(self, **kwargs):
         """Send GET request to the self.endpoint/{id} of this object.
@@ -147,7 +257,12 @@ class QPCObject(object):
         :returns: requests.models.Response. The json of this response contains
             the data associated with this object's `self._id`.
         """
-        return self.client.get(self.path(), **kwargs)
+        identity_map, response = self._cached_read(kwargs)
+        if response is None:
+            response = self.client.get(self.path(), **kwargs)
+            if identity_map is not None:
+                identity_map.store_response(self.endpoint, self._id, response)
+        return response
 
     @api.try_reauthenticate
     def update(self, **kwargs):
@@ -163,7 +278,9 @@ class QPCObject(object):
         :returns: requests.models.Response. The json of this response contains
             the data associated with this object's `self._id`.
         """
-        return self.client.put(self.path(), self.update_payload(), **kwargs)
+        response = self.client.put(self.path(), self.update_payload(), **kwargs)
+        self._forget([self._id])
+        return response
 
     @api.try_reauthenticate
     def delete(self, **kwargs):
@@ -175,7 +292,50 @@ class QPCObject(object):
         :returns: requests.models.Response. A successful delete has the return
             code `204`.
         """
-        return self.client.delete(self.path(), **kwargs)
+        response = self.client.delete(self.path(), **kwargs)
+        self._forget([self._id])
+        return response
+
+    @async_api.try_reauthenticate
+    async def acreate(self, **kwargs):
+        """Awaitable counterpart of :meth:`create`. Requires AsyncClient."""
+        response = await self.client.post(self.endpoint, self.payload(), **kwargs)
+        if response.status_code in range(200, 203):
+            self._id = response.json().get("id")
+            if response.json().get("port"):
+                self.port = response.json().get("port")
+            if (identity_map := self._identity_map()) is not None:
+                identity_map.register(self)
+        return response
+
+    @async_api.try_reauthenticate
+    async def alist(self, **kwargs):
+        """Awaitable counterpart of :meth:`list`. Requires AsyncClient."""
+        return await self.client.get(self.endpoint, **kwargs)
+
+    @async_api.try_reauthenticate
+    async def aread(self, **kwargs):
+        """Awaitable counterpart of :meth:`read`. Requires AsyncClient."""
+        identity_map, response = self._cached_read(kwargs)
+        if response is None:
+            response = await self.client.get(self.path(), **kwargs)
+            if identity_map is not None:
+                identity_map.store_response(self.endpoint, self._id, response)
+        return response
+
+    @async_api.try_reauthenticate
+    async def aupdate(self, **kwargs):
+        """Awaitable counterpart of :meth:`update`. Requires AsyncClient."""
+        response = await self.client.put(self.path(), self.update_payload(), **kwargs)
+        self._forget([self._id])
+        return response
+
+    @async_api.try_reauthenticate
+    async def adelete(self, **kwargs):
+        """Awaitable counterpart of :meth:`delete`. Requires AsyncClient."""
+        response = await self.client.delete(self.path(), **kwargs)
+        self._forget([self._id])
+        return response
 
 
 class Credential(QPCObject, QPCObjectBulkDeleteMixin):
@@ -197,6 +357,9 @@ class Credential(QPCObject, QPCObjectBulkDeleteMixin):
         >>> assert actual_cred.equivalent(cred)
     """
 
+    filter_fields = ("name", "search_by_name", "cred_type", "search_sources_by_name")
+    ordering_fields = ("name", "cred_type")
+
     def __init__(
         self,
         client=None,
@@ -213,7 +376,7 @@ class Credential(QPCObject, QPCObjectBulkDeleteMixin):
     ):
         """Create a host credential with given data.
 
-        If no arguments are passed, then a api.Client will be initialized and a
+        If no arguments are passed, then a shared api.Client will be used and a
         uuid4 generated for the name and username.
         """
         super().__init__(client=client, _id=_id)
@@ -327,6 +490,9 @@ class Source(QPCObject, QPCObjectBulkDeleteMixin):
         >>> assert source.equivalent(actual_source)
     """
 
+    filter_fields = ("name", "search_by_name", "source_type", "search_credentials_by_name")
+    ordering_fields = ("name", "source_type", "most_recent_connect_scan__start_time")
+
     def __init__(
         self,
         client=None,
@@ -345,7 +511,7 @@ class Source(QPCObject, QPCObjectBulkDeleteMixin):
         """Initialize a Source object with given data.
 
         If no port is supplied, it will be set to 22 by default.
-        A uuid4 name and api.Client are also supplied if none are provided.
+        A uuid4 name and shared api.Client are also supplied if none are provided.
         """
         super().__init__(client=client, _id=_id)
         self.name = uuid4() if name is None else name
@@ -454,6 +620,14 @@ class Scan(QPCObject, QPCObjectBulkDeleteMixin):
         >>> assert scanjob.status() == 'running'
     """
 
+    filter_fields = ("name", "search_by_name", "scan_type", "search_sources_by_name")
+    ordering_fields = (
+        "name",
+        "scan_type",
+        "most_recent_scanjob__start_time",
+        "most_recent_scanjob__status",
+    )
+
     def __init__(
         self,
         client=None,
@@ -510,7 +684,9 @@ class Scan(QPCObject, QPCObjectBulkDeleteMixin):
         :returns: requests.models.Response. A successful delete has the return
             code `204`.
         """
-        return self.client.delete(self.path(), **kwargs)
+        response = self.client.delete(self.path(), **kwargs)
+        self._forget([self._id])
+        return response
 
     @api.try_reauthenticate
     def joblist(self, **kwargs):
@@ -565,6 +741,9 @@ class Scan(QPCObject, QPCObjectBulkDeleteMixin):
 class ScanJob(QPCObject):
     """A class to aid in the creation and control of Scan Jobs in tests."""
 
+    filter_fields = ("status", "scan_type")
+    ordering_fields = ("id", "scan_type", "status", "start_time", "end_time")
+
     def __init__(self, client=None, scan_id=None, _id=None):
         """Initialize a ScanJob object for a given scan."""
         super().__init__(client=client, _id=_id)
@@ -592,6 +771,19 @@ class ScanJob(QPCObject):
         response = self.client.post(path, payload=self.payload(), **kwargs)
         if response.status_code in range(200, 203):
             self._id = response.json().get("id")
+            if (identity_map := self._identity_map()) is not None:
+                identity_map.register(self)
+        return response
+
+    @async_api.try_reauthenticate
+    async def acreate(self, **kwargs):
+        """Awaitable counterpart of :meth:`create`. Requires AsyncClient."""
+        path = urljoin(QPC_SCAN_PATH, "{}/jobs/".format(self.scan_id))
+        response = await self.client.post(path, payload=self.payload(), **kwargs)
+        if response.status_code in range(200, 203):
+            self._id = response.json().get("id")
+            if (identity_map := self._identity_map()) is not None:
+                identity_map.register(self)
         return response
 
     @api.try_reauthenticate
@@ -611,6 +803,12 @@ class ScanJob(QPCObject):
         path = urljoin(QPC_SCAN_PATH, "{}/jobs/".format(self.scan_id))
         return self.client.get(path, **kwargs)
 
+    @async_api.try_reauthenticate
+    async def alist(self, **kwargs):
+        """Awaitable counterpart of :meth:`list`. Requires AsyncClient."""
+        path = urljoin(QPC_SCAN_PATH, "{}/jobs/".format(self.scan_id))
+        return await self.client.get(path, **kwargs)
+
     @api.try_reauthenticate
     def cancel(self, **kwargs):
         """Send PUT request to self.endpoint/{id}/cancel/ to cancel a scan.
@@ -619,7 +817,9 @@ class ScanJob(QPCObject):
             `request.request()` method.
         """
         path = urljoin(self.path(), "cancel/")
-        return self.client.put(path, {}, **kwargs)
+        response = self.client.put(path, {}, **kwargs)
+        self._forget([self._id])
+        return response
 
     @api.try_reauthenticate
     def connection_results(self, **kwargs):
@@ -648,7 +848,12 @@ class ScanJob(QPCObject):
         If you call this method on a scan that does not exist on the server,
         you will get an HTTPError.
         """
-        return self.read().json().get("status")
+        return self.read(cache=False).json().get("status")
+
+    async def astatus(self):
+        """Awaitable counterpart of :meth:`status`. Requires AsyncClient."""
+        response = await self.aread(cache=False)
+        return response.json().get("status")
 
     def equivalent(self, other):
         """Alert the user that this method is not implemented.
@@ -734,6 +939,12 @@ class Report(QPCObject):
         response = self.client.get(path, **kwargs)
         return response
 
+    @async_api.try_reauthenticate
+    async def adetails(self, **kwargs):
+        """Awaitable counterpart of :meth:`details`. Requires AsyncClient."""
+        path = urljoin(self.endpoint, "{}/details/".format(self._id))
+        return await self.client.get(path, **kwargs)
+
     @api.try_reauthenticate
     def deployments(self, **kwargs):
         """Send GET request to self.endpoint/{id}/deployments/ to view deployments.
@@ -745,6 +956,12 @@ class Report(QPCObject):
         response = self.client.get(path, **kwargs)
         return response
 
+    @async_api.try_reauthenticate
+    async def adeployments(self, **kwargs):
+        """Awaitable counterpart of :meth:`deployments`. Requires AsyncClient."""
+        path = urljoin(self.endpoint, "{}/deployments/".format(self._id))
+        return await self.client.get(path, **kwargs)
+
     @api.try_reauthenticate
     def aggregate(self, **kwargs):
         """Send GET request to self.endpoint/{id}/aggregate/ to view the aggregate report.
@@ -756,6 +973,38 @@ class Report(QPCObject):
         response = self.client.get(path, **kwargs)
         return response
 
+    @async_api.try_reauthenticate
+    async def aaggregate(self, **kwargs):
+        """Awaitable counterpart of :meth:`aggregate`. Requires AsyncClient."""
+        path = urljoin(self.endpoint, "{}/aggregate/".format(self._id))
+        return await self.client.get(path, **kwargs)
+
+    def iter_facts(self, **kwargs):
+        """Yield facts of hosts in details report, one at a time.
+
+        Report is parsed as it arrives from the server (see
+        :mod:`camayoc.json_stream`), so memory usage does not depend on
+        number of hosts. Request is sent when iteration starts.
+
+        :param ``**kwargs``: Additional arguments accepted by Requests's
+            `request.request()` method.
+        """
+        path = urljoin(self.endpoint, "{}/details/".format(self._id))
+        with self.client.get(path, stream=True, **kwargs) as response:
+            yield from json_stream.iter_facts(response)
+
+    def iter_fingerprints(self, **kwargs):
+        """Yield system fingerprints in deployments report, one at a time.
+
+        See :meth:`iter_facts`.
+
+        :param ``**kwargs``: Additional arguments accepted by Requests's
+            `request.request()` method.
+        """
+        path = urljoin(self.endpoint, "{}/deployments/".format(self._id))
+        with self.client.get(path, stream=True, **kwargs) as response:
+            yield from json_stream.iter_fingerprints(response)
+
     @api.try_reauthenticate
     def read(self, **kwargs):
         """Send GET request to v2/reports/{id}/ to read the report metadata.
@@ -769,6 +1018,12 @@ class Report(QPCObject):
         response = self.client.get(path, **kwargs)
         return response
 
+    @async_api.try_reauthenticate
+    async def aread(self, **kwargs):
+        """Awaitable counterpart of :meth:`read`. Requires AsyncClient."""
+        path = urljoin(QPC_V2_REPORTS_PATH, "{}/".format(self._id))
+        return await self.client.get(path, **kwargs)
+
     @api.try_reauthenticate
     def reports_gzip(self, **kwargs):
         """Send GET request to self.endpoint/{id}/ to obtain report in gzip format.
@@ -780,3 +1035,66 @@ class Report(QPCObject):
         path = urljoin(self.endpoint, "{}/".format(self._id))
         response = self.client.get(path, headers=extra_headers, **kwargs)
         return response
+
+    def bundle(self, **kwargs):
+        """Download report tarball once and return its lazily decoded members.
+
+        :param ``**kwargs``: Additional arguments accepted by
+            :meth:`download`.
+        :returns: :class:`camayoc.report_bundle.ReportBundle`
+        """
+        return ReportBundle.fetch(self, **kwargs)
+
+    @api.try_reauthenticate
+    def download(self, destination, insights=False, size=None, checksum=None, **kwargs):
+        """Stream report in gzip format to ``destination``.
+
+        Response body is written in chunks as it arrives, so memory usage does
+        not depend on report size.
+
+        :param ``destination``: Path of file to create, or binary file-like
+            object to write to.
+        :param ``insights``: Download insights report instead of the
+            standard one.
+        :param ``size``: Expected size of report, in bytes.
+        :param ``checksum``: Expected checksum of report, in
+            ``algorithm:hexdigest`` format (e.g. ``sha256:ab12...``).
+        :param ``**kwargs``: Additional arguments accepted by Requests's
+            `request.request()` method.
+        :returns: ReportDownload with size and checksum of received data.
+        :raises ReportDownloadError: If ``size`` or ``checksum`` was given,
+            and does not match received data.
+        """
+        algorithm, _, expected_digest = (checksum or "sha256:").partition(":")
+        digest = hashlib.new(algorithm)
+        path = urljoin(self.endpoint, "{}/".format(self._id))
+        if insights:
+            path = urljoin(path, "insights/")
+        extra_headers = {"Accept": "application/gzip"}
+        is_path = not hasattr(destination, "write")
+
+        received = 0
+        with self.client.get(path, headers=extra_headers, stream=True, **kwargs) as response:
+            response.raise_for_status()
+            sink = Path(destination).open("wb") if is_path else destination
+            try:
+                for chunk in response.iter_content(chunk_size=QPC_REPORT_DOWNLOAD_CHUNK_SIZE):
+                    sink.write(chunk)
+                    digest.update(chunk)
+                    received += len(chunk)
+            finally:
+                if is_path:
+                    sink.close()
+
+        result = ReportDownload(size=received, checksum=f"{algorithm}:{digest.hexdigest()}")
+        errors = []
+        if size is not None and size != received:
+            errors.append(f"expected {size} bytes, received {received}")
+        if expected_digest and expected_digest.lower() != digest.hexdigest():
+            errors.append(f"expected checksum {checksum}, received {result.checksum}")
+        if errors:
+            if is_path:
+                Path(destination).unlink(missing_ok=True)
+            msg = "Report {} download is corrupted: {}"
+            raise ReportDownloadError(msg.format(self._id, "; ".join(errors)))
+        return result
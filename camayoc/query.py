@@ -0,0 +1,174 @@
+"""Lazy, chainable collections of objects stored on the server.
+
+:class:`QuerySet` describes which objects of a model are wanted, and sends
+requests only when it is iterated or asked for a value::
+
+    >>> sources = Source.objects(client).filter(source_type="network")
+    >>> sources.order_by("-name").first()
+    >>> sources.count()
+    >>> for source_id in sources.ids():
+    ...     ...
+
+Every method that refines query returns new ``QuerySet``, so partial
+queries can be shared and reused. Filters and ordering that the server
+supports (listed in ``filter_fields`` and ``ordering_fields`` of the
+model) are sent as query parameters. Conditions that can't be expressed
+that way may be given as Python predicates with :meth:`QuerySet.where`;
+they are evaluated on each object as pages arrive.
+
+Objects are JSON dictionaries, as returned by the server. Pages are fetched
+lazily, see :mod:`camayoc.pagination`.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from camayoc import cassette
+
+
+class QuerySet:
+    """Lazy collection of objects of a single model.
+
+    Usually created by ``objects()`` class method of a model.
+
+    :param ``model``: Model instance whose endpoint (and ``list`` method)
+        is queried, e.g. ``Source(client=client)``.
+    """
+
+    def __init__(self, model, params=None, predicates=(), page_size=None):
+        self.model = model
+        self.params = dict(params or {})
+        self.predicates = tuple(predicates)
+        self.page_size = page_size
+
+    def __repr__(self):
+        """Show model and query parameters."""
+        name = type(self.model).__name__
+        return f"<QuerySet {name} params={self.params} predicates={len(self.predicates)}>"
+
+    def _clone(self, **changes):
+        attrs = {
+            "params": self.params,
+            "predicates": self.predicates,
+            "page_size": self.page_size,
+            **changes,
+        }
+        return type(self)(self.model, **attrs)
+
+    def filter(self, **params):
+        """Return query narrowed down by server-side filters.
+
+        :raises ValueError: If server does not support filtering by some of
+            ``params``.
+        """
+        supported = getattr(self.model, "filter_fields", ())
+        unsupported = sorted(set(params) - set(supported))
+        if unsupported:
+            raise ValueError(
+                f"{type(self.model).__name__} can't be filtered by {unsupported} on the server, "
+                f"supported filters are {sorted(supported)}; use where() instead"
+            )
+        return self._clone(params={**self.params, **params})
+
+    def where(self, predicate):
+        """Return query narrowed down by ``predicate`` evaluated on client.
+
+        ``predicate`` is called with JSON of each object and should return
+        true for objects that are to be kept.
+        """
+        return self._clone(predicates=self.predicates + (predicate,))
+
+    def order_by(self, *fields):
+        """Return query ordered by ``fields``; prefix field with ``-`` to reverse.
+
+        :raises ValueError: If server does not support ordering by some of
+            ``fields``.
+        """
+        supported = getattr(self.model, "ordering_fields", ())
+        unsupported = sorted(f for f in fields if f.removeprefix("-") not in supported)
+        if unsupported:
+            raise ValueError(
+                f"{type(self.model).__name__} can't be ordered by {unsupported}, "
+                f"supported fields are {sorted(supported)}"
+            )
+        params = {k: v for k, v in self.params.items() if k != "ordering"}
+        if fields:
+            params["ordering"] = ",".join(fields)
+        return self._clone(params=params)
+
+    def page(self, page_size):
+        """Return query that fetches ``page_size`` objects per request."""
+        return self._clone(page_size=page_size)
+
+    def __iter__(self):
+        """Yield JSON of matching objects, fetching pages as needed."""
+        items = self.model.iter_items(page_size=self.page_size, params=self.params)
+        if not self.predicates:
+            return items
+        return (item for item in items if all(p(item) for p in self.predicates))
+
+    def _first_page(self):
+        response = self.model.list(params={**self.params, "page_size": 1})
+        response.raise_for_status()
+        return response.json()
+
+    def count(self):
+        """Return number of matching objects.
+
+        Without :meth:`where` predicates, single request for one object is
+        sent and server-side count is returned.
+        """
+        if self.predicates:
+            return sum(1 for _ in self)
+        return self._first_page()["count"]
+
+    def exists(self):
+        """Return true if there is at least one matching object."""
+        return self.first() is not None
+
+    def first(self):
+        """Return first matching object, or None."""
+        if not self.predicates:
+            results = self._first_page().get("results") or []
+            return results[0] if results else None
+        items = iter(self)
+        try:
+            return next(items, None)
+        finally:
+            items.close()
+
+    def ids(self):
+        """Yield ids of matching objects."""
+        for item in self:
+            yield item["id"]
+
+    def read_many(self, ids, concurrency=None):
+        """Yield JSON of objects with given ``ids``, in the same order.
+
+        Objects are read by id, with up to ``concurrency`` requests in flight;
+        ``ids`` may be a lazy iterable. Filters of this query are not applied.
+        Every object is read with its model ``read`` method, so responses
+        are shared with identity map and expired token is renewed.
+
+        :param ``concurrency``: Number of concurrent requests. Defaults to
+            ``concurrency`` from client ``pagination`` config.
+        """
+        model = self.model
+        concurrency = concurrency or model.client.config.pagination.concurrency
+
+        @cassette.bind
+        def read(object_id):
+            response = type(model).from_id(object_id, client=model.client).read()
+            response.raise_for_status()
+            return response.json()
+
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="camayoc-read-many"
+        ) as executor:
+            pending = deque()
+            for object_id in ids:
+                pending.append(executor.submit(read, object_id))
+                if len(pending) >= concurrency:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
@@ -0,0 +1,197 @@
+"""Client-side limits on request rate and concurrency.
+
+:class:`RateLimiter` protects quipucords server from being overwhelmed by
+camayoc itself, e.g. when many threads share single :class:`camayoc.api.Client`.
+Each request must first obtain a :class:`Permit`, which may require waiting:
+
+* for a token from a token bucket, which caps sustained number of requests
+  per second, while still allowing short bursts;
+* for a free slot, which caps number of requests in flight at the same time.
+
+Limits may be set globally and for endpoint classes (see
+:func:`endpoint_class`), so e.g. slow report downloads can be limited more
+strictly than quick CRUD requests. Request must obtain permit from both its
+class limit and global limit.
+
+Limiter is configured by ``rate_limit`` section of ``quipucords_server``
+config. It is disabled by default.
+"""
+
+import re
+import threading
+import time
+
+ENDPOINT_CLASSES = ("reports", "crud")
+
+_REPORTS_PATH_RE = re.compile(r"^v\d+/reports/")
+
+
+def endpoint_class(path):
+    """Return class of endpoint that ``path`` (relative to API root) belongs to."""
+    if _REPORTS_PATH_RE.match(path):
+        return "reports"
+    return "crud"
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens per second.
+
+    Bucket holds at most ``burst`` tokens, which defaults to one second worth
+    of tokens. Callers that find bucket empty reserve a future token, so they
+    are served in order of arrival.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take single token, waiting until it is available.
+
+        :returns: Number of seconds spent waiting.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            self._sleep(wait)
+        return wait
+
+
+class Limit:
+    """Requests per second and requests in flight limit.
+
+    :param ``requests_per_second``: Sustained request rate. ``None`` means
+        no limit.
+    :param ``burst``: Number of requests that may be sent at once after
+        period of inactivity.
+    :param ``max_in_flight``: Number of requests that may wait for response at
+        the same time. ``None`` means no limit.
+    """
+
+    def __init__(self, requests_per_second=None, burst=None, max_in_flight=None):
+        self.bucket = None
+        if requests_per_second:
+            self.bucket = TokenBucket(requests_per_second, burst)
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+
+    @classmethod
+    def from_options(cls, options):
+        """Create limit from :class:`camayoc.types.settings.LimitOptions`.
+
+        Returns ``None`` if options do not set any limit.
+        """
+        if not options.requests_per_second and not options.max_in_flight:
+            return None
+        return cls(
+            requests_per_second=options.requests_per_second,
+            burst=options.burst,
+            max_in_flight=options.max_in_flight,
+        )
+
+    def acquire(self):
+        """Wait until request can be sent. Caller must call :meth:`release` afterwards.
+
+        :returns: Number of seconds spent waiting.
+        """
+        wait = 0.0
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            start = time.monotonic()
+            self._slots.acquire()
+            wait = time.monotonic() - start
+        try:
+            if self.bucket is not None:
+                wait += self.bucket.acquire()
+        except BaseException:
+            self.release()
+            raise
+        return wait
+
+    def release(self):
+        """Mark request as finished."""
+        if self._slots is not None:
+            self._slots.release()
+
+
+class Permit:
+    """Permission to send single request, returned by :meth:`RateLimiter.acquire`.
+
+    ``wait`` is number of seconds spent waiting for permit. :meth:`release`
+    must be called when response was received (or body was read, for
+    streamed responses); calling it more than once is harmless.
+    """
+
+    def __init__(self, limits=(), wait=0.0):
+        self.wait = wait
+        self._limits = limits
+        self._lock = threading.Lock()
+
+    def release(self):
+        """Return in-flight slots held by this permit."""
+        with self._lock:
+            limits, self._limits = self._limits, ()
+        for limit in limits:
+            limit.release()
+
+
+class RateLimiter:
+    """Global and per endpoint class request limits.
+
+    :param ``limit``: :class:`Limit` applied to all requests, or ``None``.
+    :param ``endpoint_limits``: Mapping of endpoint class name to
+        :class:`Limit` applied to requests of that class.
+    """
+
+    def __init__(self, limit=None, endpoint_limits=None):
+        self.limit = limit
+        self.endpoint_limits = dict(endpoint_limits or {})
+
+    @classmethod
+    def from_options(cls, options):
+        """Create limiter from :class:`camayoc.types.settings.RateLimitOptions`.
+
+        Returns ``None`` if options do not set any limit.
+        """
+        unknown = set(options.endpoints) - set(ENDPOINT_CLASSES)
+        if unknown:
+            raise ValueError(
+                f"Unknown endpoint classes {sorted(unknown)}, expected some of {ENDPOINT_CLASSES}"
+            )
+        endpoint_limits = {
+            name: limit
+            for name, limit_options in options.endpoints.items()
+            if (limit := Limit.from_options(limit_options)) is not None
+        }
+        limit = Limit.from_options(options)
+        if limit is None and not endpoint_limits:
+            return None
+        return cls(limit, endpoint_limits)
+
+    def acquire(self, path):
+        """Wait until request to ``path`` (relative to API root) can be sent.
+
+        Endpoint class limit is acquired before global one, so requests
+        waiting for a busy class do not take global slots away from others.
+        """
+        limits = []
+        wait = 0.0
+        try:
+            for limit in (self.endpoint_limits.get(endpoint_class(path)), self.limit):
+                if limit is not None:
+                    wait += limit.acquire()
+                    limits.append(limit)
+        except BaseException:
+            Permit(limits).release()
+            raise
+        return Permit(limits, wait=wait)
@@ -0,0 +1,113 @@
+"""Reports of a scan job, read from a single downloaded tarball.
+
+Quipucords serves details, deployments and aggregate reports at separate
+endpoints, and also packs all of them into one gzip tarball. Each endpoint
+renders report again on the server, so :class:`ReportBundle` downloads the
+tarball once and decodes members only when they are first accessed::
+
+    >>> bundle = ReportBundle.fetch(report)
+    >>> bundle.details["sources"]
+    >>> bundle.deployments["system_fingerprints"]
+
+Insights (lightspeed) report is a separate tarball, downloaded on first
+access to :attr:`ReportBundle.insights`.
+"""
+
+import io
+import re
+import tarfile
+import threading
+from functools import cached_property
+from pathlib import Path
+
+from camayoc import json_codec
+
+# Some Quipucords versions append report id to member name, e.g. details-1.json
+_REPORT_MEMBER_RE = re.compile(r"(?P<report_type>details|deployments|aggregate)(-\d+)?\.json")
+
+
+class ReportBundle:
+    """Lazily decoded members of report tarball.
+
+    :param ``archive``: Content of gzip tarball, as returned by
+        ``Report.reports_gzip()`` or ``qpc report download``.
+    :param ``insights_loader``: Callable returning content of insights
+        tarball; called at most once, on first access to :attr:`insights`.
+    :raises tarfile.TarError: If ``archive`` is not a valid tarball.
+    """
+
+    def __init__(self, archive, insights_loader=None):
+        self._insights_loader = insights_loader
+        self._lock = threading.Lock()
+        self._tar = tarfile.open(fileobj=io.BytesIO(archive), mode="r:gz")
+        self._members = {}
+        for member in self._tar.getmembers():
+            if member.isfile():
+                self._members[member.name] = member
+
+    @classmethod
+    def fetch(cls, report, **kwargs):
+        """Download tarball of ``report`` (``qpc_models.Report``).
+
+        :param ``**kwargs``: Additional arguments accepted by
+            ``Report.download()``.
+        """
+
+        def download(insights=False):
+            buffer = io.BytesIO()
+            report.download(buffer, insights=insights, **kwargs)
+            return buffer.getvalue()
+
+        return cls(download(), insights_loader=lambda: download(insights=True))
+
+    @classmethod
+    def from_file(cls, path):
+        """Read tarball saved in file at ``path``."""
+        return cls(Path(path).read_bytes())
+
+    @property
+    def names(self):
+        """Names of files in tarball."""
+        return list(self._members)
+
+    def read(self, name):
+        """Return raw content of file ``name`` in tarball."""
+        with self._lock:
+            return self._tar.extractfile(self._members[name]).read()
+
+    def _report(self, report_type):
+        for name in self._members:
+            match = _REPORT_MEMBER_RE.fullmatch(name.rsplit("/", 1)[-1])
+            if match and match.group("report_type") == report_type:
+                return json_codec.loads(self.read(name))
+        return None
+
+    @cached_property
+    def details(self):
+        """Details report, or None if tarball does not have it."""
+        return self._report("details")
+
+    @cached_property
+    def deployments(self):
+        """Deployments report, or None if tarball does not have it."""
+        return self._report("deployments")
+
+    @cached_property
+    def aggregate(self):
+        """Aggregate report, or None if tarball does not have it."""
+        return self._report("aggregate")
+
+    @cached_property
+    def insights(self):
+        """JSON files of insights report, keyed by name in insights tarball.
+
+        :raises ValueError: If bundle was not created with ``insights_loader``.
+        """
+        if self._insights_loader is None:
+            raise ValueError("Insights report is not available for this report bundle")
+        insights = ReportBundle(self._insights_loader())
+        return {
+            name: json_codec.loads(insights.read(name))
+            for name in insights.names
+            if name.endswith(".json")
+        }
@@ -0,0 +1,189 @@
+"""Durations of earlier scan runs, used to plan the next ones.
+
+Quipucords runs scan jobs in the order they were created. When the longest
+scan is created last, every other scan waits for it at the end of the
+session. :class:`ScanDurations` remembers how long each scan took, so
+``ScanContainer`` can create jobs of the longest scans first::
+
+    >>> durations = ScanDurations.from_settings()
+    >>> ordered = sorted(definitions, key=durations.expected, reverse=True)
+    >>> durations.record(definition, seconds)
+
+Scans are identified by name and hosts of their sources, so history of a
+scan is not used after its sources are changed. Scans that were never run
+are estimated from types of their sources.
+
+History is also used to decide how long to wait for a scan before it is
+considered hung (see ``adaptive_scan_timeout`` section of ``camayoc``
+config)::
+
+    >>> wait_until_state(scanjob, timeout=durations.timeout(definition))
+"""
+
+import hashlib
+import logging
+import os
+import statistics
+import tempfile
+import threading
+from datetime import UTC
+from datetime import datetime
+from pathlib import Path
+
+from xdg import BaseDirectory
+
+from camayoc import json_codec
+from camayoc.config import settings
+from camayoc.constants import SCAN_DURATION_ESTIMATES
+from camayoc.constants import SCAN_DURATION_PER_NETWORK_HOST
+
+logger = logging.getLogger(__name__)
+
+HISTORY_SIZE = 20
+"""Number of the most recent durations kept for each scan."""
+
+
+def scan_sources(definition, sources=None):
+    """Return source definitions of scan ``definition``."""
+    sources = settings.sources if sources is None else sources
+    by_name = {source.name: source for source in sources}
+    return [by_name[name] for name in definition.sources if name in by_name]
+
+
+def scan_key(definition, sources=None):
+    """Return key identifying scan by its name and hosts of its sources."""
+    hosts = sorted(
+        f"{source.name}:{host}"
+        for source in scan_sources(definition, sources)
+        for host in source.hosts
+    )
+    digest = hashlib.sha256("\n".join(hosts).encode("utf-8")).hexdigest()
+    return f"{definition.name}:{digest[:16]}"
+
+
+def estimate_duration(definition, sources=None):
+    """Return seconds that scan is expected to take, based on its source types."""
+    estimates = [0]
+    for source in scan_sources(definition, sources):
+        estimate = SCAN_DURATION_ESTIMATES.get(source.type, SCAN_DURATION_ESTIMATES["network"])
+        if source.type == "network":
+            estimate += SCAN_DURATION_PER_NETWORK_HOST * len(source.hosts)
+        estimates.append(estimate)
+    # Sources of a scan are inspected concurrently
+    return max(estimates)
+
+
+def _job_time(job, field):
+    try:
+        value = datetime.fromisoformat(job[field])
+    except (KeyError, TypeError, ValueError):
+        return None
+    # Server sends times in UTC
+    return value if value.tzinfo else value.replace(tzinfo=UTC)
+
+
+def job_duration(job):
+    """Return seconds between start and end of scan job, or None if unknown.
+
+    :param ``job``: JSON of scan job, as returned by the server.
+    """
+    start, end = _job_time(job, "start_time"), _job_time(job, "end_time")
+    if start is None or end is None:
+        return None
+    return (end - start).total_seconds()
+
+
+def job_age(job):
+    """Return seconds since scan job ended, or None if unknown."""
+    if (end := _job_time(job, "end_time")) is None:
+        return None
+    return (datetime.now(UTC) - end).total_seconds()
+
+
+class ScanDurations:
+    """Store of scan durations in a JSON file.
+
+    File is read on first use, and written after every recorded duration.
+
+    :param ``path``: Path of JSON file; it does not need to exist.
+    :param ``sources``: Source definitions. Defaults to ``sources`` setting.
+    :param ``timeout_options``: ``AdaptiveScanTimeoutOptions`` config
+        section. Defaults to ``camayoc.adaptive_scan_timeout`` setting.
+    """
+
+    def __init__(self, path, sources=None, timeout_options=None):
+        self.path = Path(path)
+        self.sources = sources
+        self.timeout_options = timeout_options or settings.camayoc.adaptive_scan_timeout
+        self._lock = threading.Lock()
+        self._history = None
+
+    @classmethod
+    def from_settings(cls):
+        """Create store in file set by ``camayoc.scan_durations_path``."""
+        path = settings.camayoc.scan_durations_path
+        if path is None:
+            path = Path(BaseDirectory.save_cache_path("camayoc")) / "scan_durations.json"
+        return cls(path)
+
+    def _load(self):
+        try:
+            return json_codec.loads(self.path.read_bytes())
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning("Ignoring malformed scan durations file %s", self.path)
+            return {}
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(json_codec.dumpb(self._history))
+        os.replace(tmp_path, self.path)
+
+    def durations(self, definition):
+        """Return recorded durations of scan, oldest first."""
+        with self._lock:
+            if self._history is None:
+                self._history = self._load()
+            return list(self._history.get(scan_key(definition, self.sources), []))
+
+    def expected(self, definition):
+        """Return seconds that scan is expected to take.
+
+        Median of recorded durations is used, or estimate based on source
+        types if scan was never recorded.
+        """
+        if durations := self.durations(definition):
+            return statistics.median(durations)
+        return estimate_duration(definition, self.sources)
+
+    def timeout(self, definition, default=None):
+        """Return seconds to wait for scan before it is considered hung.
+
+        Timeout is a percentile of recorded durations times safety factor,
+        kept between floor and ceiling. ``default`` (``camayoc.scan_timeout``
+        setting if not provided) is used for scans without enough history.
+        """
+        if default is None:
+            default = settings.camayoc.scan_timeout
+        options = self.timeout_options
+        durations = self.durations(definition)
+        if not options.enabled or len(durations) < max(options.min_history, 2):
+            return default
+        quantiles = statistics.quantiles(durations, n=100, method="inclusive")
+        percentile = quantiles[min(options.percentile, len(quantiles)) - 1]
+        return min(options.ceiling, max(options.floor, percentile * options.safety_factor))
+
+    def record(self, definition, seconds):
+        """Add duration of a finished scan and save the file."""
+        key = scan_key(definition, self.sources)
+        with self._lock:
+            # Other processes may have recorded their scans in the meantime
+            self._history = self._load()
+            self._history[key] = (self._history.get(key, []) + [seconds])[-HISTORY_SIZE:]
+            try:
+                self._save()
+            except OSError:
+                logger.warning("Unable to save scan durations to %s", self.path, exc_info=True)
@@ -0,0 +1,331 @@
+"""Wait for many scan jobs at once.
+
+:class:`ScanJobWatcher` polls all watched scan jobs from a single
+background thread and returns a :class:`concurrent.futures.Future` for each
+of them::
+
+    >>> watcher = default_watcher()
+    >>> futures = [watcher.watch(job) for job in jobs]
+    >>> for future in as_completed(futures):
+    ...     job_json = future.result()
+
+Polling interval of each job starts at ``min_interval`` and grows by
+``backoff`` after each poll, up to ``max_interval`` (see ``scan_polling``
+section of ``camayoc`` config), so short scans are noticed quickly while
+long scans don't keep the server busy. If job is expected to finish at
+certain time (``expected_duration``), it is polled more often as that time
+approaches.
+
+Jobs of the same scan are read with a single request to the scan jobs
+listing whenever any of them is due.
+
+Timeout counts from the moment job leaves the queue, so jobs waiting for
+other scans to finish are not timed out before they start. Time spent in
+the queue is limited separately (``max_queue_wait``).
+"""
+
+import functools
+import logging
+import pprint
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+from attrs import define
+from attrs import field
+
+from camayoc.config import settings
+from camayoc.constants import QPC_SCAN_STATES
+from camayoc.constants import QPC_SCAN_TERMINAL_STATES
+from camayoc.exceptions import StoppedScanException
+from camayoc.exceptions import WaitTimeError
+
+logger = logging.getLogger(__name__)
+
+VALID_STATES = QPC_SCAN_STATES + ("stopped",)
+"""States that may be waited for; ``stopped`` is any terminal state."""
+
+_STOPPED_STATES = QPC_SCAN_TERMINAL_STATES + ("stopped",)
+
+_QUEUED_STATES = ("created", "pending")
+
+
+@define
+class _Watch:
+    scanjob: object
+    state: str
+    started_at: float
+    deadline: float
+    timeout: float
+    queue_deadline: float
+    expected_duration: Optional[float]
+    scan_id: Optional[int]
+    future: Future = field(factory=Future)
+    next_poll: float = 0.0
+    polls: int = 0
+
+
+class ScanJobWatcher:
+    """Poll scan jobs until they reach desired state.
+
+    :param ``options``: ``ScanPollingOptions`` config section. Defaults to
+        ``camayoc.scan_polling`` setting.
+    :param ``clock``: Function returning current time, in seconds.
+    """
+
+    def __init__(self, options=None, clock=time.monotonic):
+        self.options = options or settings.camayoc.scan_polling
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._watches = []
+        self._thread = None
+
+    def watch(
+        self,
+        scanjob,
+        state="completed",
+        timeout=None,
+        expected_duration=None,
+        max_queue_wait=None,
+    ):
+        """Start watching ``scanjob`` (``qpc_models.ScanJob``).
+
+        :param ``state``: State to wait for, one of :data:`VALID_STATES`.
+        :param ``timeout``: Seconds to wait, not counting time job spends
+            in the queue. Defaults to ``camayoc.scan_timeout`` setting.
+        :param ``expected_duration``: Seconds in which job is expected to
+            finish once it starts, usually based on earlier runs of the
+            same scan.
+        :param ``max_queue_wait``: Seconds job may wait in the queue before
+            it starts. Defaults to ``camayoc.scan_timeout`` setting.
+        :returns: Future resolved with JSON of the job once it reaches
+            ``state``. As in ``wait_until_state``, waiting for terminal state
+            ends in any terminal state, so caller should check status of
+            the job. ``StoppedScanException`` is set when job stops while
+            waiting for ``running``, and ``WaitTimeError`` when ``timeout``
+            passes.
+        :raises ValueError: If ``state`` is not valid.
+        """
+        if state not in VALID_STATES:
+            raise ValueError(
+                'Invalid state="{0}". Valid options for "state" are [ {1} ]'.format(
+                    state, pprint.pformat(VALID_STATES)
+                )
+            )
+        if timeout is None:
+            timeout = settings.camayoc.scan_timeout
+        if max_queue_wait is None:
+            max_queue_wait = settings.camayoc.scan_timeout
+        now = self._clock()
+        watch = _Watch(
+            scanjob=scanjob,
+            state=state,
+            started_at=now,
+            deadline=now + timeout,
+            timeout=timeout,
+            queue_deadline=now + max_queue_wait + timeout,
+            expected_duration=expected_duration,
+            scan_id=scanjob.scan_id,
+            # Job was just created; first poll is delayed a bit, so jobs
+            # started together are polled together
+            next_poll=now + self.options.min_interval,
+        )
+        watch.future.set_running_or_notify_cancel()
+        with self._cond:
+            self._watches.append(watch)
+            if self._thread is None:
+                self._start_thread()
+            self._cond.notify()
+        return watch.future
+
+    def wait(
+        self,
+        scanjob,
+        state="completed",
+        timeout=None,
+        expected_duration=None,
+        max_queue_wait=None,
+    ):
+        """Block until ``scanjob`` reaches ``state``; see :meth:`watch`."""
+        return self.watch(scanjob, state, timeout, expected_duration, max_queue_wait).result()
+
+    def cancel(self, future, reason="Watching scan job was cancelled"):
+        """Stop watching job of ``future`` returned by :meth:`watch`.
+
+        Unless job already reached desired state, ``future`` is resolved with
+        ``StoppedScanException``. Job itself is not canceled on the server.
+        """
+        with self._cond:
+            self._watches = [watch for watch in self._watches if watch.future is not future]
+            self._resolve(future, exception=StoppedScanException(reason))
+            self._cond.notify()
+
+    def interval(self, watch, now):
+        """Return seconds until the next poll of ``watch``."""
+        options = self.options
+        interval = min(options.max_interval, options.min_interval * options.backoff**watch.polls)
+        if watch.expected_duration is not None:
+            remaining = watch.expected_duration - (now - watch.started_at)
+            interval = min(interval, max(options.min_interval, abs(remaining) / 2))
+        return interval
+
+    def _run(self):
+        try:
+            self._loop()
+        except Exception as e:
+            logger.exception("Scan job watcher failed")
+            with self._cond:
+                # Next watch starts new thread
+                self._thread = None
+                watches, self._watches = self._watches, []
+            for watch in watches:
+                self._resolve(watch.future, exception=e)
+
+    def _resolve(self, future, result=None, exception=None):
+        """Set result or exception of ``future``, unless it was already set.
+
+        Futures may be resolved by watcher thread and by :meth:`cancel` at
+        the same time; lock makes sure only one of them succeeds.
+        """
+        with self._cond:
+            if future.done():
+                return
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+    def _start_thread(self):
+        self._thread = threading.Thread(target=self._run, name="camayoc-scan-watcher", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if not self._watches:
+                    self._thread = None
+                    return
+                now = self._clock()
+                due = [watch for watch in self._watches if watch.next_poll <= now]
+                if not due:
+                    next_poll = min(watch.next_poll for watch in self._watches)
+                    self._cond.wait(next_poll - now)
+                    continue
+                # Jobs of the same scan are in the same listing, poll them now too
+                due_groups = {self._group_key(watch) for watch in due}
+                due += [
+                    watch
+                    for watch in self._watches
+                    if watch.next_poll > now and self._group_key(watch) in due_groups
+                ]
+            self._poll(due)
+            with self._cond:
+                self._watches = [watch for watch in self._watches if not watch.future.done()]
+
+    def _group_key(self, watch):
+        """Return key of jobs that may be read with single listing request."""
+        if watch.scan_id is None:
+            return (id(watch),)
+        return (id(watch.scanjob.client), watch.scan_id)
+
+    def _poll(self, due):
+        groups = {}
+        for watch in due:
+            groups.setdefault(self._group_key(watch), []).append(watch)
+        for watches in groups.values():
+            try:
+                jobs = self._read_jobs(watches)
+                now = self._clock()
+                for watch in watches:
+                    self._update(watch, jobs[watch.scanjob._id], now)
+            except Exception as e:  # noqa: BLE001
+                # Failure to poll (including unexpected payload) is delivered
+                # to waiting callers, so it does not stop the watcher thread
+                for watch in watches:
+                    self._resolve(watch.future, exception=e)
+
+    def _read_jobs(self, watches):
+        """Return JSON of jobs of ``watches``, keyed by job id."""
+        if len(watches) == 1:
+            scanjob = watches[0].scanjob
+            response = scanjob.read(cache=False)
+            response.raise_for_status()
+            return {scanjob._id: response.json()}
+        wanted = {watch.scanjob._id for watch in watches}
+        jobs = {}
+        first = watches[0]
+        listing = type(first.scanjob)(client=first.scanjob.client, scan_id=first.scan_id)
+        items = listing.iter_items(params={"ordering": "-id"})
+        try:
+            for job in items:
+                if job["id"] in wanted:
+                    jobs[job["id"]] = job
+                    if len(jobs) == len(wanted):
+                        break
+        finally:
+            items.close()
+        for watch in watches:
+            if watch.scanjob._id not in jobs:
+                jobs.update(self._read_jobs([watch]))
+        return jobs
+
+    def _update(self, watch, job, now):
+        status = job.get("status")
+        watch.polls += 1
+        if watch.scan_id is None:
+            watch.scan_id = job.get("scan_id") or (job.get("scan") or {}).get("id")
+        if status == watch.state or (status in _STOPPED_STATES and watch.state in _STOPPED_STATES):
+            logger.debug(
+                "Scan job %s reached state %s after %d polls", job.get("id"), status, watch.polls
+            )
+            self._resolve(watch.future, job)
+            return
+        if status in _QUEUED_STATES:
+            # Time spent waiting for other jobs does not count
+            watch.started_at = now
+            watch.deadline = min(now + watch.timeout, watch.queue_deadline)
+        exception_format = {
+            "scanjob_id": watch.scanjob._id,
+            "scan_id": watch.scan_id,
+            "expected_state": watch.state,
+            "scanjob_state": status,
+            "scanjob_details": pprint.pformat(job),
+            "scanjob_results": pprint.pformat(job.get("tasks")),
+        }
+        if status in _STOPPED_STATES:
+            self._resolve(
+                watch.future,
+                exception=StoppedScanException(
+                    "Scanjob with ID={scanjob_id} has stopped running instead of reaching \n"
+                    'the state="{expected_state}"\n'
+                    'When the scanjob stopped, it had the state="{scanjob_state}".'
+                    "\nThe scanjob was started for the scan with id {scan_id}"
+                    "The full details of the scanjob were \n{scanjob_details}\n"
+                    'The "results" available from the scanjob were \n'
+                    "{scanjob_results}\n".format(**exception_format)
+                ),
+            )
+            return
+        if now >= watch.deadline:
+            self._resolve(
+                watch.future,
+                exception=WaitTimeError(
+                    "Scanjob with ID={scanjob_id} timed out while waiting\n"
+                    'to achieve the state="{expected_state}"\n'
+                    "When the scanjob timed out, it had the"
+                    ' state="{scanjob_state}".\n'
+                    "The scanjob was started for the scan with id {scan_id}"
+                    "The full details of the scanjob were \n{scanjob_details}\n"
+                    'The "results" available from the scanjob were'
+                    "\n{scanjob_results}\n".format(**exception_format)
+                ),
+            )
+            return
+        watch.next_poll = min(now + self.interval(watch, now), watch.deadline)
+
+
+@functools.cache
+def default_watcher():
+    """Return watcher shared by all callers in this process."""
+    return ScanJobWatcher()
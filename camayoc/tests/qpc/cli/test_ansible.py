@@ -16,6 +16,7 @@ from camayoc.config import settings
 from camayoc.qpc_models import Scan
 from camayoc.tests.qpc.cli.utils import scan_job
 from camayoc.tests.qpc.cli.utils import scan_start
+from camayoc.tests.qpc.cli.utils import source_scan_definition
 from camayoc.tests.qpc.cli.utils import wait_for_scan
 from camayoc.types.settings import SourceOptions
 
@@ -39,7 +40,7 @@ def _run_ansible_scan(data_provider, source_definition: SourceOptions):
     match_scan_id = re.match(r'Scan "(\d+)" started.', output)
     assert match_scan_id is not None
     scan_job_id = match_scan_id.group(1)
-    wait_for_scan(scan_job_id)
+    wait_for_scan(scan_job_id, definition=source_scan_definition(source_definition))
     result = scan_job({"id": scan_job_id})
     assert result["status"] == "completed"
     details, deployments, aggregate = retrieve_report(scan_job_id)
@@ -20,6 +20,7 @@ from .utils import scan_add_and_check
 from .utils import scan_job
 from .utils import scan_start
 from .utils import source_add_and_check
+from .utils import source_scan_definition
 from .utils import source_to_cli_options
 from .utils import wait_for_scan
 
@@ -88,7 +89,7 @@ def test_end_to_end(tmp_path, qpc_server_config, data_provider, source_name):
     match = re.match(r'Scan "(\d+)" started.', result)
     assert match is not None
     scan_job_id = match.group(1)
-    wait_for_scan(scan_job_id)
+    wait_for_scan(scan_job_id, definition=source_scan_definition(source_definition))
     result = scan_job({"id": scan_job_id})
     assert result["status"] == "completed"
     assert result["report_id"]
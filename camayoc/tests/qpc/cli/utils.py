@@ -2,21 +2,25 @@
 """Utility functions for Quipucords cli tests."""
 
 import functools
-import json
 import logging
 import re
-import tarfile
 import tempfile
-import time
 from pprint import pformat
 
 import pexpect
 
+from camayoc import json_codec
 from camayoc.config import settings
 from camayoc.constants import CLI_DEBUG_MSG
 from camayoc.exceptions import FailedScanException
-from camayoc.exceptions import WaitTimeError
+from camayoc.exceptions import StoppedScanException
+from camayoc.qpc_models import ScanJob
+from camayoc.report_bundle import ReportBundle
+from camayoc.scan_durations import ScanDurations
+from camayoc.scan_durations import job_duration
+from camayoc.scan_watcher import default_watcher
 from camayoc.types.settings import HashicorpVaultOptions
+from camayoc.types.settings import ScanOptions
 from camayoc.utils import client_cmd
 
 logger = logging.getLogger(__name__)
@@ -42,28 +46,52 @@ def clear_all_entities():
     assert errors == [], output
 
 
-def wait_for_scan(scan_job_id, status="completed", timeout=settings.camayoc.scan_timeout):
+def source_scan_definition(source_definition):
+    """Return scan definition identifying scans of single ``source_definition``.
+
+    Scans created by CLI tests have random names; this definition is used
+    to keep track of their durations across runs.
+    """
+    return ScanOptions(name=f"cli-{source_definition.name}", sources=[source_definition.name])
+
+
+def wait_for_scan(scan_job_id, status="completed", timeout=None, definition=None):
     """Wait for a scan to reach some ``status`` up to ``timeout`` seconds.
 
+    Scan job is polled through the API by
+    :func:`camayoc.scan_watcher.default_watcher`, instead of running
+    ``qpc scan job`` repeatedly.
+
     :param scan_job_id: Scan ID to wait for.
     :param status: Scan status which will wait for. Default is completed.
-    :param timeout: wait up to this amount of seconds. Default is camayoc.scan_timeout.
+    :param timeout: wait up to this amount of seconds. Default is learned from
+        earlier runs of ``definition``, or camayoc.scan_timeout.
+    :param definition: ``ScanOptions`` describing the scan. When provided,
+        duration of completed scan is recorded for the next runs.
     """
-    while timeout > 0:
-        result = scan_job({"id": scan_job_id})
-        if status != "failed" and result["status"] == "failed":
-            raise FailedScanException(
-                'The scan with ID "{}" has failed unexpectedly.\n\n'
-                "The information about the scan is:\n{}\n".format(scan_job_id, pformat(result))
+    durations = ScanDurations.from_settings() if definition is not None else None
+    if timeout is None:
+        timeout = durations.timeout(definition) if durations else settings.camayoc.scan_timeout
+    try:
+        result = default_watcher().wait(
+            ScanJob(_id=scan_job_id),
+            state=status,
+            timeout=timeout,
+            expected_duration=durations.expected(definition) if durations else None,
+        )
+    except StoppedScanException as e:
+        raise FailedScanException(
+            'The scan with ID "{}" has stopped unexpectedly.\n\n{}'.format(scan_job_id, e)
+        ) from e
+    if result["status"] != status:
+        raise FailedScanException(
+            'The scan with ID "{}" has {} unexpectedly.\n\n'
+            "The information about the scan is:\n{}\n".format(
+                scan_job_id, result["status"], pformat(result)
             )
-        if result["status"] == status:
-            return
-        time.sleep(5)
-        timeout -= 5
-    raise WaitTimeError(
-        'Timeout waiting for scan with ID "{}" to achieve the "{}" status.\n\n'
-        "The information about the scan is:\n{}\n".format(scan_job_id, status, pformat(result))
-    )
+        )
+    if durations and status == "completed" and (duration := job_duration(result)):
+        durations.record(definition, duration)
 
 
 def cli_command(command, options=None, exitstatus=0):
@@ -413,7 +441,7 @@ def scan_show_and_check(scan_name, expected_result=None):
     :param exitstatus: Expected exit status code.
     """
     scan_show_result = scan_show({"name": scan_name})
-    scan_show_result = json.loads(scan_show_result)
+    scan_show_result = json_codec.loads(scan_show_result)
     if expected_result is not None:
         expected_result["id"] = scan_show_result["id"]
         assert expected_result == scan_show_result
@@ -443,31 +471,19 @@ source_show = functools.partial(cli_command, "{} source show".format(client_cmd)
 
 def scan_job(options=None, exitstatus=0):
     """Run ``qpc scan job`` command with ``options`` returning its output."""
-    return json.loads(cli_command("{} -v scan job".format(client_cmd), options, exitstatus))
-
-
-_REPORT_MEMBER_RE = re.compile(r"(?P<report_type>details|deployments|aggregate)(-\d+)?\.json")
+    return json_codec.loads(cli_command("{} -v scan job".format(client_cmd), options, exitstatus))
 
 
 def retrieve_report(scan_job_id):
     """Download a scan-job report tarball and return parsed JSON reports.
 
-    Returns ``(details, deployments, aggregate)``. Filename matching includes a
-    Quipucords download compatibility fix for report-id suffixed members
-    (for example ``details-1.json``).
+    Returns ``(details, deployments, aggregate)``.
     """
     with tempfile.TemporaryDirectory() as tmpdirname:
         output_file = f"{tmpdirname}/report.tar.gz"
         report_download({"scan-job": scan_job_id, "output-file": output_file})
-        reports = {"details": None, "deployments": None, "aggregate": None}
-        with tarfile.open(output_file) as pkg:
-            for member in pkg.getmembers():
-                basename = member.name.rsplit("/", 1)[-1]
-                match = _REPORT_MEMBER_RE.fullmatch(basename)
-                if not match:
-                    continue
-                reports[match.group("report_type")] = json.loads(pkg.extractfile(member).read())
-    return reports["details"], reports["deployments"], reports["aggregate"]
+        bundle = ReportBundle.from_file(output_file)
+    return bundle.details, bundle.deployments, bundle.aggregate
 
 
 def scans_with_source_type(source_type):
@@ -482,7 +498,7 @@ def scans_with_source_type(source_type):
     DataProvider is not aware of them.
     """
     matching_scans = []
-    all_scans = json.loads(cli_command("{} -v scan list".format(client_cmd)))
+    all_scans = json_codec.loads(cli_command("{} -v scan list".format(client_cmd)))
     for scan in all_scans:
         if any(source_type == source.get("source_type") for source in scan.get("sources", [])):
             matching_scans.append(scan)
@@ -6,12 +6,14 @@ from camayoc import api
 from camayoc.config import settings
 from camayoc.data_provider import DataProvider
 from camayoc.data_provider import ScanContainer
+from camayoc.pytest_plugin import scan_container_key
 from camayoc.tests.qpc.cli.utils import clear_all_entities
 
 
 @pytest.fixture(scope="session")
-def data_provider():
-    dp = DataProvider()
+def data_provider(pytestconfig):
+    scan_container = pytestconfig.stash.get(scan_container_key, None)
+    dp = scan_container.data_provider if scan_container else DataProvider()
 
     yield dp
 
@@ -27,9 +29,14 @@ def cleaning_data_provider(data_provider):
 
 
 @pytest.fixture(scope="session")
-def scans(data_provider):
-    scan_container = ScanContainer(data_provider)
+def scans(pytestconfig, data_provider):
+    scan_container = pytestconfig.stash.get(scan_container_key, None)
+    if scan_container is None:
+        scan_container = ScanContainer(data_provider)
+        # Deferred --camayoc-prescan starts scans in this container
+        pytestconfig.stash[scan_container_key] = scan_container
     yield scan_container
+    scan_container.close()
 
 
 @pytest.fixture()
@@ -43,5 +50,5 @@ def shared_client():
        use the shared client to avoid possible problems when running tests in
        parallel.
     """
-    client = api.Client()
-    yield client
+    with api.Client() as client:
+        yield client
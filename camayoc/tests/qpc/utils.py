@@ -1,25 +1,22 @@
 """Utility functions for quipucords server tests."""
 
 import hashlib
-import json
 import pprint
 import tarfile
-import time
 from pathlib import Path
 from typing import Callable
 
 import pytest
 
 from camayoc import api
+from camayoc import json_codec
 from camayoc.config import settings
 from camayoc.constants import QPC_SCAN_STATES
-from camayoc.constants import QPC_SCAN_TERMINAL_STATES
 from camayoc.constants import SOURCE_TYPES_WITH_LIGHTSPEED_SUPPORT
-from camayoc.exceptions import StoppedScanException
-from camayoc.exceptions import WaitTimeError
 from camayoc.qpc_models import Credential
 from camayoc.qpc_models import Scan
 from camayoc.qpc_models import Source
+from camayoc.scan_watcher import default_watcher
 from camayoc.types.scans import FinishedScan
 from camayoc.types.settings import ScanOptions
 
@@ -131,7 +128,7 @@ def assert_lightspeed_report(directory: Path, expect_lightspeed_report: bool):
     for filename in tar.getnames():
         file_fh = tar.extractfile(filename)
         assert file_fh, f"Broken tar archive: {filename}"
-        file_content = json.load(file_fh)
+        file_content = json_codec.load(file_fh)
         if filename.endswith("metadata.json"):
             tar_content["metadata.json"] = file_content
         else:
@@ -159,32 +156,52 @@ def get_object_id(obj):
     if obj._id:
         return obj._id
 
-    available_objs = obj.list(params={"search_by_name": obj.name}).json()
-    for received_obj in available_objs.get("results", []):
+    for received_obj in type(obj).objects(obj.client).filter(name=obj.name):
         if received_obj.get("name") == obj.name:
             return received_obj.get("id")
 
 
-def sort_and_delete(trash):
-    """Sort and delete a list of QPCObject typed items in the correct order."""
+def resolve_object_ids(objects, client=None):
+    """Set ids of ``objects`` whose name is known, but id is not.
+
+    All objects must be of the same type. Objects of that type are listed
+    once, page by page, and matched by name; listing stops as soon as all
+    names are found. Objects not found on the server keep id ``None``.
+    """
+    missing = {}
+    for obj in objects:
+        if not obj._id and obj.name:
+            missing.setdefault(obj.name, []).append(obj)
+    if not missing:
+        return
+
+    model_class = type(next(iter(missing.values()))[0])
+    client = client or next(iter(missing.values()))[0].client
+    for received_obj in model_class.objects(client):
+        for obj in missing.pop(received_obj.get("name"), ()):
+            obj._id = received_obj.get("id")
+        if not missing:
+            break
+
+
+def sort_and_delete(trash, batch_size=None):
+    """Sort and delete a list of QPCObject typed items in the correct order.
+
+    :param batch_size: Maximum number of objects deleted by single request.
+        Defaults to ``cleanup_batch_size`` camayoc setting.
+    """
+    batch_size = batch_size or settings.camayoc.cleanup_batch_size
     creds = []
     sources = []
     scans = []
 
-    client = api.Client(response_handler=api.echo_handler)
+    client = api.get_client(response_handler=api.echo_handler)
     # first sort into types because we have to delete scans before sources
     # and sources before scans
     for obj in trash:
-        # Override client to use a fresh one. It may have been a while
-        # since the object was created and its token may be invalid.
+        # Override client to use one with echo handler. Registry renews
+        # client token if it has expired since the object was created.
         obj.client = client
-        # Get object id based on the name.
-        # This allows us to clean up objects created from UI and CLI.
-        # If object id could not be found, assume object was already deleted.
-        if not obj._id and obj.name:
-            obj._id = get_object_id(obj)
-        if obj._id is None:
-            continue
 
         if isinstance(obj, Credential):
             creds.append(obj)
@@ -194,14 +211,19 @@ def sort_and_delete(trash):
             scans.append(obj)
 
     for collection in (scans, sources, creds):
-        if not collection:
+        # Get object id based on the name.
+        # This allows us to clean up objects created from UI and CLI.
+        # If object id could not be found, assume object was already deleted.
+        resolve_object_ids(collection, client)
+        ids = [obj._id for obj in collection if obj._id is not None]
+        if not ids:
             continue
 
-        ids = [obj._id for obj in collection]
         obj = collection[0]
-        # Only assert that we do not hit an internal server error
-        response = obj.bulk_delete(ids=ids)
-        assert response.status_code < 500, response.content
+        for start in range(0, len(ids), batch_size):
+            # Only assert that we do not hit an internal server error
+            response = obj.bulk_delete(ids=ids[start : start + batch_size])
+            assert response.status_code < 500, response.content
 
 
 def all_source_names() -> list[str]:
@@ -236,7 +258,13 @@ def end_to_end_sources_names():
         yield pytest.param(source_definition.name, id=fixture_id)
 
 
-def wait_until_state(scanjob, timeout=settings.camayoc.scan_timeout, state="completed"):
+def wait_until_state(
+    scanjob,
+    timeout=settings.camayoc.scan_timeout,
+    state="completed",
+    expected_duration=None,
+    max_queue_wait=None,
+):
     """Wait until the scanjob has failed or reached desired state.
 
     The default state is 'completed'.
@@ -259,9 +287,15 @@ def wait_until_state(scanjob, timeout=settings.camayoc.scan_timeout, state="comp
 
     All other terminal states will cause this function to return before
     reaching the timeout.
+
+    Scan job is polled by :func:`camayoc.scan_watcher.default_watcher`,
+    together with jobs waited for by other threads; it is polled more
+    often when it nears ``expected_duration`` seconds. ``timeout`` does not
+    include time job waits in the queue, up to ``max_queue_wait`` seconds
+    (``scan_timeout`` setting by default). JSON of the job in desired state
+    is returned.
     """
     valid_states = QPC_SCAN_STATES + ("stopped",)
-    stopped_states = QPC_SCAN_TERMINAL_STATES + ("stopped",)
     if state not in valid_states:
         raise ValueError(
             "You have called `wait_until_state` and specified an invalid\n"
@@ -269,52 +303,10 @@ def wait_until_state(scanjob, timeout=settings.camayoc.scan_timeout, state="comp
                 state, pprint.pformat(valid_states)
             )
         )
-
-    current_status = scanjob.status()
-    while True:
-        # achieved expected state - happy path
-        if current_status == state:
-            return
-
-        # scanjob is no longer running, user wanted one of stopped states. Stopped is stopped
-        if current_status in stopped_states and state in stopped_states:
-            return
-
-        scanjob_details = scanjob.read().json()
-        exception_format = {
-            "scanjob_id": scanjob._id,
-            "scan_id": scanjob.scan_id,
-            "expected_state": state,
-            "scanjob_state": current_status,
-            "scanjob_details": pprint.pformat(scanjob_details),
-            "scanjob_results": pprint.pformat(scanjob_details.get("tasks")),
-        }
-
-        if current_status in stopped_states and state not in stopped_states:
-            raise StoppedScanException(
-                "You have called wait_until_state() on a scanjob with\n"
-                "ID={scanjob_id} has stopped running instead of reaching \n"
-                'the state="{expected_state}"\n'
-                'When the scanjob stopped, it had the state="{scanjob_state}".'
-                "\nThe scanjob was started for the scan with id {scan_id}"
-                "The full details of the scanjob were \n{scanjob_details}\n"
-                'The "results" available from the scanjob were \n'
-                "{scanjob_results}\n".format(**exception_format)
-            )
-
-        if timeout <= 0:
-            raise WaitTimeError(
-                "You have called wait_until_state() on a scanjob with\n"
-                "ID={scanjob_id} and the scanjob timed out while waiting\n"
-                'to achieve the state="{expected_state}"\n'
-                "When the scanjob timed out, it had the"
-                ' state="{scanjob_state}".\n'
-                "The scanjob was started for the scan with id {scan_id}"
-                "The full details of the scanjob were \n{scanjob_details}\n"
-                'The "results" available from the scanjob were'
-                "\n{scanjob_results}\n".format(**exception_format)
-            )
-
-        time.sleep(5)
-        timeout -= 5
-        current_status = scanjob.status()
+    return default_watcher().wait(
+        scanjob,
+        state=state,
+        timeout=timeout,
+        expected_duration=expected_duration,
+        max_queue_wait=max_queue_wait,
+    )
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from attrs import frozen
+
+
+@frozen
+class RequestEvent:
+    """Data passed to api.Client hooks.
+
+    ``path`` is request path relative to API root, with object ids replaced
+    by ``{id}`` placeholder (e.g. ``v1/jobs/{id}/``), so it can be used to
+    group requests by endpoint. Fields that are not known yet when hook is
+    called are set to ``None``.
+    """
+
+    method: str
+    url: str
+    path: str
+    status_code: Optional[int] = None
+    request_bytes: Optional[int] = None
+    response_bytes: Optional[int] = None
+    elapsed: Optional[float] = None
+    error: Optional[Exception] = None
+    # Time spent waiting for camayoc.rate_limit.RateLimiter, not in elapsed
+    rate_limit_wait: Optional[float] = None
+
+
+@frozen
+class ReportDownload:
+    """Summary of report downloaded by Report.download().
+
+    ``checksum`` is in ``algorithm:hexdigest`` format, e.g. ``sha256:ab12...``.
+    """
+
+    size: int
+    checksum: str
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+from datetime import datetime
 from enum import Enum
+from typing import TYPE_CHECKING
 from typing import Optional
 
+from attrs import field
 from attrs import frozen
 
 from .settings import ScanOptions
 
+if TYPE_CHECKING:
+    from camayoc.report_bundle import ReportBundle
+
 
 class ScanSimplifiedStatusEnum(Enum):
     CREATED = "created"
@@ -14,8 +20,29 @@ class ScanSimplifiedStatusEnum(Enum):
     FAILED = "failed"
 
 
+@frozen
+class ScanAttempt:
+    """Single run of a scan job.
+
+    ``outcome`` is ``completed``, or category of failure: ``failed``,
+    ``canceled``, ``timeout`` or ``error``.
+    """
+
+    scan_job_id: int
+    outcome: str
+    started_at: datetime
+    duration: float
+    error: Optional[Exception] = None
+
+
 @frozen
 class FinishedScan:
+    """Outcome of a scan run by ``ScanContainer``.
+
+    Reports may be given directly, or read on first access from
+    ``report_bundle``.
+    """
+
     scan_id: int
     scan_job_id: int
     status: ScanSimplifiedStatusEnum
@@ -23,8 +50,30 @@ class FinishedScan:
     report_id: Optional[int] = None
     report_origin: Optional[str] = None
     report_can_download: Optional[bool] = None
-    details_report: Optional[dict] = None
-    deployments_report: Optional[dict] = None
-    aggregate_report: Optional[dict] = None
+    _details_report: Optional[dict] = field(default=None, alias="details_report")
+    _deployments_report: Optional[dict] = field(default=None, alias="deployments_report")
+    _aggregate_report: Optional[dict] = field(default=None, alias="aggregate_report")
+    report_bundle: Optional[ReportBundle] = field(default=None, eq=False, repr=False)
+    # Results come from job that existed before, scan was not run
+    reused: bool = False
+    # Every run of the scan, the last one is the one described above
+    attempts: tuple[ScanAttempt, ...] = ()
 
     error: Optional[Exception] = None
+
+    def _report(self, report, report_type):
+        if report is None and self.report_bundle is not None:
+            return getattr(self.report_bundle, report_type)
+        return report
+
+    @property
+    def details_report(self) -> Optional[dict]:
+        return self._report(self._details_report, "details")
+
+    @property
+    def deployments_report(self) -> Optional[dict]:
+        return self._report(self._deployments_report, "deployments")
+
+    @property
+    def aggregate_report(self) -> Optional[dict]:
+        return self._report(self._aggregate_report, "aggregate")
@@ -10,13 +10,124 @@ from pydantic import Field
 from pydantic import model_validator
 
 
+class ScanPollingOptions(BaseModel):
+    # Interval of the first poll of each scan job
+    min_interval: Optional[float] = 0.5
+    max_interval: Optional[float] = 15
+    # Interval grows by that factor after each poll of a running job
+    backoff: Optional[float] = 1.5
+
+
+class ScanReuseOptions(BaseModel):
+    enabled: Optional[bool] = False
+    # Jobs that finished more than that many seconds ago are not reused
+    max_age: Optional[int] = 86400
+    # Reuse only if sources of scan on the server match source definitions
+    same_sources: Optional[bool] = True
+    # Reuse only if report of the job can be downloaded
+    report_available: Optional[bool] = True
+
+
+class AdaptiveScanTimeoutOptions(BaseModel):
+    enabled: Optional[bool] = True
+    # Scans with fewer recorded durations use scan_timeout
+    min_history: Optional[int] = 5
+    # Timeout is this percentile of recorded durations, times safety_factor
+    percentile: Optional[int] = 99
+    safety_factor: Optional[float] = 3
+    floor: Optional[int] = 120
+    ceiling: Optional[int] = 3600
+
+
+class ScanRetryOptions(BaseModel):
+    # Total number of attempts, including the first one; 1 disables retries
+    max_attempts: Optional[int] = 1
+    # Failures worth retrying: scan job ended as failed or canceled, timed
+    # out, or its report could not be retrieved (error)
+    retry_on: Optional[list[Literal["failed", "canceled", "timeout", "error"]]] = [
+        "failed",
+        "canceled",
+        "timeout",
+    ]
+    # No new attempt is started after that many seconds since the first one
+    time_budget: Optional[int] = 3600
+
+
 class CamayocOptions(BaseModel):
     run_scans: Optional[bool] = False
     scan_timeout: Optional[int] = 600
+    # Per-scan timeouts derived from recorded durations of earlier runs
+    adaptive_scan_timeout: Optional[AdaptiveScanTimeoutOptions] = AdaptiveScanTimeoutOptions()
     db_cleanup: Optional[bool] = True
+    # Maximum number of objects deleted by single bulk_delete request
+    cleanup_batch_size: Optional[int] = 500
+    # File with durations of earlier scans, used to start longest scans first
+    # (default: scan_durations.json in XDG cache directory)
+    scan_durations_path: Optional[Path] = None
+    # Use completed scan jobs already on the server instead of running scans again
+    scan_reuse: Optional[ScanReuseOptions] = ScanReuseOptions()
+    # Re-run scans that failed
+    scan_retry: Optional[ScanRetryOptions] = ScanRetryOptions()
+    # How often scan jobs are polled while waiting for them
+    scan_polling: Optional[ScanPollingOptions] = ScanPollingOptions()
     snapshot_test_reference_path: Optional[Path] = None
     snapshot_test_actual_path: Optional[Path] = None
     snapshot_test_reference_synthetic: Optional[bool] = False
+    # Record API responses to cassettes, or replay them without server
+    cassette_mode: Optional[Literal["record", "replay"]] = None
+    cassette_path: Optional[Path] = None
+
+
+class RetryOptions(BaseModel):
+    # Total number of attempts, including the first one; 1 disables retries
+    max_attempts: Optional[int] = 3
+    status_codes: Optional[list[int]] = [502, 503, 504]
+    # Retry POST and PATCH too; these are not idempotent, so it's off by default
+    retry_non_idempotent: Optional[bool] = False
+    backoff_factor: Optional[float] = 0.5
+    backoff_max: Optional[float] = 30
+    # Fraction of backoff that is randomized
+    jitter: Optional[float] = 0.5
+    # Give up retrying if this many seconds passed since first attempt
+    deadline: Optional[float] = 120
+    respect_retry_after: Optional[bool] = True
+
+
+class CacheOptions(BaseModel):
+    enabled: Optional[bool] = False
+    max_entries: Optional[int] = 256
+    max_bytes: Optional[int] = 256 * 2**20
+    # Seconds during which cached response is used without asking the server
+    ttl: Optional[float] = 300
+
+
+class PaginationOptions(BaseModel):
+    page_size: Optional[int] = 100
+    # Number of pages requested ahead of the one being processed
+    concurrency: Optional[int] = 2
+
+
+class IdentityMapOptions(BaseModel):
+    enabled: Optional[bool] = False
+    # Seconds during which object read by model is not read again
+    ttl: Optional[float] = 30
+    max_entries: Optional[int] = 1024
+
+
+class LimitOptions(BaseModel):
+    # Sustained request rate; null disables the limit
+    requests_per_second: Optional[float] = None
+    # Requests that may be sent at once after idle period; defaults to one
+    # second worth of requests
+    burst: Optional[int] = None
+    # Requests waiting for response at the same time; null disables the limit
+    max_in_flight: Optional[int] = None
+
+
+class RateLimitOptions(LimitOptions):
+    # Limits for endpoint classes ("reports" or "crud"), applied in addition
+    # to the global limit above
+    endpoints: Optional[dict[str, LimitOptions]] = {}
 
 
 class QuipucordsServerOptions(BaseModel):
@@ -29,6 +140,25 @@ class QuipucordsServerOptions(BaseModel):
     username: str
     password: str
     ssh_keyfile_path: str
+    # Connection pool used by api.Client. pool_connections is the number of
+    # per-host pools kept around, pool_maxsize is the number of connections
+    # kept open to a single host.
+    pool_connections: Optional[int] = 10
+    pool_maxsize: Optional[int] = 10
+    pool_block: Optional[bool] = False
+    keep_alive: Optional[bool] = True
+    # How long (in seconds) authentication token obtained by api.Client is
+    # assumed to be valid. Server may invalidate token earlier, in which case
+    # client logs in again anyway.
+    token_ttl: Optional[int] = 3600
+    # Renew token that many seconds before it is assumed to expire, so
+    # concurrent requests are not rejected all at once.
+    token_renew_before: Optional[int] = 300
+    retry: Optional[RetryOptions] = RetryOptions()
+    cache: Optional[CacheOptions] = CacheOptions()
+    pagination: Optional[PaginationOptions] = PaginationOptions()
+    rate_limit: Optional[RateLimitOptions] = RateLimitOptions()
+    identity_map: Optional[IdentityMapOptions] = IdentityMapOptions()
 
 
 class QuipucordsCLIOptions(BaseModel):
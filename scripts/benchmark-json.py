@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Compare JSON decoding and encoding speed of standard library and camayoc.json_codec.
+
+By default, synthetic details report is generated, with number of facts
+similar to a report of large network scan. Pass --details to benchmark
+details report saved by snapshot-data.py or downloaded from quipucords.
+"""
+
+import argparse
+import json
+import logging
+import random
+import string
+import timeit
+from pathlib import Path
+
+from camayoc import json_codec
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    level=logging.INFO,
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+logger = logging.getLogger()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Benchmark JSON codec on large details report.",
+    )
+    parser.add_argument("--details", type=Path, help="Path to details report JSON file")
+    parser.add_argument(
+        "--hosts", type=int, default=2000, help="Number of hosts in synthetic report"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Number of times each operation is repeated"
+    )
+    args = parser.parse_args()
+    return args
+
+
+def random_string(rng, length=12):
+    return "".join(rng.choices(string.ascii_letters + string.digits, k=length))
+
+
+def synthetic_details(hosts, seed=0):
+    rng = random.Random(seed)
+    facts = []
+    for index in range(hosts):
+        facts.append(
+            {
+                "uname_hostname": f"host-{index}.example.com",
+                "ifconfig_ip_addresses": [
+                    f"10.{index // 256 % 256}.{index % 256}.{i}" for i in range(3)
+                ],
+                "cpu_count": rng.randint(1, 64),
+                "memory_total_kb": rng.randint(2**20, 2**26),
+                "virt_virt": rng.choice(["virt-guest", "virt-host", None]),
+                "redhat_packages_certs": [random_string(rng, 8) for _ in range(5)],
+                "installed_products": [
+                    {"id": str(rng.randint(1, 500)), "name": random_string(rng, 24)}
+                    for _ in range(rng.randint(1, 6))
+                ],
+                "jboss_eap_running_paths": {
+                    random_string(rng): rng.random() > 0.5 for _ in range(4)
+                },
+                "etc_release_name": "Red Hat Enterprise Linux",
+                "etc_release_version": f"{rng.randint(6, 9)}.{rng.randint(0, 10)}",
+                "system_purpose_json": {
+                    "role": "Red Hat Enterprise Linux Server",
+                    "sla": "Premium",
+                },
+                "yum_enabled_repolist": [
+                    {"name": random_string(rng, 30), "repo": random_string(rng, 20)}
+                    for _ in range(rng.randint(2, 10))
+                ],
+            }
+        )
+    return {
+        "id": 1,
+        "report_type": "details",
+        "report_version": "1.0.0.synthetic",
+        "sources": [
+            {
+                "server_id": random_string(rng, 36),
+                "source_name": "network-source",
+                "source_type": "network",
+                "facts": facts,
+            }
+        ],
+    }
+
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.details:
+        raw = args.details.read_bytes()
+        data = json.loads(raw)
+    else:
+        data = synthetic_details(args.hosts)
+        raw = json.dumps(data).encode("utf-8")
+    logger.info("Document size: %.1f MiB, codec backend: %s", len(raw) / 2**20, json_codec.BACKEND)
+
+    results = {
+        "decode": (
+            best_of(lambda: json.loads(raw), args.repeat),
+            best_of(lambda: json_codec.loads(raw), args.repeat),
+        ),
+        "encode": (
+            best_of(lambda: json.dumps(data), args.repeat),
+            best_of(lambda: json_codec.dumpb(data), args.repeat),
+        ),
+    }
+    print(f"{'operation':<10} {'json [s]':>10} {'codec [s]':>10} {'speedup':>8}")
+    for operation, (stdlib_time, codec_time) in results.items():
+        speedup = stdlib_time / codec_time
+        print(f"{operation:<10} {stdlib_time:>10.3f} {codec_time:>10.3f} {speedup:>7.1f}x")
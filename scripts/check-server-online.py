@@ -35,16 +35,18 @@ def main():
 
     last_exception = None
 
+    api_client = api.Client(response_handler=api.echo_handler, authenticate=False)
     while start_time + args.timeout > time.monotonic():
         try:
-            api_client = api.Client(response_handler=api.echo_handler, authenticate=False)
             response = api_client.get("v1/ping/")
             if response.status_code == 200:
+                api_client.close()
                 return
             raise UnexpectedStatusCodeException(response.status_code)
         except Exception as e:  # noqa: BLE001
             last_exception = e
         time.sleep(0.5)
+    api_client.close()
 
     raise ServerUnavailableException(
         f"Server did not respond within {args.timeout} seconds.\n"
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Run local stand-in for quipucords API server.
+
+Server keeps all data in memory and implements only endpoints used by camayoc.
+Use it to develop and benchmark camayoc code that talks to API, without real
+quipucords and scan targets. Point camayoc at it with quipucords_server settings
+(hostname, port, username, password) printed on start.
+"""
+
+import argparse
+import logging
+import warnings
+from pathlib import Path
+
+from camayoc.fake_server import FakeServer
+from camayoc.fake_server import FakeServerOptions
+
+# urllib is a bit too noisy
+warnings.filterwarnings("module")
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    level=logging.INFO,
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+logger = logging.getLogger()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Run fake quipucords API server with in-memory data.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--username", default="admin", help="Username accepted by server")
+    parser.add_argument("--password", default="pass", help="Password accepted by server")
+    parser.add_argument(
+        "--page-size", type=int, default=10, help="Default number of objects on a page"
+    )
+    parser.add_argument(
+        "--scan-duration",
+        type=float,
+        default=0.0,
+        help="Seconds that scan job is running before it completes",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to every response"
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests that fail (between 0 and 1)",
+    )
+    parser.add_argument(
+        "--failure-status", type=int, default=503, help="Status code of failed requests"
+    )
+    parser.add_argument(
+        "--seed",
+        type=Path,
+        help="Directory with data saved by snapshot-data.py, loaded on start",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.verbose:
+        logging.getLogger("camayoc.fake_server").setLevel(logging.DEBUG)
+    options = FakeServerOptions(
+        username=args.username,
+        password=args.password,
+        page_size=args.page_size,
+        scan_duration=args.scan_duration,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        failure_status=args.failure_status,
+        seed_path=args.seed,
+    )
+    server = FakeServer(options, host=args.host, port=args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopped")
@@ -15,12 +15,15 @@ from datetime import datetime
 from pathlib import Path
 
 from camayoc.api import HTTPError
+from camayoc.config import settings
 from camayoc.data_provider import DataProvider
 from camayoc.exceptions import ScanJobWithoutReportException
 from camayoc.exceptions import StoppedScanException
 from camayoc.exceptions import WaitTimeError
 from camayoc.qpc_models import Report
 from camayoc.qpc_models import ScanJob
+from camayoc.scan_durations import ScanDurations
+from camayoc.scan_durations import job_duration
 from camayoc.tests.qpc.utils import wait_until_state
 
 # urllib is a bit too noisy
@@ -35,9 +38,6 @@ logging.basicConfig(
 logger = logging.getLogger()
 
 TIMEOUT_IN_SECONDS = 240
-REPORT_URL = "/api/v1/reports/{id}/"
-INSIGHTS_REPORT_URL = REPORT_URL + "insights/"
-REPORT_EXTRA_HEADERS = {"Accept": "application/gzip"}
 OUTPUT_FILENAME = "{name}_{insights}_{today.year:04}{today.month:02}{today.day:02}.tar.gz"
 
 
@@ -56,43 +56,50 @@ def should_download_insights(data_provider, scan):
     return any(source_types.get(s, "") == "network" for s in scan.sources)
 
 
-def run_scan(scan, timeout, include_insights_report):
-    """Start a scan and download report files."""
+def run_scan(scan, timeout, include_insights_report, durations):
+    """Start a scan and download report files.
+
+    When ``timeout`` is None, it is learned from earlier runs of the scan.
+    """
     logger.info("=== Processing scan '%s' ===", scan.name)
     today = datetime.now()
+    definition = next((d for d in settings.scans if d.name == scan.name), None)
+    if timeout is None:
+        timeout = TIMEOUT_IN_SECONDS
+        if definition is not None:
+            timeout = durations.timeout(definition, default=TIMEOUT_IN_SECONDS)
+        logger.info("Waiting up to %s seconds for scan '%s'", timeout, scan.name)
     scanjob = ScanJob(scan_id=scan._id)
     scanjob.create()
-    wait_until_state(scanjob, timeout=timeout, state="stopped")
-    report = Report()
+    job = wait_until_state(scanjob, timeout=timeout, state="stopped")
+    if definition is not None and job["status"] == "completed":
+        if duration := job_duration(job):
+            durations.record(definition, duration)
+    report = Report(client=scan.client)
     report.retrieve_from_scan_job(scan_job_id=scanjob._id)
 
     report_dest = OUTPUT_FILENAME.format(name=scan.name, insights="", today=today).replace(
         "__", "_"
     )
     logger.info("Saving report to %s", Path(report_dest).resolve().as_posix())
-    report_content = scan.client.get(REPORT_URL.format(id=report._id), headers=REPORT_EXTRA_HEADERS)
-    with open(report_dest, "bw") as fh:
-        fh.write(report_content.content)
+    report.download(report_dest)
 
     if not include_insights_report:
         return
 
     insights_report_dest = OUTPUT_FILENAME.format(name=scan.name, insights="insights", today=today)
     logger.info("Saving insights report to %s", Path(insights_report_dest).resolve().as_posix())
-    report_content = scan.client.get(
-        INSIGHTS_REPORT_URL.format(id=report._id), headers=REPORT_EXTRA_HEADERS
-    )
-    with open(insights_report_dest, "bw") as fh:
-        fh.write(report_content.content)
+    report.download(insights_report_dest, insights=True)
 
 
 def run_scans(data_provider, timeout, fail_fast, insights_report):
     """Run all the scans - main program loop."""
     some_scan_failed = False
+    durations = ScanDurations.from_settings()
     for scan in data_provider.scans.defined_many({}):
         download_insights = insights_report and should_download_insights(data_provider, scan)
         try:
-            run_scan(scan, timeout, download_insights)
+            run_scan(scan, timeout, download_insights, durations)
         except (
             WaitTimeError,
             StoppedScanException,
@@ -132,8 +139,11 @@ def parse_args():
         "-t",
         "--timeout",
         type=int,
-        default=int(os.environ.get("TIMEOUT", TIMEOUT_IN_SECONDS)),
-        help="Timeout in seconds",
+        default=int(os.environ["TIMEOUT"]) if "TIMEOUT" in os.environ else None,
+        help=(
+            "Timeout in seconds (default: learned from earlier runs of each scan,"
+            f" {TIMEOUT_IN_SECONDS} for new scans)"
+        ),
     )
     parser.add_argument(
         "-x",
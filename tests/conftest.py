@@ -0,0 +1,12 @@
+"""Fixtures for Camayoc unit tests."""
+
+import pytest
+
+from camayoc import api
+
+
+@pytest.fixture(autouse=True)
+def clean_client_registry():
+    """Don't let clients cached by one test leak into another."""
+    yield
+    api.client_registry.clear()
@@ -1,9 +1,15 @@
 # coding=utf-8
 """Unit tests for :mod:`camayoc.api`."""
 
+import hashlib
+import io
 import json
 import random
+import tempfile
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from unittest import mock
 from unittest.mock import MagicMock
 from urllib.parse import urljoin
@@ -11,6 +17,9 @@ from urllib.parse import urljoin
 import requests
 
 from camayoc import api
+from camayoc.exceptions import ReportDownloadError
+from camayoc.fake_server import FakeServer
+from camayoc.fake_server import FakeServerOptions
 from camayoc.qpc_models import Credential
 from camayoc.qpc_models import Report
 from camayoc.qpc_models import Scan
@@ -80,37 +89,71 @@ class APIClientTestCase(unittest.TestCase):
     def test_login(self):
         """Test that when a client is created, it logs in just once."""
         client = api.Client
-        client.login = MagicMock()
-        cl = client(config=CAMAYOC_CONFIG)
-        assert client.login.call_count == 1
-        cl.token = uuid4()
-        assert cl.default_headers() != {}
+        with mock.patch.object(client, "login") as login:
+            cl = client(config=CAMAYOC_CONFIG)
+            assert login.call_count == 1
+            cl.token = uuid4()
+            assert cl.default_headers() != {}
 
     def test_get_user(self):
         """Test that when a client is created, it logs in just once."""
         client = api.Client
-        client.login = MagicMock()
         response = MagicMock(json=MagicMock(return_value={"username": "admin"}))
-        client.request = MagicMock(return_value=response)
-        cl = client(config=CAMAYOC_CONFIG)
-        u = cl.get_user().json()["username"]
-        assert u == CAMAYOC_CONFIG.username
-        client.request.assert_called_once_with("GET", urljoin(cl.url, "v1/users/current/"))
+        with (
+            mock.patch.object(client, "login"),
+            mock.patch.object(client, "request", return_value=response) as request,
+        ):
+            cl = client(config=CAMAYOC_CONFIG)
+            u = cl.get_user().json()["username"]
+            assert u == CAMAYOC_CONFIG.username
+            request.assert_called_once_with("GET", urljoin(cl.url, "v1/users/current/"))
 
     def test_logout(self):
         """Test that when we log out, all credentials are cleared."""
         client = api.Client
-        client.login = MagicMock()
-        cl = client(config=CAMAYOC_CONFIG)
-        assert client.login.call_count == 1
+        with mock.patch.object(client, "login") as login:
+            cl = client(config=CAMAYOC_CONFIG)
+            assert login.call_count == 1
         cl.token = uuid4()
         assert cl.default_headers() != {}
-        client.request = MagicMock()
-        cl.logout()
-        assert client.request.call_count == 1
+        with mock.patch.object(client, "request") as request:
+            cl.logout()
+            assert request.call_count == 1
         assert cl.token is None
         assert cl.default_headers() == {}
 
+    def test_requests_share_session(self):
+        """All HTTP verb methods send requests through one pooled session."""
+        client = api.Client(
+            response_handler=api.echo_handler, authenticate=False, config=CAMAYOC_CONFIG
+        )
+        client.session = MagicMock()
+        client.get("v1/jobs/")
+        client.post("v1/jobs/", payload={})
+        client.put("v1/jobs/1/", payload={})
+        client.delete("v1/jobs/1/")
+        client.options("v1/jobs/")
+        client.head("v1/jobs/")
+        methods = [c.args[0] for c in client.session.request.call_args_list]
+        assert methods == ["GET", "POST", "PUT", "DELETE", "OPTIONS", "HEAD"]
+
+    def test_session_pool_config(self):
+        """Session connection pool is configured from server config."""
+        config = CAMAYOC_CONFIG.model_copy(
+            update={"pool_connections": 3, "pool_maxsize": 42, "keep_alive": False}
+        )
+        client = api.Client(authenticate=False, config=config)
+        adapter = client.session.get_adapter("http://example.com/")
+        assert adapter._pool_connections == 3
+        assert adapter._pool_maxsize == 42
+        assert client.session.headers["Connection"] == "close"
+
+    def test_close(self):
+        """Closing the client closes its session, also when used as context manager."""
+        with api.Client(authenticate=False, config=CAMAYOC_CONFIG) as client:
+            client.session = MagicMock()
+        client.session.close.assert_called_once_with()
+
     def test_response_handler(self):
         """Test that when we get a 4xx or 5xx response, an error is raised."""
         client = api.Client(authenticate=False, config=CAMAYOC_CONFIG)
@@ -159,6 +202,218 @@ class APIClientTestCase(unittest.TestCase):
             client.response_handler(mock_response)
 
 
+class ClientHooksTestCase(unittest.TestCase):
+    """Test hooks of :class:camayoc.api.Client."""
+
+    def test_template_path(self):
+        """Object ids are collapsed in templated paths."""
+        base = "http://example.com:8000/api/"
+        assert api.template_path(base + "v1/jobs/12/connection/", base) == (
+            "v1/jobs/{id}/connection/"
+        )
+        assert api.template_path(base + "v2/sources/?page=2", base) == "v2/sources/"
+        assert api.template_path(base + f"v1/items/{uuid4()}/", base) == "v1/items/{id}/"
+
+    def test_hooks_called(self):
+        """Before and after hooks receive information about request."""
+        client = api.Client(authenticate=False, config=CAMAYOC_CONFIG)
+        response = MagicMock(status_code=200, content=b"12345", headers={})
+        response.request.body = b"{}"
+        client.session = MagicMock()
+        client.session.request.return_value = response
+        before, after, error = MagicMock(), MagicMock(), MagicMock()
+        client.add_hook("before_request", before)
+        client.add_hook("after_response", after)
+        client.add_hook("on_error", error)
+        client.get("v1/jobs/3/")
+        before_event = before.call_args.args[0]
+        assert before_event.path == "v1/jobs/{id}/"
+        assert before_event.status_code is None
+        after_event = after.call_args.args[0]
+        assert after_event.method == "GET"
+        assert after_event.status_code == 200
+        assert after_event.request_bytes == 2
+        assert after_event.response_bytes == 5
+        assert after_event.elapsed >= 0
+        error.assert_not_called()
+
+    def test_error_hook(self):
+        """Error hook is called when request can't be completed."""
+        client = api.Client(authenticate=False, config=CAMAYOC_CONFIG)
+        client.session = MagicMock()
+        client.session.request.side_effect = requests.exceptions.ConnectionError()
+        client.retry_policy = api.NO_RETRY
+        error = MagicMock()
+        with mock.patch.dict(api.global_hooks, {"on_error": [error]}):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                client.get("v1/jobs/")
+        assert isinstance(error.call_args.args[0].error, requests.exceptions.ConnectionError)
+
+    def test_invalid_hook(self):
+        """Only known events are accepted."""
+        client = api.Client(authenticate=False, config=CAMAYOC_CONFIG)
+        with self.assertRaises(ValueError):
+            client.add_hook("after_request", print)
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+    """Test :class:camayoc.api.RetryPolicy and retries in api.Client."""
+
+    def make_client(self, responses):
+        client = api.Client(
+            response_handler=api.echo_handler, authenticate=False, config=CAMAYOC_CONFIG
+        )
+        client.session = MagicMock()
+        client.session.request.side_effect = responses
+        return client
+
+    def response(self, status_code, headers=None):
+        return MagicMock(status_code=status_code, content=b"", headers=headers or {})
+
+    def test_backoff(self):
+        """Backoff grows exponentially and is capped."""
+        policy = api.RetryPolicy(backoff_factor=1, backoff_max=5, jitter=0)
+        assert [policy.backoff(attempt) for attempt in (1, 2, 3, 4)] == [1, 2, 4, 5]
+        policy = api.RetryPolicy(backoff_factor=1, jitter=0.5)
+        assert 0.5 <= policy.backoff(1) <= 1
+
+    def test_delay_rules(self):
+        """Policy retries only retryable failures of idempotent requests."""
+        policy = api.RetryPolicy(max_attempts=3, jitter=0, deadline=10)
+        unavailable = self.response(503)
+        assert policy.delay("GET", 1, 0, response=unavailable) == 0.5
+        assert policy.delay("POST", 1, 0, response=unavailable) is None
+        assert policy.delay("GET", 3, 0, response=unavailable) is None
+        assert policy.delay("GET", 1, 0, response=self.response(404)) is None
+        assert policy.delay("GET", 1, 9.9, response=unavailable) is None
+        error = requests.exceptions.ConnectionError()
+        assert policy.delay("DELETE", 1, 0, error=error) == 0.5
+        assert policy.delay("GET", 1, 0, error=ValueError()) is None
+        policy = api.RetryPolicy(retry_non_idempotent=True, jitter=0)
+        assert policy.delay("POST", 1, 0, response=unavailable) == 0.5
+
+    def test_retry_after(self):
+        """Retry-After header overrides computed backoff."""
+        policy = api.RetryPolicy(jitter=0, backoff_max=10)
+        assert policy.delay("GET", 1, 0, response=self.response(503, {"Retry-After": "7"})) == 7
+        assert policy.delay("GET", 1, 0, response=self.response(503, {"Retry-After": "70"})) == 10
+        policy = api.RetryPolicy(jitter=0, respect_retry_after=False)
+        assert policy.delay("GET", 1, 0, response=self.response(503, {"Retry-After": "7"})) == 0.5
+
+    def test_client_retries(self):
+        """Client retries failed requests and counts retries."""
+        client = self.make_client(
+            [requests.exceptions.ConnectionError(), self.response(502), self.response(200)]
+        )
+        client.retry_policy = api.RetryPolicy(max_attempts=5, jitter=0)
+        with mock.patch.object(api.time, "sleep") as sleep:
+            response = client.get("v1/jobs/")
+        assert response.status_code == 200
+        assert client.metrics["requests"] == 3
+        assert client.metrics["retries"] == 2
+        assert [c.args[0] for c in sleep.call_args_list] == [0.5, 1.0]
+
+    def test_per_call_policy(self):
+        """Policy passed to request takes precedence over client policy."""
+        client = self.make_client([self.response(503), self.response(200)])
+        with mock.patch.object(api.time, "sleep"):
+            response = client.get("v1/jobs/", retry_policy=api.NO_RETRY)
+        assert response.status_code == 503
+        assert client.metrics["retries"] == 0
+
+    def test_error_raised_after_last_attempt(self):
+        """Exception is raised when retries are exhausted."""
+        client = self.make_client([requests.exceptions.ConnectionError()] * 2)
+        client.retry_policy = api.RetryPolicy(max_attempts=2, jitter=0)
+        with mock.patch.object(api.time, "sleep"):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                client.get("v1/jobs/")
+        assert client.metrics["retries"] == 1
+        assert client.metrics["errors"] == 1
+
+
+class ClientAuthenticationTestCase(unittest.TestCase):
+    """Test re-authentication of :class:camayoc.api.Client shared by threads."""
+
+    def setUp(self):
+        self.server = FakeServer(FakeServerOptions(latency=0.02)).start()
+        self.addCleanup(self.server.stop)
+        self.client = api.Client(config=self.server.client_config())
+        self.addCleanup(self.client.close)
+
+    def test_single_flight_relogin(self):
+        """Threads that got invalid token error trigger only one login."""
+        old_token = self.client.token
+        self.server.app.tokens.clear()
+        with mock.patch.object(self.client, "login", wraps=self.client.login) as login:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                users = list(executor.map(lambda _: self.client.get_user(), range(16)))
+            assert login.call_count == 1
+        assert all(user.json()["username"] == "admin" for user in users)
+        assert self.client.token != old_token
+
+    def test_token_renewed_before_expiry(self):
+        """Token that is about to expire is renewed before request is sent."""
+        old_token = self.client.token
+        self.client.token_expires_at = time.monotonic() + 10
+        with mock.patch.object(self.client, "login", wraps=self.client.login) as login:
+            self.client.get_user()
+            self.client.get_user()
+            assert login.call_count == 1
+        assert self.client.token != old_token
+        assert not self.client.token_expired(self.client.config.token_renew_before)
+
+
+class ClientRegistryTestCase(unittest.TestCase):
+    """Test :class:camayoc.api.ClientRegistry."""
+
+    def fake_login(self, client):
+        client.token = uuid4()
+        client.token_expires_at = time.monotonic() + client.config.token_ttl
+
+    def test_shared_client(self):
+        """Registry logs in once and hands out the same client."""
+        registry = api.ClientRegistry()
+        with mock.patch.object(
+            api.Client, "login", autospec=True, side_effect=self.fake_login
+        ) as login:
+            first = registry.get(config=CAMAYOC_CONFIG)
+            second = registry.get(config=CAMAYOC_CONFIG)
+            assert first is second
+            assert login.call_count == 1
+
+    def test_token_shared_between_handlers(self):
+        """Clients with different response handlers reuse cached token."""
+        registry = api.ClientRegistry()
+        with mock.patch.object(
+            api.Client, "login", autospec=True, side_effect=self.fake_login
+        ) as login:
+            code_client = registry.get(config=CAMAYOC_CONFIG)
+            echo_client = registry.get(response_handler=api.echo_handler, config=CAMAYOC_CONFIG)
+            assert code_client is not echo_client
+            assert code_client.token == echo_client.token
+            assert code_client.session is echo_client.session
+            assert login.call_count == 1
+
+    def test_expired_token(self):
+        """Registry logs in again when cached token has expired."""
+        registry = api.ClientRegistry()
+        with mock.patch.object(
+            api.Client, "login", autospec=True, side_effect=self.fake_login
+        ) as login:
+            client = registry.get(config=CAMAYOC_CONFIG)
+            client.token_expires_at = time.monotonic() - 1
+            registry.get(config=CAMAYOC_CONFIG)
+            assert login.call_count == 2
+
+    def test_models_use_registry(self):
+        """Models created without client use client from registry."""
+        mock_client = MagicMock()
+        with mock.patch.object(api, "get_client", return_value=mock_client):
+            assert ScanJob(scan_id=1).client is mock_client
+            assert Report().client is mock_client
+
+
 class CredentialTestCase(unittest.TestCase):
     """Test :mod:camayoc.api."""
 
@@ -242,6 +497,51 @@ class ReportTestCase(unittest.TestCase):
         mock_client.get.assert_called_once_with(f"v2/reports/{report_id}/")
         self.assertIs(result, mock_client.get.return_value)
 
+    def make_download_client(self, chunks):
+        mock_client = MagicMock()
+        response = mock_client.get.return_value.__enter__.return_value
+        response.iter_content.return_value = chunks
+        return mock_client
+
+    def test_download_to_file_object(self):
+        """Report.download() streams chunks to file-like object."""
+        mock_client = self.make_download_client([b"abc", b"def"])
+        report = Report(client=mock_client, _id=5)
+        sink = io.BytesIO()
+        checksum = "sha256:" + hashlib.sha256(b"abcdef").hexdigest()
+        result = report.download(sink, size=6, checksum=checksum)
+        assert sink.getvalue() == b"abcdef"
+        assert result.size == 6
+        assert result.checksum == checksum
+        mock_client.get.assert_called_once_with(
+            "v1/reports/5/", headers={"Accept": "application/gzip"}, stream=True
+        )
+
+    def test_download_insights(self):
+        """Insights report is downloaded from separate endpoint."""
+        mock_client = self.make_download_client([b"abc"])
+        report = Report(client=mock_client, _id=5)
+        report.download(io.BytesIO(), insights=True)
+        assert mock_client.get.call_args.args[0] == "v1/reports/5/insights/"
+
+    def test_download_verification(self):
+        """Corrupted download raises an error and removes partial file."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            destination = Path(tmp_dir) / "report.tar.gz"
+            report = Report(client=self.make_download_client([b"abc"]), _id=5)
+            with self.assertRaises(ReportDownloadError):
+                report.download(destination, size=4)
+            assert not destination.exists()
+
+            report = Report(client=self.make_download_client([b"abc"]), _id=5)
+            with self.assertRaises(ReportDownloadError):
+                report.download(destination, checksum="md5:0123")
+            assert not destination.exists()
+
+            report = Report(client=self.make_download_client([b"abc"]), _id=5)
+            report.download(destination, checksum="md5:" + hashlib.md5(b"abc").hexdigest())
+            assert destination.read_bytes() == b"abc"
+
 
 class ScanJobTestCase(unittest.TestCase):
     """Test :mod:camayoc.api."""
@@ -0,0 +1,164 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.async_api`."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from requests.exceptions import HTTPError
+
+from camayoc import api
+from camayoc.async_api import AsyncClient
+from camayoc.constants import QPC_API_INVALID_TOKEN_MESSAGE
+from camayoc.qpc_models import Report
+from camayoc.qpc_models import ScanJob
+from camayoc.qpc_models import Source
+from camayoc.types.settings import QuipucordsServerOptions
+
+CAMAYOC_CONFIG = QuipucordsServerOptions(
+    hostname="example.com", https=False, username="admin", password="pass", ssh_keyfile_path="/tmp/"
+)
+
+
+def mock_response(status_code=200, json_data=None):
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = json_data if json_data is not None else {}
+    response.text = str(json_data)
+    return response
+
+
+def invalid_token_response():
+    return mock_response(status_code=401, json_data={"detail": QPC_API_INVALID_TOKEN_MESSAGE})
+
+
+def make_client(responses, **kwargs):
+    client = AsyncClient(config=CAMAYOC_CONFIG, **kwargs)
+    client.session = MagicMock()
+    client.session.request.side_effect = responses
+    return client
+
+
+def test_lazy_login():
+    """Client logs in before the first request, and only once."""
+    client = make_client(
+        [
+            mock_response(json_data={"token": "abc"}),
+            mock_response(json_data={"results": []}),
+            mock_response(json_data={"results": []}),
+        ]
+    )
+
+    async def run():
+        await client.get("v2/sources/")
+        await client.get("v2/sources/")
+
+    asyncio.run(run())
+    methods = [c.args[0] for c in client.session.request.call_args_list]
+    assert methods == ["POST", "GET", "GET"]
+    last_headers = client.session.request.call_args.kwargs["headers"]
+    assert last_headers == {"Authorization": "Token abc"}
+    client.close()
+
+
+def test_token_renewed_after_manual_login():
+    """Token obtained by login() is renewed, even without authenticate."""
+    config = CAMAYOC_CONFIG.model_copy(update={"token_ttl": 60, "token_renew_before": 10})
+    client = AsyncClient(config=config, authenticate=False)
+    client.session = MagicMock()
+    client.session.request.side_effect = [
+        mock_response(json_data={"token": "first"}),
+        mock_response(json_data={"results": []}),
+        mock_response(json_data={"token": "second"}),
+        mock_response(json_data={"results": []}),
+    ]
+
+    async def run():
+        await client.login()
+        await client.get("v2/sources/")
+        client.token_expires_at -= 55
+        await client.get("v2/sources/")
+
+    asyncio.run(run())
+    methods = [c.args[0] for c in client.session.request.call_args_list]
+    assert methods == ["POST", "GET", "POST", "GET"]
+    assert client.token == "second"
+    client.close()
+
+
+def test_token_expiry_checked_without_loop():
+    """Token expiry may be checked outside of event loop."""
+    client = make_client([], authenticate=False)
+    client.token = "abc"
+    client.token_expires_at = client._clock() + 60
+    assert not client.token_expired()
+    client.close()
+
+
+def test_response_handler():
+    """Async client uses the same response handlers as blocking client."""
+    client = make_client([mock_response(status_code=404)], authenticate=False)
+    with pytest.raises(HTTPError):
+        asyncio.run(client.get("v2/sources/1/"))
+
+    client = make_client(
+        [mock_response(json_data={"id": 1})],
+        authenticate=False,
+        response_handler=api.json_handler,
+    )
+    assert asyncio.run(client.get("v2/sources/1/")) == {"id": 1}
+    client.close()
+
+
+def test_reauthenticate():
+    """Invalid token makes client log in once and retry the request."""
+    client = make_client(
+        [
+            invalid_token_response(),
+            mock_response(json_data={"token": "new"}),
+            mock_response(status_code=201, json_data={"id": 5}),
+        ],
+        authenticate=False,
+    )
+    client.token = "old"
+    source = Source(client=client, hosts=["localhost"], source_type="network")
+    asyncio.run(source.acreate())
+    assert source._id == 5
+    assert client.token == "new"
+    client.close()
+
+
+def test_concurrent_requests():
+    """Many awaitable model calls can be gathered on one client."""
+    client = make_client(
+        [mock_response(json_data={"status": "completed"}) for _ in range(20)],
+        authenticate=False,
+    )
+
+    async def run():
+        jobs = [ScanJob(client=client, _id=job_id) for job_id in range(20)]
+        return await asyncio.gather(*(job.astatus() for job in jobs))
+
+    assert asyncio.run(run()) == ["completed"] * 20
+    client.close()
+
+
+def test_report_paths():
+    """Report awaitable methods request the same paths as blocking ones."""
+    client = make_client([mock_response() for _ in range(4)], authenticate=False)
+    report = Report(client=client, _id=7)
+
+    async def run():
+        await report.aread()
+        await report.adetails()
+        await report.adeployments()
+        await report.aaggregate()
+
+    asyncio.run(run())
+    urls = [c.args[1] for c in client.session.request.call_args_list]
+    assert urls == [
+        "http://example.com:8000/api/v2/reports/7/",
+        "http://example.com:8000/api/v1/reports/7/details/",
+        "http://example.com:8000/api/v1/reports/7/deployments/",
+        "http://example.com:8000/api/v1/reports/7/aggregate/",
+    ]
+    client.close()
@@ -0,0 +1,194 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.cassette`."""
+
+import functools
+import gzip
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import requests
+
+from camayoc import api
+from camayoc import json_codec
+from camayoc import pagination
+from camayoc.cassette import use_cassette
+from camayoc.exceptions import CassetteMissError
+from camayoc.pytest_plugin import cassette_path
+from camayoc.types.settings import QuipucordsServerOptions
+
+CAMAYOC_CONFIG = QuipucordsServerOptions(
+    hostname="example.com", https=False, username="admin", password="pass", ssh_keyfile_path="/tmp/"
+)
+
+
+def make_response(status_code=200, content=b"{}", headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+class CassetteTestCase(unittest.TestCase):
+    """Test recording and replaying of API responses."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = Path(tmp_dir.name) / "test.json.gz"
+
+    def make_client(self, responses=()):
+        client = api.Client(
+            response_handler=api.echo_handler, authenticate=False, config=CAMAYOC_CONFIG
+        )
+        client.session = MagicMock()
+        client.session.request.side_effect = responses
+        return client
+
+    def record(self, responses, requests_to_send):
+        client = self.make_client(responses)
+        with use_cassette(self.path, "record"):
+            for path, params in requests_to_send:
+                client.get(path, params=params)
+
+    def test_record_and_replay(self):
+        """Replayed responses match recorded ones, and network is not used."""
+        tarball = b"\x1f\x8b\x08\x00binary"
+        self.record(
+            [
+                make_response(content=b'{"status": "running"}'),
+                make_response(content=b'{"status": "completed"}'),
+                make_response(content=tarball, headers={"Content-Type": "application/gzip"}),
+                make_response(status_code=404, content=b'{"detail": "Not found."}'),
+            ],
+            [("v1/jobs/1/", None), ("v1/jobs/1/", None), ("v1/reports/2/", None), ("v1/x/", None)],
+        )
+
+        client = self.make_client(requests.exceptions.ConnectionError())
+        with use_cassette(self.path, "replay"):
+            assert client.get("v1/jobs/1/").json() == {"status": "running"}
+            assert client.get("v1/jobs/1/").json() == {"status": "completed"}
+            # Last response is repeated
+            assert client.get("v1/jobs/1/").json() == {"status": "completed"}
+            report = client.get("v1/reports/2/")
+            assert report.content == tarball
+            assert report.headers["Content-Type"] == "application/gzip"
+            streamed = client.get("v1/reports/2/", stream=True)
+            assert b"".join(streamed.iter_content(4)) == tarball
+            assert client.get("v1/x/").status_code == 404
+        client.session.request.assert_not_called()
+
+    def test_query_string_matched(self):
+        """Requests with different query strings are different requests."""
+        self.record(
+            [make_response(content=b'{"page": 1}'), make_response(content=b'{"page": 2}')],
+            [("v2/sources/", {"page": 1}), ("v2/sources/", {"page": 2})],
+        )
+        client = self.make_client()
+        with use_cassette(self.path, "replay"):
+            assert client.get("v2/sources/", params={"page": 2}).json() == {"page": 2}
+            with self.assertRaises(CassetteMissError):
+                client.get("v2/sources/", params={"page": 3})
+
+    def test_volatile_query_params_ignored(self):
+        """Randomly generated names in query string do not prevent replay."""
+        self.record(
+            [make_response(content=b'{"count": 1}')],
+            [("v2/sources/", {"name": "3f1c", "page": 1})],
+        )
+        client = self.make_client()
+        with use_cassette(self.path, "replay"):
+            response = client.get("v2/sources/", params={"name": "9ab0", "page": 1})
+            assert response.json() == {"count": 1}
+            with self.assertRaises(CassetteMissError):
+                client.get("v2/sources/", params={"name": "9ab0", "page": 2})
+
+    def test_thread_scoped(self):
+        """Other threads use session cassette instead of test cassette."""
+        session_path = self.path.with_name("session.json.gz")
+        responses = [make_response(content=b'{"thread": "test"}')]
+        background_responses = [make_response(content=b'{"thread": "background"}')]
+        client = self.make_client(responses)
+        background_client = self.make_client(background_responses)
+        with use_cassette(session_path, "record", session=True):
+            with use_cassette(self.path, "record"):
+                thread = threading.Thread(target=background_client.get, args=("v1/jobs/1/",))
+                thread.start()
+                thread.join()
+                client.get("v1/jobs/1/")
+
+        client = self.make_client()
+        with use_cassette(session_path, "replay", session=True):
+            with use_cassette(self.path, "replay") as cassette:
+                assert len(cassette) == 1
+                assert client.get("v1/jobs/1/").json() == {"thread": "test"}
+                result = []
+                thread = threading.Thread(
+                    target=lambda: result.append(client.get("v1/jobs/1/").json())
+                )
+                thread.start()
+                thread.join()
+                assert result == [{"thread": "background"}]
+
+    def test_worker_threads_bound(self):
+        """Pages prefetched on worker threads use cassette of the test thread."""
+        session_path = self.path.with_name("session.json.gz")
+        client = self.make_client()
+
+        def page(method, url, params, **kwargs):
+            number = params["page"]
+            body = {"count": 4, "results": [number], "next": "more" if number < 4 else None}
+            return make_response(content=json_codec.dumpb(body))
+
+        client.session.request.side_effect = page
+        with use_cassette(session_path, "record", session=True) as session_cassette:
+            with use_cassette(self.path, "record") as test_cassette:
+                fetch = functools.partial(client.get, "v2/sources/")
+                items = list(pagination.iter_items(fetch, concurrency=3))
+            assert items == [1, 2, 3, 4]
+            assert len(test_cassette) == 4
+            assert len(session_cassette) == 0
+
+        client = self.make_client(requests.exceptions.ConnectionError())
+        with use_cassette(self.path, "replay"):
+            fetch = functools.partial(client.get, "v2/sources/")
+            items = list(pagination.iter_items(fetch, concurrency=3))
+        assert items == [1, 2, 3, 4]
+        client.session.request.assert_not_called()
+
+    def test_polling_compacted(self):
+        """Consecutive identical responses are stored once."""
+        running = b'{"status": "running"}'
+        self.record(
+            [make_response(content=running) for _ in range(5)],
+            [("v1/jobs/1/", None)] * 5,
+        )
+        with use_cassette(self.path, "replay") as cassette:
+            assert len(cassette) == 1
+
+    def test_secrets_scrubbed(self):
+        """Tokens and passwords are not saved in cassette."""
+        self.record(
+            [
+                make_response(content=b'{"token": "secret-token"}'),
+                make_response(content=b'{"results": [{"name": "a", "password": "secret-pass"}]}'),
+            ],
+            [("v1/token/", None), ("v2/credentials/", None)],
+        )
+        with gzip.open(self.path, "rt") as fh:
+            saved = fh.read()
+        assert "secret" not in saved
+        client = self.make_client()
+        with use_cassette(self.path, "replay"):
+            credentials = client.get("v2/credentials/").json()
+        assert credentials["results"][0] == {"name": "a", "password": "********"}
+
+    def test_cassette_path(self):
+        """Every test has its own cassette file."""
+        nodeid = "camayoc/tests/qpc/api/test_x.py::test_y[network-1]"
+        assert cassette_path(Path("/c"), nodeid) == Path(
+            "/c/camayoc/tests/qpc/api/test_x.py/test_y_network-1_.json.gz"
+        )
@@ -0,0 +1,179 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.fake_server`."""
+
+import io
+import json
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import requests
+
+from camayoc import api
+from camayoc.db_serializer import DBSerializer
+from camayoc.fake_server import FakeServer
+from camayoc.fake_server import FakeServerOptions
+from camayoc.qpc_models import Credential
+from camayoc.qpc_models import Report
+from camayoc.qpc_models import Scan
+from camayoc.qpc_models import ScanJob
+from camayoc.qpc_models import Source
+
+
+class FakeServerTestCase(unittest.TestCase):
+    """Test camayoc models against :class:camayoc.fake_server.FakeServer."""
+
+    options = FakeServerOptions(page_size=2)
+
+    def setUp(self):
+        self.server = FakeServer(self.options).start()
+        self.addCleanup(self.server.stop)
+        self.client = api.Client(config=self.server.client_config())
+        self.addCleanup(self.client.close)
+
+    def create_scan(self, hosts=("10.0.0.1", "10.0.0.2", "10.0.0.3")):
+        cred = Credential(client=self.client, cred_type="network", password="secret")
+        cred.create()
+        source = Source(
+            client=self.client,
+            source_type="network",
+            hosts=list(hosts),
+            credential_ids=[cred._id],
+        )
+        source.create()
+        scan = Scan(client=self.client, source_ids=[source._id])
+        scan.create()
+        return cred, source, scan
+
+    def test_authentication(self):
+        """Requests without valid token are rejected."""
+        assert self.client.get_user().json()["username"] == "admin"
+        response = requests.get(self.server.url + "v2/sources/")
+        assert response.status_code == 401
+        with self.assertRaises(requests.HTTPError):
+            api.Client(config=self.server.client_config().model_copy(update={"password": "x"}))
+
+    def test_crud(self):
+        """Objects can be created, read, updated and deleted."""
+        cred, source, scan = self.create_scan()
+        credential = cred.read().json()
+        assert credential["password"] == "********"
+        assert source.equivalent(source.read().json())
+        assert scan.read().json()["sources"][0]["id"] == source._id
+
+        source.hosts = ["10.0.0.9"]
+        assert source.update().json()["hosts"] == ["10.0.0.9"]
+        scan.delete()
+        with self.assertRaises(requests.HTTPError):
+            scan.read()
+
+    def test_pagination_and_bulk_delete(self):
+        """Listings are paginated, and objects can be deleted in bulk."""
+        creds = [
+            Credential(client=self.client, cred_type="network", password="p") for _ in range(5)
+        ]
+        for cred in creds:
+            cred.create()
+        first_page = creds[0].list().json()
+        assert first_page["count"] == 5
+        assert len(first_page["results"]) == 2
+        assert first_page["next"]
+        assert [c["id"] for c in creds[0].iter_items()] == [c._id for c in creds]
+
+        response = creds[0].bulk_delete(ids=[creds[0]._id, creds[1]._id, 999])
+        assert response.json()["deleted"] == [creds[0]._id, creds[1]._id]
+        assert response.json()["missing"] == [999]
+        assert creds[0].list().json()["count"] == 3
+
+    def test_scan_job_and_report(self):
+        """Scan job completes and produces results and report."""
+        _, source, scan = self.create_scan()
+        job = ScanJob(client=self.client, scan_id=scan._id)
+        job.create()
+        assert job.status() == "completed"
+        connection = list(job.iter_items(job.connection_results))
+        assert sorted(result["name"] for result in connection) == source.hosts
+        assert source.read().json()["connection"]["id"] == job._id
+        assert scan.read().json()["jobs"][0]["id"] == job._id
+
+        report = Report(client=self.client)
+        report.retrieve_from_scan_job(job._id)
+        assert report.read().json()["can_download"]
+        details = report.details().json()
+        assert len(details["sources"][0]["facts"]) == 3
+        fingerprints = report.deployments().json()["system_fingerprints"]
+        assert len(fingerprints) == 3
+
+        tarball = io.BytesIO()
+        report.download(tarball)
+        tarball.seek(0)
+        with tarfile.open(fileobj=tarball, mode="r:gz") as tar:
+            names = sorted(Path(name).name for name in tar.getnames())
+        assert names == ["aggregate.json", "deployments.json", "details.json"]
+
+    def test_seed_from_serializer(self):
+        """Data saved by DBSerializer can be loaded into new server."""
+        _, _, scan = self.create_scan()
+        ScanJob(client=self.client, scan_id=scan._id).create()
+        config = self.server.client_config()
+        client_class = api.Client
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with mock.patch(
+                "camayoc.db_serializer.api.Client", lambda: client_class(config=config)
+            ):
+                DBSerializer(Path(tmp_dir)).serialize()
+            saved_sources = json.loads((Path(tmp_dir) / "sources.json").read_text())
+
+            seeded = FakeServer(FakeServerOptions(seed_path=Path(tmp_dir))).start()
+            self.addCleanup(seeded.stop)
+            client = api.Client(config=seeded.client_config())
+            self.addCleanup(client.close)
+            assert list(Source(client=client).iter_items()) == saved_sources
+            scan_json = Scan(client=client, _id=scan._id).read().json()
+            report_id = scan_json["most_recent"]["report_id"]
+            details = Report(client=client, _id=report_id).details().json()
+            assert len(details["sources"][0]["facts"]) == 3
+            # New objects do not reuse seeded ids
+            new_scan = Scan(client=client, source_ids=[saved_sources[0]["id"]])
+            new_scan.create()
+            assert new_scan._id > scan._id
+
+
+class FakeServerBehaviorTestCase(unittest.TestCase):
+    """Test latency and failure injection of fake server."""
+
+    def test_failure_injection(self):
+        """Injected failures are retried by the client."""
+        options = FakeServerOptions(failure_rate=0.5)
+        with FakeServer(options) as server:
+            server.random.seed(1)
+            client = api.Client(authenticate=False, config=server.client_config())
+            client.retry_policy = api.RetryPolicy(
+                max_attempts=20, backoff_factor=0, jitter=0, retry_non_idempotent=True
+            )
+            client.login()
+            for _ in range(10):
+                client.get_user()
+            assert client.metrics["retries"] > 0
+            client.close()
+
+    def test_scan_duration(self):
+        """Scan job is running until scan duration passes, and can be canceled."""
+        with FakeServer(FakeServerOptions(scan_duration=60)) as server:
+            client = api.Client(config=server.client_config())
+            cred = Credential(client=client, cred_type="network", password="p")
+            cred.create()
+            source = Source(
+                client=client, source_type="network", hosts=["h"], credential_ids=[cred._id]
+            )
+            source.create()
+            scan = Scan(client=client, source_ids=[source._id])
+            scan.create()
+            job = ScanJob(client=client, scan_id=scan._id)
+            job.create()
+            assert job.status() == "running"
+            job.cancel()
+            assert job.status() == "canceled"
+            client.close()
@@ -0,0 +1,206 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.http_cache`."""
+
+import time
+import unittest
+from unittest import mock
+from unittest.mock import MagicMock
+
+import requests
+
+from camayoc import api
+from camayoc.fake_server import FakeServer
+from camayoc.fake_server import FakeServerOptions
+from camayoc.http_cache import ResponseCache
+from camayoc.qpc_models import Credential
+from camayoc.qpc_models import Scan
+from camayoc.qpc_models import ScanJob
+from camayoc.qpc_models import Source
+from camayoc.types.settings import CacheOptions
+from camayoc.types.settings import QuipucordsServerOptions
+
+CAMAYOC_CONFIG = QuipucordsServerOptions(
+    hostname="example.com",
+    https=False,
+    username="admin",
+    password="pass",
+    ssh_keyfile_path="/tmp/",
+    cache={"enabled": True, "ttl": 60},
+)
+
+
+def make_response(status_code=200, content=b"{}", headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    """Test :class:camayoc.http_cache.ResponseCache."""
+
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted when cache is full."""
+        cache = ResponseCache(max_entries=2)
+        cache.store("a", "v1/a/", make_response())
+        cache.store("b", "v1/b/", make_response())
+        cache.get("a")
+        cache.store("c", "v1/c/", make_response())
+        assert len(cache) == 2
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+
+    def test_size_limit(self):
+        """Total size of cached bodies is bounded, too large bodies are not stored."""
+        cache = ResponseCache(max_bytes=10)
+        cache.store("big", "v1/big/", make_response(content=b"x" * 11))
+        assert cache.get("big") is None
+        cache.store("a", "v1/a/", make_response(content=b"x" * 6))
+        cache.store("b", "v1/b/", make_response(content=b"x" * 6))
+        assert cache.get("a") is None
+        assert cache.get("b") is not None
+
+    def test_only_successful_responses(self):
+        """Error responses are not cached."""
+        cache = ResponseCache()
+        cache.store("a", "v1/a/", make_response(status_code=404))
+        assert cache.get("a") is None
+
+    def test_invalidate(self):
+        """Invalidation drops all responses of the same collection."""
+        cache = ResponseCache()
+        cache.store("list", "v2/sources/", make_response())
+        cache.store("item", "v2/sources/5/", make_response())
+        cache.store("other", "v2/credentials/", make_response())
+        cache.invalidate("v2/sources/6/")
+        assert cache.get("list") is None
+        assert cache.get("item") is None
+        assert cache.get("other") is not None
+
+    def test_invalidate_related(self):
+        """Invalidation drops related collections too, in every API version."""
+        cache = ResponseCache()
+        etag = {"ETag": '"1"'}
+        cache.store("job", "v1/jobs/3/", make_response(headers=etag))
+        cache.store("scan_jobs", "v1/scans/1/jobs/", make_response(headers=etag))
+        cache.store("scan", "v1/scans/1/", make_response(headers=etag))
+        cache.store("report", "v2/reports/4/", make_response())
+        cache.store("credential", "v2/credentials/2/", make_response())
+        assert len(cache) == 5
+        cache.invalidate("v1/scans/1/jobs/")
+        assert len(cache) == 1
+        assert cache.get("credential") is not None
+
+        cache.store("job", "v1/jobs/3/", make_response(headers=etag))
+        cache.store("scan", "v1/scans/1/", make_response(headers=etag))
+        cache.invalidate("v1/jobs/3/cancel/")
+        assert cache.get("scan") is None
+        assert cache.get("job") is None
+
+    def test_self_updating_collections(self):
+        """Scans and jobs are cached only when they can be revalidated."""
+        cache = ResponseCache()
+        cache.store("job", "v1/jobs/3/", make_response())
+        cache.store("scans", "v1/scans/", make_response())
+        assert len(cache) == 0
+        cache.store("job", "v1/jobs/3/", make_response(headers={"ETag": '"1"'}))
+        assert cache.get("job") is not None
+
+    def test_validators(self):
+        """Conditional request headers are taken from cached response."""
+        cache = ResponseCache()
+        headers = {"ETag": '"abc"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+        cache.store("a", "v1/a/", make_response(headers=headers))
+        assert cache.get("a").validators() == {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+        }
+
+
+class ClientCacheTestCase(unittest.TestCase):
+    """Test response caching in :class:camayoc.api.Client."""
+
+    def make_client(self, responses):
+        client = api.Client(
+            response_handler=api.echo_handler, authenticate=False, config=CAMAYOC_CONFIG
+        )
+        client.session = MagicMock()
+        client.session.request.side_effect = responses
+        return client
+
+    def test_disabled_by_default(self):
+        """Cache must be enabled explicitly in config."""
+        config = CAMAYOC_CONFIG.model_copy(update={"cache": CacheOptions()})
+        client = api.Client(authenticate=False, config=config)
+        assert client.response_cache is None
+
+    def test_fresh_response_served_from_cache(self):
+        """Repeated GET request is not sent while cached response is fresh."""
+        client = self.make_client([make_response(content=b'{"id": 1}')])
+        first = client.get("v2/sources/1/")
+        second = client.get("v2/sources/1/")
+        assert client.session.request.call_count == 1
+        assert second is not first
+        assert second.json() == {"id": 1}
+        assert client.metrics["cache_hits"] == 1
+        assert client.metrics["cache_misses"] == 1
+
+    def test_query_string_is_part_of_key(self):
+        """Different pages of a listing are cached separately."""
+        client = self.make_client([make_response(), make_response()])
+        client.get("v2/sources/", params={"page": 1})
+        client.get("v2/sources/", params={"page": 2})
+        client.get("v2/sources/", params={"page": 1})
+        assert client.session.request.call_count == 2
+
+    def test_bypass(self):
+        """Cache is skipped when asked to."""
+        client = self.make_client([make_response(), make_response()])
+        client.get("v1/jobs/1/")
+        client.get("v1/jobs/1/", cache=False)
+        assert client.session.request.call_count == 2
+
+    def test_revalidation(self):
+        """Stale response is revalidated and reused when server replies 304."""
+        cached = make_response(content=b'{"id": 1}', headers={"ETag": '"v1"'})
+        client = self.make_client([cached, make_response(status_code=304, content=b"")])
+        client.get("v2/sources/1/")
+        with mock.patch("camayoc.http_cache.time.monotonic", return_value=10**9):
+            response = client.get("v2/sources/1/")
+        assert response.status_code == 200
+        assert response.json() == {"id": 1}
+        request_headers = client.session.request.call_args.kwargs["headers"]
+        assert request_headers["If-None-Match"] == '"v1"'
+        assert client.metrics["cache_revalidated"] == 1
+
+    def test_write_invalidates(self):
+        """Modifying request drops cached responses of the same collection."""
+        client = self.make_client([make_response(), make_response(), make_response()])
+        client.get("v2/sources/")
+        client.put("v2/sources/1/", {})
+        client.get("v2/sources/")
+        assert client.session.request.call_count == 3
+
+    def test_job_state_revalidated(self):
+        """Cached scan job is revalidated on every read and reflects state changes."""
+        with FakeServer(FakeServerOptions(scan_duration=0.2)) as server:
+            config = server.client_config(cache={"enabled": True, "ttl": 60})
+            client = api.Client(config=config)
+            cred = Credential(client=client, cred_type="network", password="p")
+            cred.create()
+            source = Source(
+                client=client, source_type="network", hosts=["h1"], credential_ids=[cred._id]
+            )
+            source.create()
+            scan = Scan(client=client, source_ids=[source._id])
+            scan.create()
+            job = ScanJob(client=client, scan_id=scan._id)
+            job.create()
+            path = f"v1/jobs/{job._id}/"
+            assert client.get(path).json()["status"] != "completed"
+            time.sleep(0.3)
+            assert client.get(path).json()["status"] == "completed"
+            assert client.get(path).json()["status"] == "completed"
+            assert client.metrics["cache_hits"] == 0
+            assert client.metrics["cache_revalidated"] == 1
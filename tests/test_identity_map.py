@@ -0,0 +1,138 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.identity_map`."""
+
+import unittest
+from unittest import mock
+
+import requests
+
+from camayoc import api
+from camayoc.fake_server import FakeServer
+from camayoc.fake_server import FakeServerOptions
+from camayoc.identity_map import IdentityMap
+from camayoc.qpc_models import Credential
+from camayoc.qpc_models import Scan
+from camayoc.qpc_models import ScanJob
+from camayoc.qpc_models import Source
+from camayoc.types.settings import IdentityMapOptions
+
+
+def make_response(status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b"{}"
+    return response
+
+
+class IdentityMapTestCase(unittest.TestCase):
+    """Test models sharing instances and reads through identity map."""
+
+    def setUp(self):
+        self.server = FakeServer(FakeServerOptions(scan_duration=60)).start()
+        self.addCleanup(self.server.stop)
+        config = self.server.client_config(identity_map=IdentityMapOptions(enabled=True))
+        self.client = api.Client(config=config)
+        self.addCleanup(self.client.close)
+        self.reads = []
+        self.client.add_hook(
+            "before_request", lambda event: event.method == "GET" and self.reads.append(event)
+        )
+        self.cred = Credential(client=self.client, cred_type="network", password="p")
+        self.cred.create()
+
+    def make_source(self):
+        source = Source(
+            client=self.client,
+            source_type="network",
+            hosts=["10.0.0.1"],
+            credential_ids=[self.cred._id],
+        )
+        source.create()
+        return source
+
+    def test_same_instance(self):
+        """The same instance is returned for the same object."""
+        source = self.make_source()
+        assert Source.from_id(source._id, client=self.client) is source
+        assert Credential.from_id(self.cred._id, client=self.client) is self.cred
+        other = Source.from_id(source._id + 1, client=self.client)
+        assert other is Source.from_id(source._id + 1, client=self.client)
+        assert other is not source
+
+    def test_read_through(self):
+        """Repeated reads are served from identity map until object changes."""
+        source = self.make_source()
+        first = source.read().json()
+        assert source.read().json() == first
+        assert len(self.reads) == 1
+
+        source.hosts = ["10.0.0.2"]
+        source.update()
+        assert source.read().json()["hosts"] == ["10.0.0.2"]
+        assert len(self.reads) == 2
+
+        assert source.read(cache=False).json()["hosts"] == ["10.0.0.2"]
+        assert len(self.reads) == 3
+
+    def test_freshness(self):
+        """Cached read is used only for ttl seconds."""
+        source = self.make_source()
+        source.read()
+        with mock.patch("camayoc.identity_map.time.monotonic", return_value=10**9):
+            source.read()
+        assert len(self.reads) == 2
+
+    def test_delete_invalidates(self):
+        """Deleted objects are not served from identity map."""
+        sources = [self.make_source() for _ in range(3)]
+        for source in sources:
+            source.read()
+        sources[0].delete()
+        sources[1].bulk_delete(ids=[sources[1]._id])
+        assert len(self.client.identity_map) == 1
+        for source in sources[:2]:
+            with self.assertRaises(Exception):
+                source.read()
+        sources[2].read()
+        assert len(self.reads) == 5
+
+    def test_cancel_invalidates(self):
+        """Canceled scan job is not served from identity map."""
+        source = self.make_source()
+        scan = Scan(client=self.client, source_ids=[source._id])
+        scan.create()
+        job = ScanJob(client=self.client, scan_id=scan._id)
+        job.create()
+        assert job.read().json()["status"] != "canceled"
+        job.cancel()
+        assert job.read().json()["status"] == "canceled"
+        assert len(self.reads) == 2
+
+    def test_read_many(self):
+        """Objects read by query set share identity map with models."""
+        sources = [self.make_source() for _ in range(3)]
+        sources[0].read()
+        ids = [source._id for source in sources]
+        results = list(Source.objects(self.client).read_many(ids))
+        assert [result["id"] for result in results] == ids
+        assert len(self.reads) == 3
+        assert Source.from_id(ids[1], client=self.client).read().json() == results[1]
+        assert len(self.reads) == 3
+
+    def test_bounded(self):
+        """Least recently used responses are evicted."""
+        identity_map = IdentityMap(max_entries=2)
+        for object_id in range(3):
+            identity_map.store_response("v2/sources/", object_id, make_response())
+        assert identity_map.cached_response("v2/sources/", 0) is None
+        assert identity_map.cached_response("v2/sources/", 2) is not None
+        identity_map.store_response("v2/sources/", 3, make_response(status_code=404))
+        assert identity_map.cached_response("v2/sources/", 3) is None
+
+    def test_disabled_by_default(self):
+        """Without identity map, every read goes to server."""
+        client = api.Client(config=self.server.client_config())
+        self.addCleanup(client.close)
+        assert client.identity_map is None
+        source = Source.from_id(self.make_source()._id, client=client)
+        assert source is not Source.from_id(source._id, client=client)
@@ -0,0 +1,72 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.json_codec`."""
+
+import io
+import json
+import unittest
+from unittest import mock
+
+import requests
+
+from camayoc import api
+from camayoc import json_codec
+
+DOCUMENT = {"name": "źródło", "hosts": ["10.0.0.1"], "port": 22, "ratio": 0.5, "on": None}
+
+
+class JSONCodecTestCase(unittest.TestCase):
+    """Test :mod:camayoc.json_codec with installed and stdlib backend."""
+
+    def run_with_backends(self, test):
+        for backend in (json_codec.orjson, None):
+            with self.subTest(backend=backend), mock.patch.object(json_codec, "orjson", backend):
+                test()
+
+    def test_round_trip(self):
+        """Encoded documents decode to the same data."""
+
+        def test():
+            assert json_codec.loads(json_codec.dumps(DOCUMENT)) == DOCUMENT
+            assert json_codec.loads(json_codec.dumpb(DOCUMENT)) == DOCUMENT
+            assert json_codec.load(io.BytesIO(json_codec.dumpb(DOCUMENT))) == DOCUMENT
+            fh = io.StringIO()
+            json_codec.dump(DOCUMENT, fh)
+            assert json.loads(fh.getvalue()) == DOCUMENT
+
+        self.run_with_backends(test)
+
+    def test_output_format(self):
+        """Output does not depend on backend."""
+        outputs = set()
+        self.run_with_backends(lambda: outputs.add(json_codec.dumps(DOCUMENT)))
+        assert len(outputs) == 1
+
+    def test_decode_error(self):
+        """Invalid documents raise stdlib exception."""
+
+        def test():
+            with self.assertRaises(json.JSONDecodeError):
+                json_codec.loads(b"{not json")
+
+        self.run_with_backends(test)
+
+    def test_unsupported_data_encoded(self):
+        """Data not supported by accelerated backend is encoded anyway."""
+        data = {"big": 2**70, 1: "non-string key"}
+        assert json.loads(json_codec.dumps(data)) == {"big": 2**70, "1": "non-string key"}
+
+    def test_client_response(self):
+        """Client responses are decoded with codec."""
+        client = api.Client(authenticate=False, url="http://example.com/api/")
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json_codec.dumpb(DOCUMENT)
+        client.session = mock.MagicMock()
+        client.session.request.return_value = response
+        with mock.patch.object(json_codec, "loads", wraps=json_codec.loads) as loads:
+            assert client.get("v2/sources/").json() == DOCUMENT
+            assert loads.call_count == 1
+
+        response._content = b"<html>"
+        with self.assertRaises(requests.exceptions.JSONDecodeError):
+            client.get("v2/sources/").json()
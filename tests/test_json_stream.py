@@ -0,0 +1,116 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.json_stream`."""
+
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from camayoc import api
+from camayoc import json_stream
+from camayoc.fake_server import FakeServer
+from camayoc.qpc_models import Credential
+from camayoc.qpc_models import Report
+from camayoc.qpc_models import Scan
+from camayoc.qpc_models import ScanJob
+from camayoc.qpc_models import Source
+
+DETAILS = {
+    "id": 1,
+    "sources": [
+        {
+            "source_name": "net",
+            "facts": [
+                {"uname_hostname": "a", "ips": ["10.0.0.1"], "cpu": 2},
+                {"uname_hostname": 'b\\"]}', "nested": {"facts": [1, 2]}, "cpu": 4},
+            ],
+            "server_id": "x",
+        },
+        {"source_name": "empty", "facts": []},
+        {"source_name": "sat", "facts": [{"uname_hostname": "zażółć", "n": -1.5e3, "ok": True}]},
+    ],
+    "report_version": "1.0",
+}
+
+
+def chunked(text, size):
+    data = text.encode("utf-8")
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class JSONStreamTestCase(unittest.TestCase):
+    """Test :func:camayoc.json_stream.iter_items."""
+
+    def test_facts(self):
+        """Facts are yielded regardless of how document is split into chunks."""
+        expected = [fact for source in DETAILS["sources"] for fact in source["facts"]]
+        for indent in (None, 2):
+            document = json.dumps(DETAILS, indent=indent, ensure_ascii=False)
+            for size in (1, 3, 7, 1024):
+                with self.subTest(indent=indent, size=size):
+                    facts = list(json_stream.iter_facts(chunked(document, size)))
+                    assert facts == expected
+
+    def test_numbers_split_across_chunks(self):
+        """Numbers are decoded whole wherever chunk boundary falls."""
+        document = '{"a": 1.5, "b": -2e10, "c": 3E-2, "d": 10, "sources": [{"facts": [0.25]}]}'
+        for size in range(1, len(document) + 1):
+            with self.subTest(size=size):
+                facts = list(json_stream.iter_facts(chunked(document, size)))
+                assert facts == [0.25]
+                items = list(json_stream.iter_items(chunked(document, size), ("d",)))
+                assert items == [10]
+
+    def test_sources(self):
+        """Files, file objects and iterables of text are accepted."""
+        deployments = {"report_id": 1, "system_fingerprints": [{"name": "a"}, {"name": "b"}]}
+        document = json.dumps(deployments)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "deployments.json"
+            path.write_text(document)
+            sources = [path, str(path), io.BytesIO(document.encode()), io.StringIO(document)]
+            for source in sources + [[document]]:
+                with self.subTest(source=source):
+                    fingerprints = list(json_stream.iter_fingerprints(source, chunk_size=5))
+                    assert fingerprints == deployments["system_fingerprints"]
+
+    def test_path_not_found(self):
+        """Nothing is yielded when document does not have requested path."""
+        assert list(json_stream.iter_fingerprints([json.dumps(DETAILS)])) == []
+        assert list(json_stream.iter_items(["[1, 2]"], ("sources", "*"))) == []
+        assert list(json_stream.iter_items(["[1, 2]"], ("*",))) == [1, 2]
+
+    def test_malformed(self):
+        """Truncated or malformed documents raise decode error."""
+        document = json.dumps(DETAILS)
+        for broken in (document[:60], document.replace(",", ";", 1), '{"sources": [{]}'):
+            with self.subTest(document=broken), self.assertRaises(json.JSONDecodeError):
+                list(json_stream.iter_facts(chunked(broken, 8)))
+
+
+class ReportStreamTestCase(unittest.TestCase):
+    """Test streaming of reports from server."""
+
+    def test_report_iterators(self):
+        """Facts and fingerprints are streamed from report endpoints."""
+        with FakeServer() as server:
+            client = api.Client(config=server.client_config())
+            self.addCleanup(client.close)
+            cred = Credential(client=client, cred_type="network", password="p")
+            cred.create()
+            source = Source(
+                client=client, source_type="network", hosts=["h1", "h2"], credential_ids=[cred._id]
+            )
+            source.create()
+            scan = Scan(client=client, source_ids=[source._id])
+            scan.create()
+            job = ScanJob(client=client, scan_id=scan._id)
+            job.create()
+            report = Report(client=client)
+            report.retrieve_from_scan_job(job._id)
+
+            details = report.details().json()
+            assert list(report.iter_facts()) == details["sources"][0]["facts"]
+            deployments = report.deployments().json()
+            assert list(report.iter_fingerprints()) == deployments["system_fingerprints"]
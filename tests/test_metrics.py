@@ -0,0 +1,60 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.metrics`."""
+
+import json
+import random
+
+import pytest
+
+from camayoc.metrics import LatencyCollector
+from camayoc.metrics import LatencyHistogram
+from camayoc.types.api import RequestEvent
+
+
+def test_histogram_percentiles():
+    """Percentiles are within histogram precision from exact values."""
+    values = [random.uniform(0.001, 10) for _ in range(10000)]
+    histogram = LatencyHistogram(precision=0.01)
+    for value in values:
+        histogram.add(value)
+    values.sort()
+    for percent in (50, 95, 99):
+        exact = values[int(len(values) * percent / 100) - 1]
+        assert histogram.percentile(percent) == pytest.approx(exact, rel=0.02)
+    assert histogram.count == len(values)
+    assert histogram.max == values[-1]
+
+
+def test_empty_histogram():
+    """Empty histogram has no percentiles."""
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    assert histogram.summary() == {"count": 0}
+
+
+def test_collector_groups_by_endpoint(tmp_path):
+    """Collector keeps statistics per method and templated path, and dumps them."""
+    collector = LatencyCollector()
+    for elapsed in (0.1, 0.2, 0.3):
+        collector(
+            RequestEvent(
+                method="GET",
+                url="",
+                path="v1/jobs/{id}/",
+                status_code=200,
+                request_bytes=0,
+                response_bytes=100,
+                elapsed=elapsed,
+            )
+        )
+    collector(RequestEvent(method="POST", url="", path="v1/scans/", elapsed=0.5, error=OSError()))
+
+    destination = tmp_path / "stats" / "latency.json"
+    collector.dump(destination)
+    stats = json.loads(destination.read_text())
+    assert set(stats) == {"GET v1/jobs/{id}/", "POST v1/scans/"}
+    assert stats["GET v1/jobs/{id}/"]["count"] == 3
+    assert stats["GET v1/jobs/{id}/"]["errors"] == 0
+    assert stats["GET v1/jobs/{id}/"]["bytes_received"] == 300
+    assert stats["GET v1/jobs/{id}/"]["p50"] == pytest.approx(0.2, rel=0.01)
+    assert stats["POST v1/scans/"]["errors"] == 1
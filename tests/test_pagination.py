@@ -0,0 +1,113 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.pagination`."""
+
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from camayoc import pagination
+from camayoc.qpc_models import ScanJob
+from camayoc.qpc_models import Source
+from camayoc.types.settings import QuipucordsServerOptions
+
+
+class FakeListing:
+    """List endpoint returning ``total`` integers in pages."""
+
+    def __init__(self, total, page_size=10, with_count=True, delay=0):
+        self.total = total
+        self.page_size = page_size
+        self.with_count = with_count
+        self.delay = delay
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def __call__(self, params, **kwargs):
+        page = params["page"]
+        with self._lock:
+            self.requested.append(page)
+        time.sleep(self.delay)
+        start = (page - 1) * self.page_size
+        end = min(start + self.page_size, self.total)
+        body = {
+            "next": f"?page={page + 1}" if end < self.total else None,
+            "results": list(range(start, end)),
+        }
+        if self.with_count:
+            body["count"] = self.total
+        response = MagicMock()
+        response.json.return_value = body
+        return response
+
+
+class IterPagesTestCase(unittest.TestCase):
+    """Test :func:camayoc.pagination.iter_pages."""
+
+    def test_all_items(self):
+        """All objects are yielded in order."""
+        for with_count in (True, False):
+            with self.subTest(with_count=with_count):
+                listing = FakeListing(total=95, with_count=with_count)
+                items = list(pagination.iter_items(listing, concurrency=3))
+                assert items == list(range(95))
+                assert sorted(listing.requested) == list(range(1, 11))
+
+    def test_single_page(self):
+        """Listing that fits on single page is fetched with single request."""
+        listing = FakeListing(total=5)
+        assert list(pagination.iter_items(listing)) == list(range(5))
+        assert listing.requested == [1]
+
+    def test_params(self):
+        """Page size and other parameters are passed to fetch function."""
+        fetch = MagicMock()
+        fetch.return_value.json.return_value = {"count": 1, "next": None, "results": [1]}
+        list(pagination.iter_pages(fetch, page_size=50, params={"search_by_name": "a"}))
+        fetch.assert_called_once_with(params={"search_by_name": "a", "page_size": 50, "page": 1})
+
+    def test_bounded_prefetch(self):
+        """Only ``concurrency`` pages are requested ahead of the consumer."""
+        listing = FakeListing(total=1000)
+        pages = pagination.iter_pages(listing, concurrency=2)
+        next(pages)
+        time.sleep(0.05)
+        assert sorted(listing.requested) == [1, 2, 3]
+        pages.close()
+
+    def test_prefetch_overlaps_processing(self):
+        """Next page is fetched while caller processes the current one."""
+        listing = FakeListing(total=50, delay=0.05)
+        start = time.perf_counter()
+        for _ in pagination.iter_pages(listing, concurrency=1):
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        # Sequential fetching and processing would take 0.5s
+        assert elapsed < 0.4
+
+
+class ModelPaginationTestCase(unittest.TestCase):
+    """Test pagination methods of QPC models."""
+
+    def make_client(self):
+        client = MagicMock()
+        client.config = QuipucordsServerOptions(
+            hostname="example.com", username="admin", password="pass", ssh_keyfile_path="/tmp/"
+        )
+        client.get.return_value.json.return_value = {"count": 1, "next": None, "results": [{}]}
+        return client
+
+    def test_defaults_from_config(self):
+        """Page size defaults to client config."""
+        client = self.make_client()
+        assert list(Source(client=client).iter_items()) == [{}]
+        client.get.assert_called_once_with("v2/sources/", params={"page_size": 100, "page": 1})
+
+    def test_scanjob_results(self):
+        """Scan job results can be iterated."""
+        client = self.make_client()
+        job = ScanJob(client=client, _id=7)
+        list(job.iter_items(job.inspection_results, page_size=10))
+        client.get.assert_called_once_with(
+            "v1/jobs/7/inspection/", params={"page_size": 10, "page": 1}
+        )
@@ -0,0 +1,109 @@
+"""Unit tests for :mod:`camayoc.pytest_plugin`."""
+
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from camayoc import pytest_plugin
+
+ALL_SCANS = ["network", "vcenter", "satellite"]
+SCAN_DEFINITIONS = [SimpleNamespace(name=name) for name in ALL_SCANS]
+
+
+def make_item(nodeid, fixtures=("scans",), markers=("runs_scan",), params=None):
+    item = mock.Mock(nodeid=nodeid, fixturenames=list(fixtures))
+    item.iter_markers.side_effect = lambda: [SimpleNamespace(name=name) for name in markers]
+    item.callspec = mock.Mock(params=params) if params is not None else None
+    return item
+
+
+def test_scans_needed_by_parametrized():
+    """Tests parametrized by scan name need only that scan."""
+    items = [
+        make_item("a", params={"scan_name": "vcenter"}),
+        make_item("b", params={"scan_name": "network"}),
+        make_item("c", markers=()),
+        make_item("d", fixtures=("data_provider",)),
+    ]
+    assert pytest_plugin.scans_needed_by(items, ALL_SCANS) == ["network", "vcenter"]
+
+
+def test_scans_needed_by_any_scan():
+    """Tests using scans fixture without scan name may need all scans."""
+    items = [make_item("a", params={"source_type": "network"})]
+    assert pytest_plugin.scans_needed_by(items, ALL_SCANS) == ALL_SCANS
+
+
+def make_session(items, prescan=True):
+    config = mock.Mock(stash=pytest.Stash())
+    config.getoption.side_effect = {"camayoc_prescan": prescan, "collectonly": False}.get
+    return mock.Mock(config=config, items=items)
+
+
+def test_collection_finish_starts_scans():
+    """Scans are started right after collection."""
+    session = make_session([make_item("a", params={"scan_name": "network"})])
+    with (
+        mock.patch("camayoc.config.settings.scans", SCAN_DEFINITIONS),
+        mock.patch.object(pytest_plugin, "start_prescan") as start_prescan,
+    ):
+        pytest_plugin.pytest_collection_finish(session)
+    start_prescan.assert_called_once_with(session.config, ["network"])
+
+
+def test_collection_finish_waits_for_cleaning_tests():
+    """Scans are started after the last test that cleans up the server."""
+    items = [
+        make_item("clean1", fixtures=("cleaning_data_provider",), markers=()),
+        make_item("clean2", fixtures=("cleaning_data_provider",), markers=()),
+        make_item("a", params={"scan_name": "network"}),
+    ]
+    session = make_session(items)
+    with (
+        mock.patch("camayoc.config.settings.scans", SCAN_DEFINITIONS),
+        mock.patch.object(pytest_plugin, "start_prescan") as start_prescan,
+    ):
+        pytest_plugin.pytest_collection_finish(session)
+        start_prescan.assert_not_called()
+        for item in items[:2]:
+            item.config = session.config
+            item.funcargs = {"cleaning_data_provider": "dp"}
+            teardown = pytest_plugin.pytest_runtest_teardown(item, None)
+            next(teardown)
+            with pytest.raises(StopIteration):
+                next(teardown)
+    start_prescan.assert_called_once_with(session.config, ["network"], "dp")
+
+
+def test_prescan_disabled():
+    """Nothing is started without --camayoc-prescan."""
+    session = make_session([make_item("a", params={"scan_name": "network"})], prescan=False)
+    with mock.patch.object(pytest_plugin, "start_prescan") as start_prescan:
+        pytest_plugin.pytest_collection_finish(session)
+    start_prescan.assert_not_called()
+
+
+def test_prescan_reuses_scans_fixture_container():
+    """Deferred prescan starts scans in container that scans fixture already created."""
+    items = [
+        make_item("a", params={"scan_name": "network"}),
+        make_item("clean", fixtures=("cleaning_data_provider",), markers=()),
+    ]
+    session = make_session(items)
+    with mock.patch("camayoc.config.settings.scans", SCAN_DEFINITIONS):
+        pytest_plugin.pytest_collection_finish(session)
+    # Test "a" runs before cleaning test and gets container from scans fixture
+    scan_container = mock.Mock()
+    session.config.stash[pytest_plugin.scan_container_key] = scan_container
+    item = items[1]
+    item.config = session.config
+    item.funcargs = {"cleaning_data_provider": "dp"}
+    with mock.patch("camayoc.data_provider.ScanContainer") as container_class:
+        teardown = pytest_plugin.pytest_runtest_teardown(item, None)
+        next(teardown)
+        with pytest.raises(StopIteration):
+            next(teardown)
+    container_class.assert_not_called()
+    scan_container.start.assert_called_once_with(["network"])
+    assert session.config.stash[pytest_plugin.scan_container_key] is scan_container
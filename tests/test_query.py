@@ -0,0 +1,127 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.query`."""
+
+import unittest
+from unittest import mock
+
+from camayoc import api
+from camayoc.fake_server import FakeServer
+from camayoc.fake_server import FakeServerOptions
+from camayoc.qpc_models import Credential
+from camayoc.qpc_models import Scan
+from camayoc.qpc_models import ScanJob
+from camayoc.qpc_models import Source
+
+
+class QuerySetTestCase(unittest.TestCase):
+    """Test querying objects of fake server."""
+
+    def setUp(self):
+        self.server = FakeServer(FakeServerOptions(page_size=2)).start()
+        self.addCleanup(self.server.stop)
+        self.client = api.Client(config=self.server.client_config())
+        self.addCleanup(self.client.close)
+        self.requests = []
+        self.client.add_hook("before_request", self.requests.append)
+
+        cred = Credential(client=self.client, cred_type="network", password="p")
+        cred.create()
+        self.sources = {}
+        for name, source_type in [
+            ("net-b", "network"),
+            ("sat", "satellite"),
+            ("net-a", "network"),
+            ("net-c", "network"),
+            ("vc", "vcenter"),
+        ]:
+            source = Source(
+                client=self.client,
+                name=name,
+                source_type=source_type,
+                hosts=["10.0.0.1"],
+                credential_ids=[cred._id],
+            )
+            source.create()
+            self.sources[name] = source._id
+        self.requests.clear()
+
+    def test_lazy_and_chainable(self):
+        """Queries are refined without sending requests."""
+        query = Source.objects(self.client).filter(source_type="network")
+        ordered = query.order_by("-name")
+        assert ordered.params == {"source_type": "network", "ordering": "-name"}
+        assert query.params == {"source_type": "network"}
+        assert self.requests == []
+        assert [s["name"] for s in ordered] == ["net-c", "net-b", "net-a"]
+
+    def test_count_first_ids(self):
+        """Count and first object are obtained with single request."""
+        query = Source.objects(self.client).filter(source_type="network")
+        assert query.count() == 3
+        assert query.order_by("name").first()["name"] == "net-a"
+        assert len(self.requests) == 2
+        assert Source.objects(self.client).filter(name="nope").first() is None
+        assert list(query.order_by("name").ids()) == [
+            self.sources["net-a"],
+            self.sources["net-b"],
+            self.sources["net-c"],
+        ]
+
+    def test_where(self):
+        """Client-side predicates are applied to objects from server."""
+        query = Source.objects(self.client).where(lambda s: s["name"].endswith("c"))
+        assert sorted(s["name"] for s in query) == ["net-c", "vc"]
+        assert query.count() == 2
+        assert query.filter(source_type="vcenter").first()["name"] == "vc"
+
+    def test_unsupported(self):
+        """Filters and ordering not supported by server are rejected."""
+        with self.assertRaises(ValueError):
+            Source.objects(self.client).filter(hosts="10.0.0.1")
+        with self.assertRaises(ValueError):
+            Source.objects(self.client).order_by("hosts")
+
+    def test_read_many(self):
+        """Objects are read by id, in order of ids."""
+        ids = [self.sources["vc"], self.sources["net-a"], self.sources["sat"]]
+        objects = list(Source.objects(self.client).read_many(iter(ids), concurrency=2))
+        assert [o["id"] for o in objects] == ids
+
+    def test_scan_jobs(self):
+        """Scan jobs of a scan are queried by scan id."""
+        scan = Scan(client=self.client, source_ids=[self.sources["net-a"]])
+        scan.create()
+        jobs = []
+        for _ in range(3):
+            job = ScanJob(client=self.client, scan_id=scan._id)
+            job.create()
+            jobs.append(job._id)
+        query = ScanJob.objects(self.client, scan_id=scan._id)
+        assert query.order_by("-id").first()["id"] == jobs[-1]
+        assert query.filter(status="completed").count() == 3
+        assert list(query.read_many(jobs[:2])) == [
+            ScanJob(client=self.client, _id=job_id).read().json() for job_id in jobs[:2]
+        ]
+
+    def test_get_object_id(self):
+        """get_object_id finds object by exact name."""
+        from camayoc.tests.qpc.utils import get_object_id  # noqa: PLC0415
+
+        source = Source(client=self.client, name="net")
+        with mock.patch.object(Source, "objects", wraps=Source.objects) as objects:
+            assert get_object_id(source) is None
+            source.name = "net-a"
+            assert get_object_id(source) == self.sources["net-a"]
+            assert objects.call_count == 2
+
+    def test_get_object_id_partial_match(self):
+        """get_object_id ignores objects whose name only contains the searched one."""
+        from camayoc.tests.qpc.utils import get_object_id  # noqa: PLC0415
+
+        source = Source(client=self.client, name="net")
+        results = [{"id": 1, "name": "net-a"}, {"id": 2, "name": "net"}]
+        with mock.patch.object(Source, "objects") as objects:
+            objects.return_value.filter.return_value = iter(results)
+            assert get_object_id(source) == 2
+            objects.return_value.filter.return_value = iter(results[:1])
+            assert get_object_id(source) is None
@@ -0,0 +1,162 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.rate_limit`."""
+
+import io
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import requests
+
+from camayoc import api
+from camayoc.rate_limit import RateLimiter
+from camayoc.rate_limit import TokenBucket
+from camayoc.rate_limit import endpoint_class
+from camayoc.types.settings import LimitOptions
+from camayoc.types.settings import QuipucordsServerOptions
+from camayoc.types.settings import RateLimitOptions
+
+CAMAYOC_CONFIG = QuipucordsServerOptions(
+    hostname="example.com", https=False, username="admin", password="pass", ssh_keyfile_path="/tmp/"
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TokenBucketTestCase(unittest.TestCase):
+    """Test :class:camayoc.rate_limit.TokenBucket."""
+
+    def test_burst_then_rate(self):
+        """Burst is served immediately, following requests wait for refill."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=3, clock=clock, sleep=clock.sleep)
+        assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+        assert bucket.acquire() == 0.5
+        assert bucket.acquire() == 0.5
+        assert clock.now == 1.0
+
+    def test_waiting_callers_reserve_tokens(self):
+        """Callers that arrive while bucket is empty are queued."""
+        bucket = TokenBucket(rate=4, burst=1, clock=lambda: 0.0, sleep=lambda seconds: None)
+        assert [bucket.acquire() for _ in range(4)] == [0, 0.25, 0.5, 0.75]
+
+    def test_refill_capped(self):
+        """Idle bucket does not accumulate more than burst tokens."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, burst=2, clock=clock, sleep=clock.sleep)
+        clock.now = 100
+        assert [bucket.acquire() for _ in range(3)] == [0, 0, 1.0]
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    """Test :class:camayoc.rate_limit.RateLimiter."""
+
+    def test_endpoint_class(self):
+        """Report endpoints are distinguished from all the others."""
+        assert endpoint_class("v1/reports/{id}/") == "reports"
+        assert endpoint_class("v2/reports/{id}/") == "reports"
+        assert endpoint_class("v1/jobs/{id}/") == "crud"
+        assert endpoint_class("v2/sources/") == "crud"
+
+    def test_from_options(self):
+        """Limiter is not created unless some limit is set."""
+        assert RateLimiter.from_options(RateLimitOptions()) is None
+        options = RateLimitOptions(endpoints={"reports": LimitOptions(max_in_flight=1)})
+        limiter = RateLimiter.from_options(options)
+        assert limiter.limit is None
+        assert limiter.endpoint_limits["reports"].max_in_flight == 1
+        with self.assertRaises(ValueError):
+            RateLimiter.from_options(RateLimitOptions(endpoints={"scans": LimitOptions()}))
+
+    def test_permit_release(self):
+        """Released permit returns slots of endpoint and global limits."""
+        options = RateLimitOptions(
+            max_in_flight=2, endpoints={"reports": LimitOptions(max_in_flight=1)}
+        )
+        limiter = RateLimiter.from_options(options)
+        permit = limiter.acquire("v1/reports/{id}/")
+        crud_permit = limiter.acquire("v2/sources/")
+        acquired = threading.Event()
+
+        def acquire_report():
+            limiter.acquire("v1/reports/{id}/").release()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire_report)
+        thread.start()
+        assert not acquired.wait(0.05)
+        permit.release()
+        permit.release()
+        assert acquired.wait(1)
+        thread.join()
+        crud_permit.release()
+        assert limiter.limit._slots.acquire(blocking=False)
+
+
+class ClientRateLimitTestCase(unittest.TestCase):
+    """Test rate limiting in :class:camayoc.api.Client."""
+
+    def make_client(self, rate_limit):
+        config = CAMAYOC_CONFIG.model_copy(update={"rate_limit": rate_limit})
+        client = api.Client(authenticate=False, config=config)
+        self.in_flight = self.max_in_flight = 0
+        lock = threading.Lock()
+
+        def send(method, url, **kwargs):
+            with lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            time.sleep(0.02)
+            with lock:
+                self.in_flight -= 1
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b"{}"
+            response.raw = io.BytesIO()
+            return response
+
+        client.session = MagicMock()
+        client.session.request.side_effect = send
+        return client
+
+    def test_max_in_flight(self):
+        """Threads sharing client do not exceed in-flight limit."""
+        client = self.make_client(RateLimitOptions(max_in_flight=2))
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(lambda _: client.get("v2/sources/"), range(12)))
+        assert self.max_in_flight == 2
+        assert client.metrics["rate_limit_waits"] > 0
+        assert client.metrics["rate_limit_wait"] > 0
+
+    def test_requests_per_second(self):
+        """Requests over the rate wait, and wait is passed to hooks."""
+        client = self.make_client(RateLimitOptions(requests_per_second=10, burst=1))
+        events = []
+        client.add_hook("after_response", events.append)
+        start = time.monotonic()
+        for _ in range(4):
+            client.get("v2/sources/")
+        assert time.monotonic() - start >= 0.3
+        assert events[0].rate_limit_wait == 0
+        assert all(event.rate_limit_wait > 0 for event in events[1:])
+
+    def test_streamed_response_holds_slot(self):
+        """Slot of streamed response is released when response is closed."""
+        client = self.make_client(
+            RateLimitOptions(endpoints={"reports": LimitOptions(max_in_flight=1)})
+        )
+        slots = client.rate_limiter.endpoint_limits["reports"]._slots
+        with client.get("v1/reports/1/", stream=True):
+            assert not slots.acquire(blocking=False)
+        assert slots.acquire(blocking=False)
@@ -0,0 +1,129 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.report_bundle`."""
+
+import io
+import json
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from camayoc import api
+from camayoc.fake_server import FakeServer
+from camayoc.qpc_models import Credential
+from camayoc.qpc_models import Report
+from camayoc.qpc_models import Scan
+from camayoc.qpc_models import ScanJob
+from camayoc.qpc_models import Source
+from camayoc.report_bundle import ReportBundle
+from camayoc.types.scans import FinishedScan
+from camayoc.types.scans import ScanSimplifiedStatusEnum
+from camayoc.types.settings import ScanOptions
+
+
+def tarball(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, data in files.items():
+            content = json.dumps(data).encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+ARCHIVE = tarball(
+    {
+        "report_id_1/details-1.json": {"sources": []},
+        "report_id_1/deployments.json": {"system_fingerprints": [{"name": "a"}]},
+    }
+)
+
+
+class ReportBundleTestCase(unittest.TestCase):
+    """Test :class:`camayoc.report_bundle.ReportBundle`."""
+
+    def test_members(self):
+        """Reports are found by name, including id-suffixed names."""
+        bundle = ReportBundle(ARCHIVE)
+        assert bundle.names == ["report_id_1/details-1.json", "report_id_1/deployments.json"]
+        assert bundle.details == {"sources": []}
+        assert bundle.deployments == {"system_fingerprints": [{"name": "a"}]}
+        assert bundle.aggregate is None
+
+    def test_lazy_decoding(self):
+        """Members are decoded on first access only."""
+        bundle = ReportBundle(ARCHIVE)
+        with mock.patch.object(bundle, "read", wraps=bundle.read) as read:
+            assert read.call_count == 0
+            assert bundle.details is bundle.details
+            assert read.call_count == 1
+
+    def test_from_file(self):
+        """Bundle can be read from downloaded file."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "report.tar.gz"
+            path.write_bytes(ARCHIVE)
+            assert ReportBundle.from_file(path).details == {"sources": []}
+
+    def test_insights(self):
+        """Insights tarball is loaded once, on first access."""
+        loader = mock.Mock(return_value=tarball({"r/metadata.json": {"report_slices": {}}}))
+        bundle = ReportBundle(ARCHIVE, insights_loader=loader)
+        loader.assert_not_called()
+        assert bundle.insights == {"r/metadata.json": {"report_slices": {}}}
+        assert bundle.insights == {"r/metadata.json": {"report_slices": {}}}
+        loader.assert_called_once()
+        with self.assertRaises(ValueError):
+            ReportBundle(ARCHIVE).insights
+
+    def test_invalid_archive(self):
+        """Archive that is not a tarball is rejected."""
+        with self.assertRaises(tarfile.TarError):
+            ReportBundle(b"<html>")
+
+    def test_finished_scan(self):
+        """FinishedScan reads reports from bundle, unless given directly."""
+        definition = ScanOptions(name="scan", sources=["source"])
+        finished_scan = FinishedScan(
+            scan_id=1,
+            scan_job_id=1,
+            status=ScanSimplifiedStatusEnum.COMPLETED,
+            definition=definition,
+            aggregate_report={"instances_hypervisor": 0},
+            report_bundle=ReportBundle(ARCHIVE),
+        )
+        assert finished_scan.details_report == {"sources": []}
+        assert finished_scan.aggregate_report == {"instances_hypervisor": 0}
+
+
+class ReportBundleServerTestCase(unittest.TestCase):
+    """Test downloading report bundle from server."""
+
+    def test_fetch(self):
+        """Single download has the same content as report endpoints."""
+        with FakeServer() as server:
+            client = api.Client(config=server.client_config())
+            self.addCleanup(client.close)
+            cred = Credential(client=client, cred_type="network", password="p")
+            cred.create()
+            source = Source(
+                client=client, source_type="network", hosts=["h1"], credential_ids=[cred._id]
+            )
+            source.create()
+            scan = Scan(client=client, source_ids=[source._id])
+            scan.create()
+            job = ScanJob(client=client, scan_id=scan._id)
+            job.create()
+            report = Report(client=client)
+            report.retrieve_from_scan_job(job._id)
+
+            requests_sent = []
+            client.hooks["after_response"].append(requests_sent.append)
+            bundle = report.bundle()
+            assert len(requests_sent) == 1
+            assert bundle.details == report.details().json()
+            assert bundle.deployments == report.deployments().json()
+            assert bundle.aggregate == report.aggregate().json()
+            assert len(bundle.insights) == 3
@@ -1,13 +1,22 @@
+import threading
+import time
+from concurrent.futures import Future
 from functools import partial
 from unittest import mock
 
+import requests
 from attrs import evolve
 
 from camayoc.data_provider import DataProvider
 from camayoc.data_provider import ScanContainer
+from camayoc.exceptions import StoppedScanException
+from camayoc.exceptions import WaitTimeError
+from camayoc.scan_watcher import ScanJobWatcher
 from camayoc.types.scans import FinishedScan
 from camayoc.types.scans import ScanSimplifiedStatusEnum
 from camayoc.types.settings import ScanOptions
+from camayoc.types.settings import ScanPollingOptions
+from camayoc.types.settings import ScanRetryOptions
 
 SCANS = [
     ScanOptions(
@@ -42,7 +51,7 @@ def mocked_run_scans(
         for wanted_scan_name in wanted_scans:
             dp.scans._created_models[wanted_scan_name] = None
 
-    finished_scans = []
+    finished_scans = {}
     for scan_name in wanted_scans:
         scan_definition = [scan for scan in SCANS if scan.name == scan_name][0]
         finished_scan = FinishedScan(
@@ -66,7 +75,9 @@ def mocked_run_scans(
                 deployments_report={},
                 aggregate_report={},
             )
-        finished_scans.append(finished_scan)
+        future = Future()
+        future.set_result(finished_scan)
+        finished_scans[scan_name] = future
     return finished_scans
 
 
@@ -81,7 +92,7 @@ def test_run_all():
         scans = sc.all()
         assert mock_run_scans.call_count == 1
         assert mock_run_scans.call_args.args == ({"networkscan", "VCenterOnly"},)
-        assert len(sc._finished_scans) == len(SCANS)
+        assert len(sc._scans) == len(SCANS)
         assert len(scans) == len(SCANS)
 
 
@@ -96,7 +107,7 @@ def test_run_ok():
         scans = sc.ok()
         assert mock_run_scans.call_count == 1
         assert mock_run_scans.call_args.args == ({"networkscan", "VCenterOnly"},)
-        assert len(sc._finished_scans) == len(SCANS)
+        assert len(sc._scans) == len(SCANS)
         assert len(scans) == 1
 
 
@@ -110,7 +121,7 @@ def test_run_name():
         scan = sc.with_name("networkscan")
         assert mock_run_scans.call_count == 1
         assert mock_run_scans.call_args.args == ({"networkscan"},)
-        assert len(sc._finished_scans) == 1
+        assert len(sc._scans) == 1
         assert isinstance(scan, FinishedScan)
         assert scan.definition.name == "networkscan"
 
@@ -125,7 +136,7 @@ def test_expected_attr():
         scans = sc.ok_with_expected_data_attr("distribution")
         assert mock_run_scans.call_count == 1
         assert mock_run_scans.call_args.args == ({"networkscan"},)
-        assert len(sc._finished_scans) == 1
+        assert len(sc._scans) == 1
         assert len(scans) == 1
 
 
@@ -138,7 +149,7 @@ def test_no_attr():
     ) as mock_run_scans:
         scans = sc.ok_with_expected_data_attr("nonexisting")
         assert mock_run_scans.call_count == 0
-        assert len(sc._finished_scans) == 0
+        assert len(sc._scans) == 0
         assert len(scans) == 0
 
 
@@ -154,7 +165,7 @@ def test_dont_run_scans_twice():
         second_scans = sc.all()
         assert mock_run_scans.call_count == 1
         assert mock_run_scans.call_args.args == ({"networkscan", "VCenterOnly"},)
-        assert len(sc._finished_scans) == len(SCANS)
+        assert len(sc._scans) == len(SCANS)
         assert len(first_scans) == 2
         assert first_scans == second_scans
 
@@ -170,13 +181,13 @@ def test_run_only_missing_scans():
         distro_scans = sc.ok_with_expected_data_attr("distribution")
         assert mock_run_scans.call_count == 1
         assert mock_run_scans.call_args.args == ({"networkscan"},)
-        assert len(sc._finished_scans) == 1
+        assert len(sc._scans) == 1
         assert len(distro_scans) == 1
 
         all_scans = sc.all()
         assert mock_run_scans.call_count == 2
         assert mock_run_scans.call_args.args == ({"VCenterOnly"},)
-        assert len(sc._finished_scans) == len(SCANS)
+        assert len(sc._scans) == len(SCANS)
         assert len(all_scans) == len(SCANS)
 
 
@@ -195,10 +206,175 @@ def test_re_run_scans_after_dp_cleanup():
     # while they are not in DataProvider. Normally we would call dp.cleanup() here,
     # but since we never put any scans into DataProvider, we are already in the state
     # we need
-    assert sc._finished_scans
+    assert sc._scans
     with mock.patch.object(
         sc, "_run_scans", autospec=True, side_effect=mocked_run_scans
     ) as mock_run_scans:
         sc.all()
         assert mock_run_scans.call_count == 1
         assert mock_run_scans.call_args.args == ({"networkscan", "VCenterOnly"},)
+
+
+def test_with_name_does_not_wait_for_other_scans():
+    """ScanContainer.with_name() returns as soon as requested scan is ready."""
+    dp = DataProvider(credentials=[], sources=[], scans=SCANS)
+    sc = ScanContainer(data_provider=dp, scans=SCANS)
+    release = threading.Event()
+
+    def finish_scan(scan):
+        if scan.definition.name == "VCenterOnly":
+            release.wait(5)
+        return evolve(scan, status=ScanSimplifiedStatusEnum.COMPLETED)
+
+    def run_scans(wanted_scans):
+        scans = [scan for scan in SCANS if scan.name in wanted_scans]
+        return {
+            scan.name: sc._executor.submit(
+                finish_scan,
+                FinishedScan(
+                    scan_id=1,
+                    scan_job_id=1,
+                    definition=scan,
+                    status=ScanSimplifiedStatusEnum.CREATED,
+                ),
+            )
+            for scan in scans
+        }
+
+    with mock.patch.object(sc, "_run_scans", autospec=True, side_effect=run_scans):
+        futures = sc.start()
+        scan = sc.with_name("networkscan")
+        assert scan.status == ScanSimplifiedStatusEnum.COMPLETED
+        assert not futures["VCenterOnly"].done()
+        release.set()
+        assert len(sc.all()) == len(SCANS)
+    sc.close()
+
+
+def make_scan(scan_job_id=1, **kwargs):
+    return FinishedScan(
+        scan_id=1,
+        scan_job_id=scan_job_id,
+        definition=SCANS[0],
+        status=ScanSimplifiedStatusEnum.CREATED,
+        **kwargs,
+    )
+
+
+def run_attempts(outcomes, retry, create_error=None):
+    """Finish scan whose attempts end with ``outcomes``; return it and created job ids."""
+    dp = DataProvider(credentials=[], sources=[], scans=SCANS)
+    sc = ScanContainer(data_provider=dp, scans=SCANS, retry=retry)
+    attempt_outcomes = iter(outcomes)
+
+    def run_attempt(scan):
+        failure = next(attempt_outcomes)
+        if failure is None:
+            return evolve(scan, status=ScanSimplifiedStatusEnum.COMPLETED), None
+        error = Exception(failure)
+        return evolve(scan, status=ScanSimplifiedStatusEnum.FAILED, error=error), failure
+
+    job_ids = iter(range(2, 100))
+    with (
+        mock.patch.object(sc, "_run_attempt", side_effect=run_attempt),
+        mock.patch("camayoc.data_provider.ScanJob") as scan_job,
+    ):
+        scan_job.return_value.create.side_effect = create_error or (
+            lambda: setattr(scan_job.return_value, "_id", next(job_ids))
+        )
+        finished_scan = sc._finish_scan(make_scan())
+    sc.close()
+    return finished_scan, scan_job.return_value.create.call_count
+
+
+def test_failed_scan_is_retried():
+    """Failed scan job is created again and every attempt is recorded."""
+    retry = ScanRetryOptions(max_attempts=3)
+    scan, created = run_attempts(["timeout", "failed", None], retry)
+    assert scan.status == ScanSimplifiedStatusEnum.COMPLETED
+    assert scan.error is None
+    assert scan.scan_job_id == 3
+    assert created == 2
+    assert [attempt.outcome for attempt in scan.attempts] == ["timeout", "failed", "completed"]
+    assert [attempt.scan_job_id for attempt in scan.attempts] == [1, 2, 3]
+    assert all(attempt.duration >= 0 for attempt in scan.attempts)
+
+
+def test_retry_limits():
+    """Scans are retried up to max attempts, only for selected failures."""
+    scan, created = run_attempts(["failed"] * 3, ScanRetryOptions(max_attempts=2))
+    assert scan.status == ScanSimplifiedStatusEnum.FAILED
+    assert [attempt.outcome for attempt in scan.attempts] == ["failed", "failed"]
+    assert created == 1
+
+    scan, created = run_attempts(["error"], ScanRetryOptions(max_attempts=2))
+    assert len(scan.attempts) == 1
+    assert created == 0
+
+    scan, created = run_attempts(["failed"], ScanRetryOptions(max_attempts=2, time_budget=0))
+    assert len(scan.attempts) == 1
+    assert created == 0
+
+
+def test_retry_disabled_by_default():
+    """Failed scans are not run again unless retries are configured."""
+    scan, created = run_attempts(["failed"], ScanRetryOptions())
+    assert len(scan.attempts) == 1
+    assert created == 0
+
+
+def test_retry_not_created():
+    """Failure of the last attempt is reported when new job cannot be created."""
+    retry = ScanRetryOptions(max_attempts=2)
+    scan, created = run_attempts(
+        ["failed"], retry, create_error=requests.ConnectionError("refused")
+    )
+    assert created == 1
+    assert scan.status == ScanSimplifiedStatusEnum.FAILED
+    assert str(scan.error) == "failed"
+    assert [attempt.outcome for attempt in scan.attempts] == ["failed"]
+
+
+def test_attempt_failure_category():
+    """Attempt failure is categorized by state of scan job."""
+    dp = DataProvider(credentials=[], sources=[], scans=SCANS)
+    sc = ScanContainer(data_provider=dp, scans=SCANS, durations=mock.Mock())
+    with (
+        mock.patch("camayoc.data_provider.ScanJob"),
+        mock.patch.object(sc, "_wait_for_job") as wait,
+    ):
+        wait.return_value = {"status": "canceled"}
+        scan, failure = sc._run_attempt(make_scan())
+        assert failure == "canceled"
+        assert scan.status == ScanSimplifiedStatusEnum.FAILED
+
+        wait.side_effect = WaitTimeError("too slow")
+        scan, failure = sc._run_attempt(make_scan())
+        assert failure == "timeout"
+        assert isinstance(scan.error, WaitTimeError)
+    sc.close()
+
+
+def test_close_stops_running_scans():
+    """Closed container stops waiting for running jobs and does not retry them."""
+    dp = DataProvider(credentials=[], sources=[], scans=SCANS)
+    durations = mock.Mock(**{"timeout.return_value": 600, "expected.return_value": None})
+    retry = ScanRetryOptions(max_attempts=3, retry_on=["error"])
+    sc = ScanContainer(data_provider=dp, scans=SCANS, durations=durations, retry=retry)
+    watcher = ScanJobWatcher(ScanPollingOptions(min_interval=0.01, max_interval=0.01))
+    with (
+        mock.patch("camayoc.data_provider.ScanJob") as scan_job,
+        mock.patch("camayoc.data_provider.default_watcher", return_value=watcher),
+    ):
+        scan_job.return_value.read.return_value.json.return_value = {"status": "running"}
+        future = sc._executor.submit(sc._finish_scan, make_scan())
+        while not sc._watches:
+            time.sleep(0.01)
+        sc.close()
+        assert future.done()
+    scan = future.result()
+    assert scan.status == ScanSimplifiedStatusEnum.FAILED
+    assert isinstance(scan.error, StoppedScanException)
+    assert [attempt.outcome for attempt in scan.attempts] == ["error"]
+    scan_job.return_value.create.assert_not_called()
+    assert not watcher._watches
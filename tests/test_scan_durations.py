@@ -0,0 +1,133 @@
+"""Unit tests for :mod:`camayoc.scan_durations`."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from camayoc.data_provider import DataProvider
+from camayoc.data_provider import ScanContainer
+from camayoc.scan_durations import HISTORY_SIZE
+from camayoc.scan_durations import ScanDurations
+from camayoc.scan_durations import estimate_duration
+from camayoc.scan_durations import job_duration
+from camayoc.scan_durations import scan_key
+from camayoc.types.settings import AdaptiveScanTimeoutOptions
+from camayoc.types.settings import ScanOptions
+from camayoc.types.settings import SourceOptions
+
+SOURCES = [
+    SourceOptions(name="net", type="network", hosts=["h1", "h2"], credentials=["c"]),
+    SourceOptions(name="vc", type="vcenter", hosts=["vc.example.com"], credentials=["c"]),
+    SourceOptions(name="ocp", type="openshift", hosts=["ocp.example.com"], credentials=["c"]),
+]
+NETWORK = ScanOptions(name="network", sources=["net"])
+VCENTER = ScanOptions(name="vcenter", sources=["vc"])
+MIXED = ScanOptions(name="mixed", sources=["net", "ocp"])
+
+
+class ScanDurationsTestCase(unittest.TestCase):
+    """Test :class:`camayoc.scan_durations.ScanDurations`."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = Path(tmpdir.name) / "durations.json"
+
+    def test_scan_key(self):
+        """Key depends on scan name and hosts of its sources."""
+        changed_sources = [SOURCES[0].model_copy(update={"hosts": ["h1"]}), *SOURCES[1:]]
+        assert scan_key(NETWORK, SOURCES) == scan_key(NETWORK, SOURCES)
+        assert scan_key(NETWORK, SOURCES) != scan_key(NETWORK, changed_sources)
+        assert scan_key(NETWORK, SOURCES) != scan_key(VCENTER, SOURCES)
+
+    def test_estimate(self):
+        """Scans without history are estimated by source types."""
+        assert estimate_duration(NETWORK, SOURCES) < estimate_duration(VCENTER, SOURCES)
+        assert estimate_duration(MIXED, SOURCES) == estimate_duration(
+            ScanOptions(name="ocp", sources=["ocp"]), SOURCES
+        )
+        assert estimate_duration(ScanOptions(name="none", sources=["missing"]), SOURCES) == 0
+
+    def test_record(self):
+        """Recorded durations are saved and used as expected duration."""
+        durations = ScanDurations(self.path, SOURCES)
+        for seconds in (10, 30, 20):
+            durations.record(NETWORK, seconds)
+        reloaded = ScanDurations(self.path, SOURCES)
+        assert reloaded.durations(NETWORK) == [10, 30, 20]
+        assert reloaded.expected(NETWORK) == 20
+        assert reloaded.expected(VCENTER) == estimate_duration(VCENTER, SOURCES)
+
+    def test_history_size(self):
+        """Only the most recent durations are kept."""
+        durations = ScanDurations(self.path, SOURCES)
+        for seconds in range(HISTORY_SIZE + 5):
+            durations.record(NETWORK, seconds)
+        assert durations.durations(NETWORK) == list(range(5, HISTORY_SIZE + 5))
+
+    def test_malformed_file(self):
+        """Malformed file is treated as empty."""
+        self.path.write_text("{not json")
+        durations = ScanDurations(self.path, SOURCES)
+        assert durations.durations(NETWORK) == []
+        durations.record(NETWORK, 5)
+        assert ScanDurations(self.path, SOURCES).durations(NETWORK) == [5]
+
+    def test_timeout(self):
+        """Timeout is derived from recorded durations, within floor and ceiling."""
+        options = AdaptiveScanTimeoutOptions(
+            min_history=3, percentile=99, safety_factor=2, floor=60, ceiling=1000
+        )
+        durations = ScanDurations(self.path, SOURCES, timeout_options=options)
+        for seconds in (40, 50):
+            durations.record(NETWORK, seconds)
+        assert durations.timeout(NETWORK, default=600) == 600
+        durations.record(NETWORK, 45)
+        assert durations.timeout(NETWORK, default=600) == pytest.approx(99.8)
+        for seconds in (10, 10, 10):
+            durations.record(VCENTER, seconds)
+        assert durations.timeout(VCENTER) == 60
+        for seconds in (900, 900, 900):
+            durations.record(MIXED, seconds)
+        assert durations.timeout(MIXED) == 1000
+
+    def test_timeout_disabled(self):
+        """Default timeout is used when adaptive timeouts are disabled."""
+        options = AdaptiveScanTimeoutOptions(enabled=False, min_history=1)
+        durations = ScanDurations(self.path, SOURCES, timeout_options=options)
+        durations.record(NETWORK, 10)
+        durations.record(NETWORK, 20)
+        assert durations.timeout(NETWORK, default=600) == 600
+
+    def test_job_duration(self):
+        """Duration is computed from job start and end time."""
+        job = {"start_time": "2025-01-01T10:00:00+00:00", "end_time": "2025-01-01T10:02:30+00:00"}
+        assert job_duration(job) == 150
+        assert job_duration({"start_time": job["start_time"], "end_time": None}) is None
+
+    def test_longest_scans_created_first(self):
+        """ScanContainer creates jobs of the longest scans first."""
+        durations = ScanDurations(self.path, SOURCES)
+        durations.record(NETWORK, 2000)
+        scans = [VCENTER, MIXED, NETWORK]
+        dp = DataProvider(credentials=[], sources=[], scans=scans)
+        sc = ScanContainer(data_provider=dp, scans=scans, durations=durations)
+        self.addCleanup(sc.close)
+        with (
+            mock.patch.object(
+                dp.scans,
+                "defined_one",
+                side_effect=lambda match: SimpleNamespace(_id=match["name"]),
+            ),
+            mock.patch("camayoc.data_provider.ScanJob") as scan_job,
+            mock.patch.object(sc._executor, "submit"),
+        ):
+            sc._run_scans({"network", "vcenter", "mixed"})
+        created = [call.kwargs["scan_id"] for call in scan_job.call_args_list]
+        assert created == ["network", "mixed", "vcenter"]
+        # Any job may wait in the queue for all jobs created before it
+        assert sc._queue_timeout == sum(durations.timeout(scan) for scan in scans)
@@ -0,0 +1,118 @@
+"""Unit tests for reusing completed scan jobs in :class:`camayoc.data_provider.ScanContainer`."""
+
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from camayoc import api
+from camayoc.data_provider import DataProvider
+from camayoc.data_provider import ScanContainer
+from camayoc.fake_server import FakeServer
+from camayoc.fake_server import FakeServerOptions
+from camayoc.qpc_models import Credential
+from camayoc.qpc_models import Scan
+from camayoc.qpc_models import ScanJob
+from camayoc.qpc_models import Source
+from camayoc.types.settings import ScanOptions
+from camayoc.types.settings import ScanReuseOptions
+from camayoc.types.settings import SourceOptions
+
+SOURCES = [SourceOptions(name="net", type="network", hosts=["h1", "h2"], credentials=["c"])]
+SCAN = ScanOptions(name="network", sources=["net"])
+REUSE = ScanReuseOptions(enabled=True)
+
+
+class ScanReuseTestCase(unittest.TestCase):
+    """Test finding completed scan jobs that may be reused."""
+
+    def setUp(self):
+        self.server = FakeServer(FakeServerOptions(scan_duration=0)).start()
+        self.addCleanup(self.server.stop)
+        self.client = api.Client(config=self.server.client_config())
+        self.addCleanup(self.client.close)
+        patcher = mock.patch("camayoc.config.settings.sources", SOURCES)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cred = Credential(client=self.client, cred_type="network", password="p")
+        cred.create()
+        self.source = Source(
+            client=self.client,
+            name="net",
+            source_type="network",
+            hosts=["h2", "h1"],
+            credential_ids=[cred._id],
+        )
+        self.source.create()
+        self.scan = Scan(client=self.client, name="network", source_ids=[self.source._id])
+        self.scan.create()
+
+    def make_container(self, reuse=REUSE):
+        dp = DataProvider(credentials=[], sources=[], scans=[SCAN])
+        sc = ScanContainer(data_provider=dp, scans=[SCAN], reuse=reuse)
+        self.addCleanup(sc.close)
+        return sc
+
+    def complete_job(self):
+        job = ScanJob(client=self.client, scan_id=self.scan._id)
+        job.create()
+        deadline = time.monotonic() + 5
+        while job.read(cache=False).json()["status"] != "completed":
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        return job
+
+    def test_fresh_job_reused(self):
+        """The most recent completed job with downloadable report is reused."""
+        self.complete_job()
+        job = self.complete_job()
+        reused = self.make_container()._reusable_job(self.scan, SCAN)
+        assert reused["id"] == job._id
+
+    def test_no_completed_job(self):
+        """Nothing is reused when scan was never completed."""
+        assert self.make_container()._reusable_job(self.scan, SCAN) is None
+
+    def test_not_completed_job_not_reused(self):
+        """Jobs are reused only when server reports them as completed."""
+        job = self.complete_job().read(cache=False).json()
+        sc = self.make_container()
+        with mock.patch("camayoc.data_provider.ScanJob") as scan_job:
+            query = scan_job.objects.return_value.filter.return_value.order_by.return_value
+            query.first.return_value = {**job, "status": "failed"}
+            assert sc._reusable_job(self.scan, SCAN) is None
+            query.first.return_value = job
+            assert sc._reusable_job(self.scan, SCAN)["id"] == job["id"]
+
+    def test_old_job_not_reused(self):
+        """Jobs that finished too long ago are not reused."""
+        self.complete_job()
+        time.sleep(0.01)
+        sc = self.make_container(ScanReuseOptions(enabled=True, max_age=0))
+        assert sc._reusable_job(self.scan, SCAN) is None
+
+    def test_changed_sources_not_reused(self):
+        """Jobs are not reused when source definitions changed since they ran."""
+        self.complete_job()
+        changed = [SOURCES[0].model_copy(update={"hosts": ["h1", "h3"]})]
+        with mock.patch("camayoc.config.settings.sources", changed):
+            assert self.make_container()._reusable_job(self.scan, SCAN) is None
+            sc = self.make_container(ScanReuseOptions(enabled=True, same_sources=False))
+            assert sc._reusable_job(self.scan, SCAN) is not None
+
+    def test_reused_scan_not_started(self):
+        """No scan job is created for scans with reusable job."""
+        sc = self.make_container()
+        with (
+            mock.patch.object(
+                sc._dp.scans, "defined_one", return_value=SimpleNamespace(_id=self.scan._id)
+            ),
+            mock.patch.object(sc, "_reusable_job", return_value={"id": 42}),
+            mock.patch("camayoc.data_provider.ScanJob") as scan_job,
+            mock.patch.object(sc._executor, "submit") as submit,
+        ):
+            sc._run_scans({"network"})
+        scan_job.assert_not_called()
+        finished_scan = submit.call_args.args[1]
+        assert finished_scan.scan_job_id == 42
+        assert finished_scan.reused
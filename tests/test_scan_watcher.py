@@ -0,0 +1,192 @@
+# coding=utf-8
+"""Unit tests for :mod:`camayoc.scan_watcher`."""
+
+import time
+import unittest
+from concurrent.futures import wait
+from unittest import mock
+
+import pytest
+
+from camayoc import api
+from camayoc.exceptions import StoppedScanException
+from camayoc.exceptions import WaitTimeError
+from camayoc.fake_server import FakeServer
+from camayoc.fake_server import FakeServerOptions
+from camayoc.qpc_models import Credential
+from camayoc.qpc_models import Scan
+from camayoc.qpc_models import ScanJob
+from camayoc.qpc_models import Source
+from camayoc.scan_watcher import ScanJobWatcher
+from camayoc.scan_watcher import _Watch
+from camayoc.types.settings import ScanPollingOptions
+
+POLLING = ScanPollingOptions(min_interval=0.05, max_interval=0.2, backoff=2)
+
+
+class IntervalTestCase(unittest.TestCase):
+    """Test polling intervals."""
+
+    def make_watch(self, expected_duration=None):
+        return _Watch(
+            scanjob=None,
+            state="completed",
+            started_at=0,
+            deadline=100,
+            timeout=100,
+            queue_deadline=100,
+            expected_duration=expected_duration,
+            scan_id=None,
+        )
+
+    def test_backoff(self):
+        """Interval grows with each poll, up to maximum."""
+        watcher = ScanJobWatcher(options=POLLING)
+        watch = self.make_watch()
+        intervals = []
+        for polls in range(5):
+            watch.polls = polls
+            intervals.append(watcher.interval(watch, now=0))
+        assert intervals == [0.05, 0.1, 0.2, 0.2, 0.2]
+
+    def test_expected_duration(self):
+        """Job is polled more often when it nears expected completion time."""
+        watcher = ScanJobWatcher(options=POLLING)
+        watch = self.make_watch(expected_duration=10)
+        watch.polls = 10
+        assert watcher.interval(watch, now=1) == 0.2
+        assert watcher.interval(watch, now=9.8) == pytest.approx(0.1)
+        assert watcher.interval(watch, now=10) == 0.05
+        assert watcher.interval(watch, now=20) == 0.2
+
+
+class QueuedScanJob:
+    """Scan job that waits in the queue, then runs, for given seconds."""
+
+    client = None
+    scan_id = None
+    _id = 1
+
+    def __init__(self, queued, running):
+        self.created_at = time.monotonic()
+        self.queued = queued
+        self.running = running
+
+    def read(self, cache=True):
+        elapsed = time.monotonic() - self.created_at
+        if elapsed < self.queued:
+            status = "created"
+        elif elapsed < self.queued + self.running:
+            status = "running"
+        else:
+            status = "completed"
+        response = mock.Mock()
+        response.json.return_value = {"id": self._id, "status": status}
+        return response
+
+
+class QueuedJobTestCase(unittest.TestCase):
+    """Test timeouts of jobs waiting in the queue."""
+
+    def test_queue_wait_not_counted(self):
+        """Timeout starts when job leaves the queue."""
+        watcher = ScanJobWatcher(options=POLLING)
+        job = watcher.wait(QueuedScanJob(queued=0.5, running=0.1), timeout=0.3, max_queue_wait=5)
+        assert job["status"] == "completed"
+
+    def test_queue_wait_limited(self):
+        """Job that stays in the queue for too long times out."""
+        watcher = ScanJobWatcher(options=POLLING)
+        future = watcher.watch(QueuedScanJob(queued=5, running=0), timeout=0.1, max_queue_wait=0.2)
+        with self.assertRaises(WaitTimeError):
+            future.result(timeout=5)
+
+
+class ScanJobWatcherTestCase(unittest.TestCase):
+    """Test watching scan jobs on fake server."""
+
+    def setUp(self):
+        options = FakeServerOptions(scan_duration=0.3)
+        self.server = FakeServer(options).start()
+        self.addCleanup(self.server.stop)
+        self.client = api.Client(config=self.server.client_config())
+        self.addCleanup(self.client.close)
+        cred = Credential(client=self.client, cred_type="network", password="p")
+        cred.create()
+        source = Source(
+            client=self.client, source_type="network", hosts=["h1"], credential_ids=[cred._id]
+        )
+        source.create()
+        self.scan = Scan(client=self.client, source_ids=[source._id])
+        self.scan.create()
+        self.watcher = ScanJobWatcher(options=POLLING)
+
+    def start_job(self):
+        job = ScanJob(client=self.client, scan_id=self.scan._id)
+        job.create()
+        return job
+
+    def test_short_scan(self):
+        """Short scan is noticed soon after it completes."""
+        start = time.monotonic()
+        job = self.watcher.wait(self.start_job(), timeout=5)
+        assert job["status"] == "completed"
+        assert time.monotonic() - start < 0.3 + 2 * POLLING.max_interval
+
+    def test_jobs_of_one_scan(self):
+        """Jobs of the same scan are polled with listing requests."""
+        jobs = [self.start_job() for _ in range(3)]
+        requests_sent = []
+        self.client.hooks["after_response"].append(requests_sent.append)
+        futures = [self.watcher.watch(job, timeout=5) for job in jobs]
+        done, _ = wait(futures, timeout=5)
+        assert len(done) == 3
+        assert [f.result()["id"] for f in futures] == [job._id for job in jobs]
+        paths = {event.path for event in requests_sent}
+        assert paths == {"v1/scans/{id}/jobs/"}
+
+    def test_timeout(self):
+        """WaitTimeError is set when job does not finish on time."""
+        future = self.watcher.watch(self.start_job(), timeout=0.1)
+        with self.assertRaises(WaitTimeError):
+            future.result(timeout=5)
+
+    def test_stopped(self):
+        """Waiting ends when job stops; StoppedScanException is set if it was not expected."""
+        job = self.start_job()
+        job.cancel()
+        with self.assertRaises(StoppedScanException):
+            self.watcher.wait(job, state="running", timeout=5)
+        assert self.watcher.wait(job, state="stopped", timeout=5)["status"] == "canceled"
+        assert self.watcher.wait(job, timeout=5)["status"] == "canceled"
+
+    def test_unexpected_error(self):
+        """Unexpected error is delivered to waiting caller and watcher keeps working."""
+        job = self.start_job()
+        with mock.patch.object(self.watcher, "_update", side_effect=KeyError("status")):
+            with self.assertRaises(KeyError):
+                self.watcher.wait(job, timeout=5)
+        while self.watcher._thread is not None:
+            time.sleep(0.01)
+        with mock.patch.object(self.watcher, "_loop", side_effect=RuntimeError("broken")):
+            with self.assertRaises(RuntimeError):
+                self.watcher.wait(job, timeout=5)
+        assert self.watcher.wait(job, timeout=5)["status"] == "completed"
+
+    def test_cancel(self):
+        """Cancelled watch ends with StoppedScanException; finished ones are kept."""
+        job = self.start_job()
+        future = self.watcher.watch(job, timeout=5)
+        self.watcher.cancel(future, "no longer needed")
+        with self.assertRaisesRegex(StoppedScanException, "no longer needed"):
+            future.result(timeout=1)
+        assert self.watcher._watches == []
+        finished = self.watcher.watch(job, timeout=5)
+        assert finished.result(timeout=5)["status"] == "completed"
+        self.watcher.cancel(finished)
+        assert finished.result()["status"] == "completed"
+
+    def test_invalid_state(self):
+        """Unknown states are rejected."""
+        with self.assertRaises(ValueError):
+            self.watcher.watch(self.start_job(), state="done")
@@ -5,7 +5,12 @@ from pathlib import Path
 from tempfile import mkdtemp
 from unittest import mock
 
+from camayoc import api
 from camayoc import utils
+from camayoc.fake_server import FakeServer
+from camayoc.qpc_models import Credential
+from camayoc.qpc_models import Source
+from camayoc.tests.qpc import utils as qpc_utils
 from camayoc.tests.qpc.cli.utils import hashicorp_vault_cli_options
 from camayoc.types.settings import HashicorpVaultOptions
 from camayoc.types.settings import QuipucordsServerOptions
@@ -128,3 +133,38 @@ def test_hashicorp_vault_cli_options_omits_null_port():
         "client-key": "/path/to/client.key",
         "ca-cert": "/path/to/ca.crt",
     }
+
+
+def test_sort_and_delete():
+    """Test ``camayoc.tests.qpc.utils.sort_and_delete`` resolves ids in bulk."""
+    with FakeServer() as server:
+        client = api.Client(response_handler=api.echo_handler, config=server.client_config())
+        cred = Credential(client=client, cred_type="network", password="p")
+        cred.create()
+        sources = []
+        for _ in range(7):
+            source = Source(
+                client=client, source_type="network", hosts=["h"], credential_ids=[cred._id]
+            )
+            source.create()
+            sources.append(source)
+        kept = sources.pop()
+        # Objects created from UI and CLI have only names
+        trash = [Source(client=client, name=source.name) for source in sources]
+        trash.append(Source(client=client, name="already-deleted"))
+        trash.append(Credential(client=client, name=cred.name))
+
+        requests_sent = []
+        client.add_hook("before_request", requests_sent.append)
+        with mock.patch("camayoc.tests.qpc.utils.api.get_client", return_value=client):
+            qpc_utils.sort_and_delete(trash, batch_size=4)
+
+        # One listing per model type, sources deleted in batches of 4
+        assert [r.path for r in requests_sent if r.method == "GET"] == [
+            "v2/sources/",
+            "v2/credentials/",
+        ]
+        bulk_deletes = [r for r in requests_sent if r.path.endswith("bulk_delete/")]
+        assert len(bulk_deletes) == 3
+        assert [s["name"] for s in Source.objects(client)] == [kept.name]
+        client.close()